@@ -0,0 +1,271 @@
+# benchmark_sa.py
+"""
+Banco de pruebas de routing_sa.py.
+Genera instancias sintéticas con el esquema de datos_distribucion_tiendas.csv (y sus
+matrices en el almacén binario), ejecuta la solución inicial por clúster y variantes
+del recocido simulado, y agrega los resultados a un historial JSONL/CSV para detectar
+regresiones entre versiones.
+
+Uso:
+    python benchmark_sa.py                                   # 100, 1k, 5k y 20k nodos
+    python benchmark_sa.py --nodos 100 1000 --variantes listas kernel
+    python benchmark_sa.py --tiempo-maximo 30
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import math
+import multiprocessing
+import os
+import resource
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import routing_sa
+
+# -----------------------------------------------------------------------------
+# 1. PARÁMETROS DE CONFIGURACIÓN
+# -----------------------------------------------------------------------------
+TAMANOS_INSTANCIA = [100, 1000, 5000, 20000]
+DIRECTORIO_INSTANCIAS = 'Datos/sinteticos'
+SEMILLA_INSTANCIAS = 2025
+
+ARCHIVO_HISTORIAL_JSON = 'benchmarks/historial_benchmark.jsonl'
+ARCHIVO_HISTORIAL_CSV = 'benchmarks/historial_benchmark.csv'
+
+# Región de las instancias (la misma zona que los datos reales)
+LATITUD_MIN, LATITUD_MAX = 24.70, 24.90
+LONGITUD_MIN, LONGITUD_MAX = -107.50, -107.30
+FACTOR_RODEO = 1.3  # Distancia por carretera ≈ 1.3 veces la de gran círculo
+
+MEJORA_OBJETIVO = 0.05       # Costo objetivo: 5 % por debajo de la solución por clúster
+TIEMPO_MAXIMO_CASO = 120.0   # Presupuesto de cada ejecución del recocido (segundos)
+TOLERANCIA_REGRESION = 0.2   # Caída relativa de iteraciones/s que se reporta
+
+# Cada variante sobrescribe parámetros de routing_sa en su propio proceso
+VARIANTES = {
+    'listas': {'OPERADORES_VECINDARIO': ['swap', '2opt'], 'SELECCION_OPERADORES': 'uniforme'},
+    'operadores': {},
+    'granular': {'USAR_LISTAS_VECINOS': True},
+    'kernel': {'USAR_KERNEL_COMPILADO': True},
+    'adaptativo': {'USAR_KERNEL_COMPILADO': True, 'ESQUEMA_ENFRIAMIENTO': 'adaptativo',
+                   'CALIBRAR_TEMPERATURA_INICIAL': True},
+    'ahorros': {'USAR_KERNEL_COMPILADO': True, 'CONSTRUCTOR_INICIAL': 'ahorros'},
+}
+
+# -----------------------------------------------------------------------------
+# 2. GENERADOR DE INSTANCIAS SINTÉTICAS
+# -----------------------------------------------------------------------------
+def rutas_instancia(num_nodos, semilla=SEMILLA_INSTANCIAS, directorio=DIRECTORIO_INSTANCIAS):
+    carpeta = os.path.join(directorio, f"n{num_nodos}_s{semilla}")
+    return {
+        'ubicaciones': os.path.join(carpeta, 'datos_distribucion_tiendas.csv'),
+        'costos': os.path.join(carpeta, 'matriz_costos_combustible.bin'),
+        'distancias': os.path.join(carpeta, 'matriz_distancias.bin'),
+    }
+
+def generar_instancia(num_nodos, semilla=SEMILLA_INSTANCIAS, directorio=DIRECTORIO_INSTANCIAS):
+    """
+    Crea (si no existe) una instancia con ~sqrt(N) centros de distribución al inicio
+    de la tabla, como en los datos reales. Las matrices se escriben por bloques de
+    filas a partir de la distancia de gran círculo por FACTOR_RODEO; el costo es esa
+    distancia por COSTO_COMBUSTIBLE_POR_KM. Devuelve las rutas de los archivos.
+    """
+    archivos = rutas_instancia(num_nodos, semilla, directorio)
+    if all(os.path.exists(path) for path in archivos.values()):
+        return archivos
+    os.makedirs(os.path.dirname(archivos['ubicaciones']), exist_ok=True)
+
+    rng = np.random.default_rng(semilla + num_nodos)
+    num_depots = max(1, round(math.sqrt(num_nodos)))
+    num_tiendas = num_nodos - num_depots
+    df = pd.DataFrame({
+        'Tipo': ['Centro de Distribución'] * num_depots + ['Tienda'] * num_tiendas,
+        'Nombre': [f"Centro de Distribución {k + 1}" for k in range(num_depots)]
+                  + [f"Tienda {k + 1}" for k in range(num_tiendas)],
+        'Latitud_WGS84': rng.uniform(LATITUD_MIN, LATITUD_MAX, num_nodos).round(6),
+        'Longitud_WGS84': rng.uniform(LONGITUD_MIN, LONGITUD_MAX, num_nodos).round(6),
+        'Capacidad_Venta': np.concatenate([rng.integers(10000, 27000, num_depots),
+                                           rng.integers(5000, 20000, num_tiendas)]),
+        'Capacidad_Almacenamiento': np.concatenate([rng.integers(11000, 50000, num_depots),
+                                                    rng.integers(3000, 15000, num_tiendas)]),
+        'Nivel_Tienda': ['N/A'] * num_depots + list(rng.choice(['A', 'B', 'C'], num_tiendas)),
+    })
+    df.to_csv(archivos['ubicaciones'], index=False, encoding='latin1')
+
+    metrica = routing_sa.MetricaHaversine(df['Latitud_WGS84'].to_numpy(),
+                                          df['Longitud_WGS84'].to_numpy(), FACTOR_RODEO)
+    filas = max(1, 2**22 // num_nodos)
+    for clave, factor in (('distancias', 1.0), ('costos', routing_sa.COSTO_COMBUSTIBLE_POR_KM)):
+        bloques = (metrica[inicio:inicio + filas] * factor for inicio in range(0, num_nodos, filas))
+        routing_sa.escribir_matriz_binaria(archivos[clave], bloques)
+    return archivos
+
+# -----------------------------------------------------------------------------
+# 3. EJECUCIÓN DE UN CASO
+# -----------------------------------------------------------------------------
+def ejecutar_caso(archivos, num_nodos, variante, semilla, tiempo_maximo):
+    """
+    Corre una variante sobre una instancia. Se ejecuta en un proceso nuevo por caso,
+    así el pico de memoria (ru_maxrss) y los parámetros sobrescritos no se mezclan.
+    """
+    for parametro, valor in VARIANTES[variante].items():
+        setattr(routing_sa, parametro, valor)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.time()
+        df, matriz_costos, matriz_distancias, depots = routing_sa.cargar_datos(
+            archivos['ubicaciones'], archivos['costos'], archivos['distancias'])
+        tiempo_carga = time.time() - inicio
+
+        inicio = time.time()
+        rutas = routing_sa.crear_solucion_inicial_por_cluster(df, depots, matriz_distancias)
+        tiempo_cluster = time.time() - inicio
+        costo_cluster = routing_sa.calcular_metrica_total(rutas, matriz_costos)
+
+        # La referencia siempre es el clúster; otros constructores se miden aparte
+        tiempo_construccion = tiempo_cluster
+        if routing_sa.CONSTRUCTOR_INICIAL != 'cluster':
+            inicio = time.time()
+            rutas = routing_sa.crear_solucion_inicial(df, depots, matriz_distancias)
+            tiempo_construccion = time.time() - inicio
+        costo_inicial = routing_sa.calcular_metrica_total(rutas, matriz_costos)
+
+        inicio = time.time()
+        vecinos = None
+        if routing_sa.USAR_LISTAS_VECINOS:
+            vecinos = routing_sa.construir_indice_vecinos(matriz_distancias, depots, routing_sa.K_VECINOS)
+        if routing_sa.USAR_KERNEL_COMPILADO:
+            # Compilación JIT fuera de la medición
+            routing_sa.MotorCompilado(rutas, matriz_costos, semilla).recorrer(1.0, 1)
+        tiempo_preparacion = time.time() - inicio
+
+        # Tiempo hasta el costo objetivo
+        costo_objetivo = costo_cluster * (1.0 - MEJORA_OBJETIVO)
+        estadisticas_objetivo = {}
+        routing_sa.recocido_simulado(rutas, matriz_costos, semilla, False, vecinos,
+                                     tiempo_maximo=tiempo_maximo, costo_objetivo=costo_objetivo,
+                                     estadisticas=estadisticas_objetivo)
+
+        # Ejecución completa (o hasta agotar el presupuesto de tiempo)
+        estadisticas = {}
+        _, costo_final = routing_sa.recocido_simulado(rutas, matriz_costos, semilla, False, vecinos,
+                                                      tiempo_maximo=tiempo_maximo,
+                                                      estadisticas=estadisticas)
+
+    alcanzado = estadisticas_objetivo['motivo_parada'] == 'costo objetivo'
+    return {
+        'nodos': num_nodos,
+        'depots': len(depots),
+        'variante': variante,
+        'semilla': semilla,
+        'tiempo_carga': tiempo_carga,
+        'tiempo_cluster': tiempo_cluster,
+        'constructor': routing_sa.CONSTRUCTOR_INICIAL,
+        'tiempo_construccion': tiempo_construccion,
+        'costo_inicial': costo_inicial,
+        'tiempo_preparacion': tiempo_preparacion,
+        'costo_cluster': costo_cluster,
+        'costo_final': costo_final,
+        'gap_vs_cluster_pct': 100.0 * (costo_final - costo_cluster) / costo_cluster,
+        'iteraciones': estadisticas['iteraciones'],
+        'tiempo_recocido': estadisticas['tiempo'],
+        'iteraciones_por_segundo': estadisticas['iteraciones'] / max(estadisticas['tiempo'], 1e-9),
+        'motivo_parada': estadisticas['motivo_parada'],
+        'costo_objetivo': costo_objetivo,
+        'tiempo_a_objetivo': estadisticas_objetivo['tiempo'] if alcanzado else None,
+        # Construcción + recocido hasta el objetivo: compara constructores con justicia
+        'tiempo_total_a_objetivo': tiempo_construccion + estadisticas_objetivo['tiempo'] if alcanzado else None,
+        # ru_maxrss está en KB en Linux
+        'rss_pico_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+# -----------------------------------------------------------------------------
+# 4. HISTORIAL Y DETECCIÓN DE REGRESIONES
+# -----------------------------------------------------------------------------
+def version_codigo():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def leer_historial(path=ARCHIVO_HISTORIAL_JSON):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as archivo:
+        return [json.loads(linea) for linea in archivo if linea.strip()]
+
+def comparar_con_historial(resultado, historial):
+    """Compara con la última corrida del mismo tamaño y variante; devuelve avisos."""
+    previos = [r for r in historial
+               if r['nodos'] == resultado['nodos'] and r['variante'] == resultado['variante']]
+    if not previos:
+        return []
+    previo = previos[-1]
+    avisos = []
+    if resultado['iteraciones_por_segundo'] < (1.0 - TOLERANCIA_REGRESION) * previo['iteraciones_por_segundo']:
+        avisos.append(f"iteraciones/s bajó de {previo['iteraciones_por_segundo']:,.0f} "
+                      f"a {resultado['iteraciones_por_segundo']:,.0f}")
+    if resultado['gap_vs_cluster_pct'] > previo['gap_vs_cluster_pct'] + 1.0:
+        avisos.append(f"gap vs clúster empeoró de {previo['gap_vs_cluster_pct']:.2f} % "
+                      f"a {resultado['gap_vs_cluster_pct']:.2f} %")
+    return avisos
+
+def registrar_resultados(resultados):
+    os.makedirs(os.path.dirname(ARCHIVO_HISTORIAL_JSON), exist_ok=True)
+    with open(ARCHIVO_HISTORIAL_JSON, 'a', encoding='utf-8') as archivo:
+        for resultado in resultados:
+            archivo.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+    # El CSV se reescribe completo para que agregar columnas no desalinee corridas previas
+    historial_csv = pd.DataFrame(resultados)
+    if os.path.exists(ARCHIVO_HISTORIAL_CSV):
+        historial_csv = pd.concat([pd.read_csv(ARCHIVO_HISTORIAL_CSV), historial_csv], ignore_index=True)
+    historial_csv.to_csv(ARCHIVO_HISTORIAL_CSV, index=False)
+
+# -----------------------------------------------------------------------------
+# 5. FLUJO PRINCIPAL
+# -----------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de routing_sa con instancias sintéticas.")
+    parser.add_argument('--nodos', type=int, nargs='+', default=TAMANOS_INSTANCIA)
+    parser.add_argument('--variantes', nargs='+', choices=list(VARIANTES), default=list(VARIANTES))
+    parser.add_argument('--semilla', type=int, default=routing_sa.SEMILLA_ALEATORIA)
+    parser.add_argument('--tiempo-maximo', type=float, default=TIEMPO_MAXIMO_CASO,
+                        help="Segundos por ejecución del recocido.")
+    args = parser.parse_args()
+
+    historial = leer_historial()
+    fecha = datetime.datetime.now().isoformat(timespec='seconds')
+    commit = version_codigo()
+    resultados = []
+    # 'spawn' y un proceso por caso: cada medición de memoria empieza desde cero
+    contexto = multiprocessing.get_context('spawn')
+    for num_nodos in args.nodos:
+        inicio = time.time()
+        archivos = generar_instancia(num_nodos)
+        print(f"\nInstancia de {num_nodos} nodos lista ({time.time() - inicio:.2f} segundos)")
+        for variante in args.variantes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto, max_tasks_per_child=1) as pool:
+                resultado = pool.submit(ejecutar_caso, archivos, num_nodos, variante,
+                                        args.semilla, args.tiempo_maximo).result()
+            resultado.update(fecha=fecha, commit=commit)
+            resultados.append(resultado)
+            tiempo_objetivo = resultado['tiempo_total_a_objetivo']
+            print(f"  {variante:<11} {resultado['iteraciones_por_segundo']:>12,.0f} it/s | "
+                  f"inicial {resultado['costo_inicial']:>12,.2f} | "
+                  f"gap {resultado['gap_vs_cluster_pct']:7.2f} % | "
+                  f"objetivo {'-' if tiempo_objetivo is None else f'{tiempo_objetivo:.2f} s':>8} | "
+                  f"RSS {resultado['rss_pico_mb']:,.0f} MB | {resultado['motivo_parada']}")
+            for aviso in comparar_con_historial(resultado, historial):
+                print(f"    REGRESIÓN: {aviso}")
+
+    registrar_resultados(resultados)
+    print(f"\nHistorial actualizado -> {ARCHIVO_HISTORIAL_JSON}, {ARCHIVO_HISTORIAL_CSV}")
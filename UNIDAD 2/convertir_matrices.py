@@ -0,0 +1,40 @@
+# convertir_matrices.py
+"""
+Convierte una sola vez las matrices CSV de costos y distancias al almacén binario
+que routing_sa.py abre con np.memmap (USAR_MATRICES_BINARIAS = True).
+
+Uso:
+    python convertir_matrices.py              # float32 (la mitad de memoria)
+    python convertir_matrices.py --float64    # conserva la precisión del CSV
+"""
+
+import argparse
+import time
+
+from routing_sa import (
+    ARCHIVO_COSTOS_COMBUSTIBLE, ARCHIVO_DISTANCIAS,
+    ARCHIVO_COSTOS_BINARIO, ARCHIVO_DISTANCIAS_BINARIO, PRECISION_MATRICES,
+    convertir_matriz_a_binario, cargar_matriz_binaria,
+)
+
+parser = argparse.ArgumentParser(description="Convierte las matrices CSV al almacén binario.")
+parser.add_argument('--float64', action='store_true', help="Guardar en float64 en lugar de float32.")
+parser.add_argument('--verificar', action='store_true', help="Releer los archivos y validar el checksum.")
+args = parser.parse_args()
+
+precision = 'float64' if args.float64 else PRECISION_MATRICES
+
+for path_csv, path_binario in [(ARCHIVO_COSTOS_COMBUSTIBLE, ARCHIVO_COSTOS_BINARIO),
+                               (ARCHIVO_DISTANCIAS, ARCHIVO_DISTANCIAS_BINARIO)]:
+    inicio = time.time()
+    try:
+        n = convertir_matriz_a_binario(path_csv, path_binario, dtype=precision)
+    except FileNotFoundError as e:
+        print(f"Error: No se pudo encontrar el archivo {e.filename}.")
+        exit()
+    print(f"{path_csv} -> {path_binario}: {n} x {n} en {precision} ({time.time() - inicio:.2f} segundos)")
+    if args.verificar:
+        cargar_matriz_binaria(path_binario, verificar=True)
+        print("  Checksum verificado.")
+
+print("\nActiva USAR_MATRICES_BINARIAS = True en routing_sa.py para usar los archivos binarios.")
@@ -2,47 +2,107 @@
 """
 Este script genera un mapa interactivo con las rutas optimizadas,
 agrupando cada ruta en una capa individual para mejor visualización.
+
+Con muchas ubicaciones (MODO_ALTO_VOLUMEN) las tiendas se dibujan en una sola capa
+FastMarkerCluster y todas las rutas en una sola FeatureCollection GeoJSON con el
+estilo de cada ruta en sus propiedades, en lugar de un objeto por tienda y una capa
+por ruta.
+
+Con MODO_TESELAS la geometría de rutas y tiendas se escribe aparte, en archivos GeoJSON
+por tesela y por banda de zoom (ver teselas_mapa.py), y el HTML solo la descarga al
+navegar; la carpeta DIRECTORIO_TESELAS se publica junto al HTML en un servidor web.
 """
 
+import os
+import time
+
+import numpy as np
 import pandas as pd
 import folium
+from folium.plugins import FastMarkerCluster
 import random
 
+from routing_sa import leer_salida_tipada
+from teselas_mapa import escribir_teselas, CargadorTeselas
+
 print("Iniciando la creación del mapa con rutas en capas separadas...")
+inicio = time.time()
 
 # --- 1. CONFIGURACIÓN DE ARCHIVOS ---
 ARCHIVO_UBICACIONES = 'Datos/datos_distribucion_tiendas.csv'
-ARCHIVO_RUTAS_OPTIMIZADAS = 'rutas_optimizadas.csv'
+ARCHIVO_RUTAS_OPTIMIZADAS = 'rutas_optimizadas.csv'         # Respaldo si no hay salida tipada
+ARCHIVO_RUTAS_TIPADA = 'rutas_optimizadas.parquet'
+ARCHIVO_PARADAS = 'paradas_optimizadas.parquet'
 ARCHIVO_SALIDA_MAPA = 'mapa_con_rutas_interactivo.html' # Nuevo nombre para no sobreescribir el anterior
 
+# Modo de alto volumen: None = automático a partir de UMBRAL_ALTO_VOLUMEN ubicaciones
+MODO_ALTO_VOLUMEN = None
+UMBRAL_ALTO_VOLUMEN = 2000
+DECIMALES_COORDENADAS = 6  # ~0.1 m; menos decimales reducen el tamaño del HTML
+
+# Geometría en teselas GeoJSON cargadas bajo demanda en lugar de incrustada en el HTML
+MODO_TESELAS = False
+DIRECTORIO_TESELAS = 'mapa_teselas'
+
 # --- 2. CARGAR LOS DATOS ---
 try:
     df_ubicaciones = pd.read_csv(ARCHIVO_UBICACIONES, encoding='latin1')
-    df_rutas = pd.read_csv(ARCHIVO_RUTAS_OPTIMIZADAS)
+    # Tablas con columnas numéricas: una fila por ruta y una por parada (sin parsear texto)
+    df_rutas, df_paradas = leer_salida_tipada(ARCHIVO_RUTAS_TIPADA, ARCHIVO_PARADAS, ARCHIVO_RUTAS_OPTIMIZADAS)
 except FileNotFoundError as e:
     print(f"Error: No se pudo encontrar el archivo {e.filename}.")
     exit()
 
+alto_volumen = MODO_ALTO_VOLUMEN
+if alto_volumen is None:
+    alto_volumen = len(df_ubicaciones) >= UMBRAL_ALTO_VOLUMEN
+
+# Coordenadas de todas las ubicaciones como arreglos: cada búsqueda es un índice de NumPy
+latitudes = df_ubicaciones['Latitud_WGS84'].to_numpy().round(DECIMALES_COORDENADAS)
+longitudes = df_ubicaciones['Longitud_WGS84'].to_numpy().round(DECIMALES_COORDENADAS)
+nombres = df_ubicaciones['Nombre'].astype(str).to_numpy()
+es_depot = (df_ubicaciones['Tipo'] == 'Centro de Distribución').to_numpy()
+
 # --- 3. CREAR EL MAPA BASE ---
 latitud_centro = df_ubicaciones['Latitud_WGS84'].mean()
 longitud_centro = df_ubicaciones['Longitud_WGS84'].mean()
-mapa = folium.Map(location=[latitud_centro, longitud_centro], zoom_start=12, tiles="cartodbpositron")
+mapa = folium.Map(location=[latitud_centro, longitud_centro], zoom_start=12, tiles="cartodbpositron",
+                  prefer_canvas=alto_volumen or MODO_TESELAS)
 
 # --- 4. AÑADIR MARCADORES (en su propia capa)---
-capa_ubicaciones = folium.FeatureGroup(name="Ubicaciones", show=True)
+capa_ubicaciones = folium.FeatureGroup(name="Ubicaciones" if not alto_volumen else "Centros de Distribución",
+                                       show=True)
 mapa.add_child(capa_ubicaciones)
 
-for idx, fila in df_ubicaciones.iterrows():
-    popup_text = f"<b>{fila['Nombre']}</b><br>Tipo: {fila['Tipo']}"
-    if fila['Tipo'] == 'Centro de Distribución':
-        folium.Marker(
-            location=[fila['Latitud_WGS84'], fila['Longitud_WGS84']],
-            popup=folium.Popup(popup_text, max_width=300),
-            icon=folium.Icon(color='red', icon='truck', prefix='fa')
-        ).add_to(capa_ubicaciones)
-    else:
+for lat, lon, nombre in zip(latitudes[es_depot], longitudes[es_depot], nombres[es_depot]):
+    popup_text = f"<b>{nombre}</b><br>Tipo: Centro de Distribución"
+    folium.Marker(
+        location=[lat, lon],
+        popup=folium.Popup(popup_text, max_width=300),
+        icon=folium.Icon(color='red', icon='truck', prefix='fa')
+    ).add_to(capa_ubicaciones)
+
+if MODO_TESELAS:
+    pass  # Las tiendas van en las teselas de las bandas de zoom cercano
+elif alto_volumen:
+    # Una sola capa agrupada: los datos viajan como un arreglo y el navegador crea los
+    # marcadores de cada grupo solo al acercarse
+    callback = """
+    function (fila) {
+        var marcador = L.circleMarker(new L.LatLng(fila[0], fila[1]),
+                                      {radius: 5, color: 'blue', fill: true, fillColor: 'blue'});
+        marcador.bindPopup('<b>' + fila[2] + '</b><br>Tipo: Tienda');
+        return marcador;
+    }
+    """
+    datos_tiendas = [[lat, lon, nombre] for lat, lon, nombre
+                     in zip(latitudes[~es_depot].tolist(), longitudes[~es_depot].tolist(), nombres[~es_depot])]
+    FastMarkerCluster(datos_tiendas, callback=callback, name="Tiendas").add_to(mapa)
+else:
+    for lat, lon, nombre in zip(latitudes[~es_depot], longitudes[~es_depot], nombres[~es_depot]):
+        popup_text = f"<b>{nombre}</b><br>Tipo: Tienda"
         folium.CircleMarker(
-            location=[fila['Latitud_WGS84'], fila['Longitud_WGS84']],
+            location=[lat, lon],
             radius=5, popup=folium.Popup(popup_text, max_width=300),
             color='blue', fill=True, fill_color='blue'
         ).add_to(capa_ubicaciones)
@@ -52,29 +112,65 @@ colores = ['#FF0000', '#0000FF', '#008000', '#FFA500', '#800080', '#00FFFF', '#F
 while len(colores) < len(df_rutas):
     colores.append('#'+''.join([random.choice('0123456789ABCDEF') for j in range(6)]))
 
-for idx, fila_ruta in df_rutas.iterrows():
-    id_ruta_actual = fila_ruta['id_ruta']
-    # Crear una capa para esta ruta específica
-    capa_ruta = folium.FeatureGroup(name=f"Ruta #{id_ruta_actual}", show=False) # 'show=False' para que inicien ocultas
-    
-    nodos_ruta = [int(n) for n in fila_ruta['nodos'].split(';')]
-    coordenadas_ruta = []
-    for nodo_id in nodos_ruta:
-        ubicacion = df_ubicaciones.iloc[nodo_id]
-        coordenadas_ruta.append((ubicacion['Latitud_WGS84'], ubicacion['Longitud_WGS84']))
-        
-    popup_ruta = (f"<b>Ruta #{id_ruta_actual}</b><br>"
-                  f"Costo: {fila_ruta['costo_combustible']}<br>"
-                  f"Distancia: {fila_ruta['distancia_km']}")
-    
-    # Dibujar la línea y añadirla a su capa específica
-    folium.PolyLine(
-        locations=coordenadas_ruta, color=colores[idx % len(colores)],
-        weight=3, opacity=0.9, popup=folium.Popup(popup_ruta, max_width=300)
-    ).add_to(capa_ruta)
-    
-    # Añadir la capa de la ruta al mapa
-    mapa.add_child(capa_ruta)
+# Coordenadas de todas las paradas con un solo gather; cada ruta es un tramo contiguo de la tabla
+df_paradas = df_paradas.sort_values(['id_ruta', 'secuencia'], kind='stable')
+id_nodos = df_paradas['id_nodo'].to_numpy()
+limites = np.flatnonzero(np.diff(df_paradas['id_ruta'].to_numpy())) + 1
+df_rutas = df_rutas.sort_values('id_ruta')
+
+if MODO_TESELAS:
+    propiedades_rutas = [{'ruta': f"Ruta #{fila_ruta.id_ruta}",
+                          'costo': f"${fila_ruta.costo_combustible:,.2f}",
+                          'distancia': f"{fila_ruta.distancia_km:,.2f} km",
+                          'color': colores[idx % len(colores)]}
+                         for idx, fila_ruta in enumerate(df_rutas.itertuples(index=False))]
+    indice = escribir_teselas(DIRECTORIO_TESELAS, latitudes[id_nodos], longitudes[id_nodos], limites,
+                              propiedades_rutas, latitudes[~es_depot], longitudes[~es_depot], nombres[~es_depot])
+    # Ruta de la carpeta relativa al HTML, que es como la pide el navegador
+    url_teselas = os.path.relpath(DIRECTORIO_TESELAS, os.path.dirname(os.path.abspath(ARCHIVO_SALIDA_MAPA)))
+    mapa.add_child(CargadorTeselas(url_teselas.replace(os.sep, '/'), indice))
+    for banda in indice['bandas']:
+        print(f"Zoom {banda['zoom_min']}-{banda['zoom_max']}: {banda['vertices']} vértices "
+              f"en {len(banda['teselas'])} teselas")
+elif alto_volumen:
+    # Todas las rutas en una sola FeatureCollection; el color va en las propiedades
+    coordenadas = np.column_stack((longitudes[id_nodos], latitudes[id_nodos]))  # GeoJSON usa [lon, lat]
+    caracteristicas = [
+        {'type': 'Feature',
+         'geometry': {'type': 'LineString', 'coordinates': coordenadas_ruta.tolist()},
+         'properties': {'ruta': f"Ruta #{fila_ruta.id_ruta}",
+                        'costo': f"${fila_ruta.costo_combustible:,.2f}",
+                        'distancia': f"{fila_ruta.distancia_km:,.2f} km",
+                        'color': colores[idx % len(colores)]}}
+        for idx, (fila_ruta, coordenadas_ruta) in enumerate(zip(df_rutas.itertuples(index=False),
+                                                                np.split(coordenadas, limites)))
+    ]
+    folium.GeoJson(
+        {'type': 'FeatureCollection', 'features': caracteristicas}, name="Rutas",
+        style_function=lambda caracteristica: {'color': caracteristica['properties']['color'],
+                                                'weight': 3, 'opacity': 0.9},
+        popup=folium.GeoJsonPopup(fields=['ruta', 'costo', 'distancia'], labels=False),
+    ).add_to(mapa)
+else:
+    coordenadas = np.column_stack((latitudes[id_nodos], longitudes[id_nodos]))
+    for idx, (fila_ruta, coordenadas_ruta) in enumerate(zip(df_rutas.itertuples(index=False),
+                                                            np.split(coordenadas, limites))):
+        id_ruta_actual = fila_ruta.id_ruta
+        # Crear una capa para esta ruta específica
+        capa_ruta = folium.FeatureGroup(name=f"Ruta #{id_ruta_actual}", show=False) # 'show=False' para que inicien ocultas
+
+        popup_ruta = (f"<b>Ruta #{id_ruta_actual}</b><br>"
+                      f"Costo: ${fila_ruta.costo_combustible:,.2f}<br>"
+                      f"Distancia: {fila_ruta.distancia_km:,.2f} km")
+
+        # Dibujar la línea y añadirla a su capa específica
+        folium.PolyLine(
+            locations=coordenadas_ruta.tolist(), color=colores[idx % len(colores)],
+            weight=3, opacity=0.9, popup=folium.Popup(popup_ruta, max_width=300)
+        ).add_to(capa_ruta)
+
+        # Añadir la capa de la ruta al mapa
+        mapa.add_child(capa_ruta)
 
 # --- 6. AÑADIR EL CONTROL DE CAPAS Y GUARDAR ---
 # ¡ESTA LÍNEA ES LA MAGIA! Agrega el menú para activar/desactivar capas
@@ -83,4 +179,10 @@ folium.LayerControl(collapsed=False).add_to(mapa)
 mapa.save(ARCHIVO_SALIDA_MAPA)
 
 print(f"\n¡Mapa interactivo generado con éxito!")
+print(f"{len(df_ubicaciones)} ubicaciones y {len(df_rutas)} rutas "
+      f"({'teselas' if MODO_TESELAS else 'alto volumen' if alto_volumen else 'una capa por ruta'}) en {time.time() - inicio:.2f} segundos, "
+      f"{os.path.getsize(ARCHIVO_SALIDA_MAPA) / 1e6:.1f} MB.")
+if MODO_TESELAS:
+    print(f"Teselas: {indice['total_bytes'] / 1e6:.1f} MB en '{DIRECTORIO_TESELAS}'. Publica la carpeta junto al HTML, "
+          f"por ejemplo con 'python -m http.server', para que el navegador pueda descargarlas.")
 print(f"Abre el archivo '{ARCHIVO_SALIDA_MAPA}' en tu navegador.")
\ No newline at end of file
@@ -0,0 +1,275 @@
+# lote_escenarios.py
+"""
+Resuelve un lote de escenarios (días, subconjuntos de CD o de tiendas, matrices de
+costos distintas, parámetros del recocido) en un solo proceso padre y un pool de
+trabajadores. Cada tabla y cada matriz se carga una sola vez y se comparte con los
+trabajadores; cada escenario escribe sus propios archivos de salida y al final se
+genera un resumen consolidado.
+
+Uso:
+    python lote_escenarios.py escenarios_ejemplo.json
+    python lote_escenarios.py escenarios.json --procesos 4 --salida resultados_semana
+
+Manifiesto (JSON): una lista de escenarios o un objeto
+    {
+      "directorio_salida": "escenarios",
+      "comunes": {"parametros": {"TIEMPO_MAXIMO_SEGUNDOS": 30}},
+      "escenarios": [
+        {"nombre": "completo"},
+        {"nombre": "norte", "depots": [0, 1, 2], "semilla": 7},
+        {"nombre": "lunes", "tiendas": ["Tienda 1", "Tienda 2", 15, 16]},
+        {"nombre": "diesel_alto", "costos": "Datos/matriz_costos_diesel.csv",
+         "parametros": {"CAPACIDAD_VEHICULO": 60000}}
+      ]
+    }
+Campos de un escenario (todos opcionales salvo 'nombre'; 'comunes' da los valores
+por defecto): ubicaciones, costos, distancias (CSV o .bin), depots y tiendas (índices
+o nombres), semilla y parametros (constantes de routing_sa que se sobrescriben solo
+durante ese escenario).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import routing_sa
+
+# -----------------------------------------------------------------------------
+# 1. PARÁMETROS DE CONFIGURACIÓN
+# -----------------------------------------------------------------------------
+DIRECTORIO_SALIDA = 'escenarios'                 # Una carpeta por escenario dentro de este directorio
+ARCHIVO_RESUMEN_LOTE = 'resumen_escenarios.csv'  # Resumen consolidado (columnas numéricas)
+NUM_PROCESOS_LOTE = None                         # None = todos los núcleos disponibles
+
+# -----------------------------------------------------------------------------
+# 2. MANIFIESTO Y DATOS COMPARTIDOS
+# -----------------------------------------------------------------------------
+def leer_manifiesto(path):
+    """Devuelve (escenarios normalizados, directorio de salida del manifiesto o None)."""
+    with open(path, encoding='utf-8') as archivo:
+        manifiesto = json.load(archivo)
+    if isinstance(manifiesto, list):
+        manifiesto = {'escenarios': manifiesto}
+    comunes = manifiesto.get('comunes', {})
+    escenarios = [normalizar_escenario(escenario, comunes) for escenario in manifiesto['escenarios']]
+    return escenarios, manifiesto.get('directorio_salida')
+
+def normalizar_escenario(escenario, comunes=None):
+    """Completa un escenario con 'comunes' y los archivos y la semilla de routing_sa."""
+    comunes = {} if comunes is None else comunes
+    if 'nombre' not in escenario:
+        raise ValueError(f"Escenario sin 'nombre': {escenario}")
+    parametros = {**comunes.get('parametros', {}), **escenario.get('parametros', {})}
+    for parametro in parametros:
+        if not parametro.isupper() or not hasattr(routing_sa, parametro):
+            raise ValueError(f"Escenario {escenario['nombre']!r}: {parametro!r} no es un parámetro de routing_sa.")
+
+    def valor(campo, defecto):
+        return escenario.get(campo, comunes.get(campo, defecto))
+
+    return {
+        'nombre': str(escenario['nombre']),
+        'ubicaciones': valor('ubicaciones', routing_sa.ARCHIVO_UBICACIONES),
+        'costos': valor('costos', routing_sa.ARCHIVO_COSTOS_COMBUSTIBLE),
+        'distancias': valor('distancias', routing_sa.ARCHIVO_DISTANCIAS),
+        'depots': valor('depots', None),
+        'tiendas': valor('tiendas', None),
+        'semilla': int(valor('semilla', routing_sa.SEMILLA_ALEATORIA)),
+        'parametros': parametros,
+    }
+
+def resolver_indices(df_ubicaciones, valores, campo, nombre):
+    """Convierte una lista de índices o nombres (columna 'Nombre') en índices enteros."""
+    posiciones = pd.Series(df_ubicaciones.index, index=df_ubicaciones['Nombre'])
+    posiciones = posiciones[~posiciones.index.duplicated(keep=False)]
+    indices = []
+    for valor in valores:
+        if isinstance(valor, str):
+            if valor not in posiciones.index:
+                raise ValueError(f"Escenario {nombre!r}: '{valor}' en '{campo}' no es un nombre único de la tabla.")
+            indices.append(int(posiciones[valor]))
+        elif 0 <= int(valor) < len(df_ubicaciones):
+            indices.append(int(valor))
+        else:
+            raise ValueError(f"Escenario {nombre!r}: el índice {valor} de '{campo}' está fuera de la tabla.")
+    return indices
+
+def cargar_conjuntos(escenarios):
+    """
+    Carga cada tabla de ubicaciones y cada matriz una sola vez (aunque varios conjuntos
+    compartan la matriz de distancias) y resuelve los CD y las tiendas de cada escenario.
+    Devuelve {(ubicaciones, costos, distancias): (df, matriz_costos, matriz_distancias, depots)}.
+    """
+    tablas, matrices, conjuntos = {}, {}, {}
+    for escenario in escenarios:
+        clave = (escenario['ubicaciones'], escenario['costos'], escenario['distancias'])
+        if clave not in conjuntos:
+            if clave[0] not in tablas:
+                tablas[clave[0]] = pd.read_csv(clave[0], encoding='latin1')
+            for path in clave[1:]:
+                if path not in matrices:
+                    matrices[path] = routing_sa.cargar_matriz(path)
+            df = tablas[clave[0]]
+            for path in clave[1:]:
+                if matrices[path].shape[0] != len(df):
+                    raise ValueError(f"{path} tiene {matrices[path].shape[0]} nodos y {clave[0]} "
+                                     f"tiene {len(df)} ubicaciones.")
+            depots = list(df[df['Tipo'] == 'Centro de Distribución'].index)
+            conjuntos[clave] = (df, matrices[clave[1]], matrices[clave[2]], depots)
+
+        df, _, _, depots_archivo = conjuntos[clave]
+        escenario['conjunto'] = clave
+        if escenario['depots'] is None:
+            escenario['depots'] = depots_archivo
+        else:
+            escenario['depots'] = resolver_indices(df, escenario['depots'], 'depots', escenario['nombre'])
+        if escenario['tiendas'] is None:
+            # Los CD no activos en el escenario tampoco son tiendas
+            escenario['tiendas'] = np.setdiff1d(np.arange(len(df)), depots_archivo).tolist()
+        else:
+            escenario['tiendas'] = resolver_indices(df, escenario['tiendas'], 'tiendas', escenario['nombre'])
+    return conjuntos
+
+# -----------------------------------------------------------------------------
+# 3. EJECUCIÓN DE UN ESCENARIO (PROCESO TRABAJADOR)
+# -----------------------------------------------------------------------------
+# Conjuntos de datos del trabajador, asignados una vez por proceso en el inicializador
+# del pool (con 'fork' las páginas se comparten en solo lectura; las matrices en .bin
+# se envían como su ruta y cada trabajador las vuelve a abrir con np.memmap)
+_conjuntos_trabajador = None
+
+def _inicializar_lote(conjuntos):
+    global _conjuntos_trabajador
+    _conjuntos_trabajador = {}
+    for clave, (df, matriz_costos, matriz_distancias, depots) in conjuntos.items():
+        matriz_costos, matriz_distancias = (
+            routing_sa.cargar_matriz_binaria(matriz) if isinstance(matriz, str) else matriz
+            for matriz in (matriz_costos, matriz_distancias))
+        _conjuntos_trabajador[clave] = (df, matriz_costos, matriz_distancias, depots)
+
+@contextlib.contextmanager
+def parametros_temporales(parametros):
+    """Sobrescribe constantes de routing_sa y las restaura al salir."""
+    previos = {parametro: getattr(routing_sa, parametro) for parametro in parametros}
+    try:
+        for parametro, valor in parametros.items():
+            setattr(routing_sa, parametro, valor)
+        yield
+    finally:
+        for parametro, valor in previos.items():
+            setattr(routing_sa, parametro, valor)
+
+def resolver_escenario(escenario, directorio_salida):
+    """
+    Construye la solución inicial, ejecuta el recocido y escribe las rutas y el resumen
+    del escenario en directorio_salida/<nombre>/. Devuelve la fila del resumen del lote;
+    un error se reporta en la columna 'error' sin detener el resto del lote.
+    """
+    inicio = time.time()
+    fila = {'nombre': escenario['nombre'], 'tiendas': len(escenario['tiendas']),
+            'depots': len(escenario['depots'])}
+    try:
+        df, matriz_costos, matriz_distancias, depots_archivo = _conjuntos_trabajador[escenario['conjunto']]
+        with parametros_temporales(escenario['parametros']), contextlib.redirect_stdout(io.StringIO()):
+            rutas = routing_sa.crear_solucion_inicial(df, escenario['depots'], matriz_distancias,
+                                                      tiendas=escenario['tiendas'])
+            demandas = None
+            if routing_sa.CAPACIDAD_VEHICULO is not None:
+                demandas = routing_sa.calcular_demandas(df, depots_archivo)
+            vecinos = None
+            if routing_sa.USAR_LISTAS_VECINOS:
+                # Solo las tiendas del escenario pueden ser vecinas
+                fuera = np.setdiff1d(np.arange(len(df)), escenario['tiendas'])
+                vecinos = routing_sa.construir_indice_vecinos(matriz_distancias, fuera, routing_sa.K_VECINOS)
+            costo_inicial = routing_sa.calcular_metrica_total(rutas, matriz_costos)
+            estadisticas = {}
+            solucion, _ = routing_sa.recocido_simulado(rutas, matriz_costos, escenario['semilla'], False,
+                                                       vecinos, estadisticas=estadisticas, demandas=demandas)
+        carpeta = os.path.join(directorio_salida, escenario['nombre'])
+        os.makedirs(carpeta, exist_ok=True)
+        costo, distancia, vehiculos = routing_sa.guardar_resultados(
+            solucion, matriz_costos, matriz_distancias,
+            os.path.join(carpeta, routing_sa.ARCHIVO_SALIDA_RUTAS),
+            os.path.join(carpeta, routing_sa.ARCHIVO_SALIDA_RESUMEN),
+            os.path.join(carpeta, routing_sa.ARCHIVO_SALIDA_RUTAS_TIPADA),
+            os.path.join(carpeta, routing_sa.ARCHIVO_SALIDA_PARADAS))
+        fila.update(rutas=vehiculos, costo_inicial=costo_inicial, costo_total_combustible=costo,
+                    distancia_total_km=distancia,
+                    mejora_pct=100.0 * (1.0 - costo / costo_inicial) if costo_inicial > 0 else 0.0,
+                    motivo_parada=estadisticas.get('motivo_parada'), error=None)
+    except Exception as error:
+        fila['error'] = f"{type(error).__name__}: {error}"
+    fila['tiempo_s'] = time.time() - inicio
+    fila['proceso'] = os.getpid()
+    return fila
+
+# -----------------------------------------------------------------------------
+# 4. LOTE COMPLETO
+# -----------------------------------------------------------------------------
+def resolver_lote(escenarios, directorio_salida=None, num_procesos=None, mostrar_progreso=True):
+    """
+    Resuelve los escenarios (ver normalizar_escenario) en un pool de procesos, del más
+    grande al más chico para equilibrar la carga, y escribe el resumen consolidado.
+    Devuelve el DataFrame del resumen en el orden del manifiesto.
+    """
+    directorio_salida = DIRECTORIO_SALIDA if directorio_salida is None else directorio_salida
+    num_procesos = NUM_PROCESOS_LOTE if num_procesos is None else num_procesos
+    nombres = [escenario['nombre'] for escenario in escenarios]
+    repetidos = sorted({nombre for nombre in nombres if nombres.count(nombre) > 1})
+    if repetidos:
+        raise ValueError(f"Nombres de escenario repetidos: {repetidos}")
+
+    inicio = time.time()
+    conjuntos = cargar_conjuntos(escenarios)
+    if mostrar_progreso:
+        print(f"{len(escenarios)} escenarios, {len(conjuntos)} conjuntos de datos cargados "
+              f"({time.time() - inicio:.2f} segundos)")
+    referencias = {clave: (df, routing_sa._referencia_matriz(matriz_costos),
+                           routing_sa._referencia_matriz(matriz_distancias), depots)
+                   for clave, (df, matriz_costos, matriz_distancias, depots) in conjuntos.items()}
+
+    orden = sorted(range(len(escenarios)), key=lambda k: -len(escenarios[k]['tiendas']))
+    filas = [None] * len(escenarios)
+    with ProcessPoolExecutor(max_workers=num_procesos, initializer=_inicializar_lote,
+                             initargs=(referencias,)) as pool:
+        futuros = {pool.submit(resolver_escenario, escenarios[k], directorio_salida): k for k in orden}
+        for terminados, futuro in enumerate(as_completed(futuros), start=1):
+            k = futuros[futuro]
+            filas[k] = futuro.result()
+            if mostrar_progreso:
+                fila = filas[k]
+                estado = (f"ERROR {fila['error']}" if fila['error'] is not None
+                          else f"costo ${fila['costo_total_combustible']:,.2f} ({fila['mejora_pct']:.1f} % de mejora)")
+                print(f"[{terminados}/{len(escenarios)}] {fila['nombre']}: {estado} en {fila['tiempo_s']:.2f} s")
+
+    os.makedirs(directorio_salida, exist_ok=True)
+    resumen = pd.DataFrame(filas)
+    resumen.to_csv(os.path.join(directorio_salida, ARCHIVO_RESUMEN_LOTE), index=False)
+    if mostrar_progreso:
+        print(f"\nLote completado en {time.time() - inicio:.2f} segundos; "
+              f"{int(resumen['error'].notna().sum())} escenarios con error.")
+        print(f"Resumen guardado en -> {os.path.join(directorio_salida, ARCHIVO_RESUMEN_LOTE)}")
+    return resumen
+
+# -----------------------------------------------------------------------------
+# 5. SCRIPT PRINCIPAL
+# -----------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resuelve un lote de escenarios de routing_sa.")
+    parser.add_argument('manifiesto', help="Archivo JSON con los escenarios.")
+    parser.add_argument('--procesos', type=int, default=NUM_PROCESOS_LOTE,
+                        help="Procesos del pool (por defecto, todos los núcleos).")
+    parser.add_argument('--salida', default=None,
+                        help=f"Directorio de salida (por defecto, el del manifiesto o '{DIRECTORIO_SALIDA}').")
+    args = parser.parse_args()
+
+    escenarios, directorio_manifiesto = leer_manifiesto(args.manifiesto)
+    directorio = args.salida or directorio_manifiesto
+    resolver_lote(escenarios, directorio, args.procesos)
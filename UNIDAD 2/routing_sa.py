@@ -5,12 +5,29 @@ Utiliza un enfoque de clustering para asignar tiendas al Centro de Distribución
 y optimiza el conjunto completo de rutas.
 """
 
+import argparse
+import cProfile
+import functools
+import heapq
+import json
 import math
+import os
+import pstats
 import random
+import struct
 import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import numpy as np
 import pandas as pd
 
+try:
+    import numba  # Opcional: compila el kernel del recocido (USAR_KERNEL_COMPILADO)
+except ImportError:
+    numba = None
+
 # -----------------------------------------------------------------------------
 # 1. PARÁMETROS DE CONFIGURACIÓN
 # -----------------------------------------------------------------------------
@@ -18,25 +35,279 @@ ARCHIVO_UBICACIONES = 'Datos/datos_distribucion_tiendas.csv'
 ARCHIVO_COSTOS_COMBUSTIBLE = 'Datos/matriz_costos_combustible.csv'
 ARCHIVO_DISTANCIAS = 'Datos/matriz_distancias.csv'
 
+# Almacén binario de matrices (se genera una sola vez con convertir_matrices.py)
+USAR_MATRICES_BINARIAS = False  # True = abrir las matrices con np.memmap en lugar de leer los CSV
+ARCHIVO_COSTOS_BINARIO = 'Datos/matriz_costos_combustible.bin'
+ARCHIVO_DISTANCIAS_BINARIO = 'Datos/matriz_distancias.bin'
+PRECISION_MATRICES = 'float32'  # 'float32' ocupa la mitad que 'float64'
+
+# Proveedor de métrica: 'densa' usa las matrices N x N; 'haversine' calcula cada arista
+# bajo demanda a partir de las coordenadas (memoria O(N), para decenas de miles de tiendas)
+PROVEEDOR_METRICA = 'densa'
+COSTO_COMBUSTIBLE_POR_KM = 0.15   # Costo por km usado por el proveedor 'haversine'
+TAM_CACHE_ARISTAS = 1_000_000     # Aristas guardadas en la caché LRU del proveedor 'haversine'
+
+# Capacidad de los vehículos. La demanda de cada tienda es lo que vende limitado a lo
+# que puede almacenar: min(Capacidad_Venta, Capacidad_Almacenamiento)
+CAPACIDAD_VEHICULO = None  # None = una sola ruta por CD (comportamiento original)
+
+# Constructor de la solución inicial: 'cluster' (CD más cercano, ordenado por distancia)
+# o 'ahorros' (Clarke-Wright dentro de cada clúster)
+CONSTRUCTOR_INICIAL = 'cluster'
+VECINOS_AHORROS = 100  # Pares candidatos por tienda al calcular los ahorros
+
 # Parámetros del Algoritmo de Recocido Simulado
 TEMPERATURA_INICIAL = 1000.0
 TASA_ENFRIAMIENTO = 0.995
 ITERACIONES_POR_TEMPERATURA = 300
 TEMPERATURA_MINIMA = 0.1
 SEMILLA_ALEATORIA = 42
+
+# Esquema de enfriamiento: 'geometrico' (T *= TASA_ENFRIAMIENTO) o 'adaptativo', que enfría
+# más rápido cuando la tasa de aceptación supera el objetivo y más lento cuando queda por debajo
+ESQUEMA_ENFRIAMIENTO = 'geometrico'
+ACEPTACION_OBJETIVO_INICIAL = 0.8       # Tasa de aceptación buscada en el primer nivel
+DECAIMIENTO_ACEPTACION_OBJETIVO = 0.998  # El objetivo se multiplica por este factor en cada nivel
+
+# Recalentamiento: si el mejor costo no mejora en N niveles, T se multiplica por un factor
+NIVELES_SIN_MEJORA_RECALENTAR = None  # None = nunca recalentar
+FACTOR_RECALENTAMIENTO = 10.0
+MAX_RECALENTAMIENTOS = 5
+
+# Criterios de parada anticipada (None = desactivado)
+MAX_NIVELES_SIN_MEJORA = None  # Niveles consecutivos sin mejorar el mejor costo
+TIEMPO_MAXIMO_SEGUNDOS = None  # Presupuesto de tiempo de reloj para la optimización
+COSTO_OBJETIVO = None          # Detenerse al alcanzar este costo total
+
+# Calibración de la temperatura inicial a partir de deltas muestreados
+CALIBRAR_TEMPERATURA_INICIAL = False  # True = ignorar TEMPERATURA_INICIAL
+ACEPTACION_INICIAL_DESEADA = 0.8      # Probabilidad de aceptar un empeoramiento medio al inicio
+MUESTRAS_CALIBRACION = 1000           # Movimientos evaluados (sin aplicar) para calibrar
+
+# Operadores de vecindario del recorrido en Python: 'swap' (intercambio entre rutas),
+# '2opt' (inversión dentro de una ruta), 'relocate' (mover una tienda a otra ruta),
+# 'oropt' (mover un segmento dentro de su ruta) y 'cross' (intercambiar segmentos entre
+# rutas). El kernel compilado y el vecindario granular usan solo swap y 2-opt.
+OPERADORES_VECINDARIO = ['swap', '2opt', 'relocate', 'oropt', 'cross']
+LONGITUD_MAXIMA_SEGMENTO = 3  # Tiendas por segmento en or-opt y cross-exchange
+# Selección del operador: 'uniforme' (al azar, como antes), 'adaptativa' (ruleta según la
+# mejora reciente por movimiento evaluado) o 'adaptativa_tiempo' (mejora por segundo de
+# CPU; depende del tiempo medido, así que dos corridas con la misma semilla pueden diferir)
+SELECCION_OPERADORES = 'adaptativa'
+REACCION_OPERADORES = 0.2     # Peso del último nivel al actualizar la ruleta
+PESO_MINIMO_OPERADOR = 0.1    # Ningún operador baja de este peso (el máximo es 1)
+
+# Kernel compilado: recorre cada nivel de temperatura sobre arreglos int32 con Numba
+# (sin Numba se ejecuta el mismo código con NumPy, correcto pero lento)
+USAR_KERNEL_COMPILADO = False
+
+# Vecindario granular: proponer solo movimientos que crean una arista corta
+USAR_LISTAS_VECINOS = False  # False = posiciones uniformes al azar (comportamiento original)
+K_VECINOS = 10               # Tiendas más cercanas consideradas por nodo
+
+# Multi-arranque: cadenas de recocido independientes ejecutadas en paralelo
+NUM_CADENAS = 1      # 1 = una sola cadena con SEMILLA_ALEATORIA (ejecución clásica)
+NUM_PROCESOS = None  # Procesos del pool (None = todos los núcleos disponibles)
+
+# Intercambio de réplicas: K cadenas a temperatura fija que intercambian estados
+NUM_REPLICAS = 1                       # > 1 activa el intercambio de réplicas
+RONDAS_INTERCAMBIO = 100               # Rondas de intercambio entre temperaturas vecinas
+ITERACIONES_ENTRE_INTERCAMBIOS = 2000  # Movimientos por réplica en cada ronda
+TEMPERATURA_MAXIMA_REPLICAS = None     # None = T0 calibrada (ver calibrar_temperatura_inicial)
+RAZON_MAXIMA_ESCALERA = 1.25           # Razón máxima entre temperaturas vecinas
+
+# Instrumentación: métricas por nivel de temperatura (conteos por tipo de movimiento,
+# tiempo, trayectoria de costo e histograma de deltas) en un buffer circular
+INSTRUMENTACION = False                        # False = sin ningún registro en el ciclo
+ARCHIVO_METRICAS = 'metricas_recocido.jsonl'   # '.parquet' escribe Parquet (requiere pyarrow)
+TAM_BUFFER_METRICAS = 1024                     # Niveles en memoria antes de escribir al archivo
+BORDES_HISTOGRAMA_DELTAS = [-np.inf, -10.0, -1.0, -0.1, -0.01, -0.001, 0.0,
+                            0.001, 0.01, 0.1, 1.0, 10.0, np.inf]
+PERFILADOR = None             # None, 'cprofile' o 'pyinstrument' (alrededor del ciclo de temperaturas)
+ARCHIVO_PERFIL = 'perfil_recocido'  # Se agrega .prof (cProfile) o .html (pyinstrument)
+
+# Checkpoints del recocido (--resume continúa desde ARCHIVO_CHECKPOINT)
+ARCHIVO_CHECKPOINT = 'checkpoint_recocido.npz'
+INTERVALO_CHECKPOINT_SEGUNDOS = None  # None = sin checkpoints; p. ej. 60.0 en corridas largas
+
+# Reoptimización incremental (--incremental): parte de las rutas de la ejecución anterior
+ACEPTACION_INCREMENTAL = 0.2  # Aceptación inicial del recocido local (T0 calibrada con ella)
+
+# Salida tipada junto al CSV: tabla de rutas y tabla de paradas (una fila por visita, con
+# distancia y costo acumulados) con columnas numéricas. '.parquet' o '.feather' (requiere pyarrow;
+# sin él solo se escribe el CSV)
+GUARDAR_SALIDA_TIPADA = True
+ARCHIVO_SALIDA_RUTAS_TIPADA = 'rutas_optimizadas.parquet'
+ARCHIVO_SALIDA_PARADAS = 'paradas_optimizadas.parquet'
+
 ARCHIVO_SALIDA_RUTAS = 'rutas_optimizadas.csv'
 ARCHIVO_SALIDA_RESUMEN = 'resumen_optimizacion.csv'
+ARCHIVO_SALIDA_UBICACIONES = 'ubicaciones_optimizadas.csv'  # Ubicaciones usadas en la última ejecución
 
 # -----------------------------------------------------------------------------
 # 2. FUNCIONES UTILITARIAS Y DE CARGA DE DATOS
 # -----------------------------------------------------------------------------
-def cargar_datos(path_ubicaciones, path_costos, path_distancias):
+# Encabezado del almacén binario: firma, versión, número de nodos, tipo de dato y
+# CRC32 de los datos. Los datos van a continuación en orden C (fila por fila).
+FIRMA_MATRIZ = b'RSAMATRZ'
+VERSION_MATRIZ = 1
+FORMATO_ENCABEZADO = '<8sIQ8sI'
+TAM_ENCABEZADO = 64
+
+def escribir_matriz_binaria(path_binario, bloques, dtype=PRECISION_MATRICES):
+    """
+    Escribe el almacén binario a partir de un iterable de bloques de filas (arreglos
+    2D), de modo que nunca se tiene la matriz completa en memoria. Devuelve el número
+    de nodos.
+    """
+    dtype = np.dtype(dtype)
+    n = 0
+    crc = 0
+    columnas = 0
+    with open(path_binario, 'wb') as archivo:
+        archivo.write(b'\0' * TAM_ENCABEZADO)  # Se completa al final
+        for bloque in bloques:
+            bloque = np.ascontiguousarray(bloque, dtype=dtype)
+            datos = bloque.tobytes()
+            crc = zlib.crc32(datos, crc)
+            archivo.write(datos)
+            n += bloque.shape[0]
+            columnas = bloque.shape[1]
+        if n != columnas:
+            raise ValueError(f"La matriz de {path_binario} no es cuadrada ({n} x {columnas}).")
+        archivo.seek(0)
+        archivo.write(struct.pack(FORMATO_ENCABEZADO, FIRMA_MATRIZ, VERSION_MATRIZ, n,
+                                  dtype.str.encode('ascii'), crc))
+    return n
+
+def convertir_matriz_a_binario(path_csv, path_binario, dtype=PRECISION_MATRICES, filas_por_bloque=1024):
+    """Convierte una matriz CSV al almacén binario leyéndola por bloques de filas."""
+    bloques = (bloque.to_numpy(dtype=dtype)
+               for bloque in pd.read_csv(path_csv, header=0, chunksize=filas_por_bloque))
+    return escribir_matriz_binaria(path_binario, bloques, dtype)
+
+def leer_encabezado_matriz(path_binario):
+    with open(path_binario, 'rb') as archivo:
+        encabezado = archivo.read(TAM_ENCABEZADO)
+    firma, version, n, dtype, crc = struct.unpack_from(FORMATO_ENCABEZADO, encabezado)
+    if firma != FIRMA_MATRIZ or version != VERSION_MATRIZ:
+        raise ValueError(f"{path_binario} no es un almacén de matriz válido (versión {VERSION_MATRIZ}).")
+    return n, np.dtype(dtype.rstrip(b'\0').decode('ascii')), crc
+
+def cargar_matriz_binaria(path_binario, verificar=False):
+    """
+    Abre la matriz con np.memmap (solo lectura): el arranque no lee los datos y los
+    procesos que abren el mismo archivo comparten las páginas del sistema operativo.
+    Con verificar=True recalcula el CRC32 (recorre todo el archivo).
+    Devuelve un ndarray sobre el mapeo (su .base es el np.memmap), porque indexar
+    elementos sueltos de un np.memmap es varias veces más lento.
+    """
+    n, dtype, crc = leer_encabezado_matriz(path_binario)
+    esperado = TAM_ENCABEZADO + n * n * dtype.itemsize
+    if os.path.getsize(path_binario) != esperado:
+        raise ValueError(f"{path_binario} está truncado: se esperaban {esperado} bytes.")
+    matriz = np.memmap(path_binario, dtype=dtype, mode='r', offset=TAM_ENCABEZADO, shape=(n, n))
+    if verificar:
+        crc_calculado = 0
+        for inicio in range(0, n, 1024):
+            crc_calculado = zlib.crc32(matriz[inicio:inicio + 1024].tobytes(), crc_calculado)
+        if crc_calculado != crc:
+            raise ValueError(f"El checksum de {path_binario} no coincide; vuelve a generarlo.")
+    return np.asarray(matriz)
+
+def cargar_matriz(path):
+    if path.endswith('.bin'):
+        return cargar_matriz_binaria(path)
+    return pd.read_csv(path, header=0).to_numpy()
+
+# -----------------------------------------------------------------------------
+# 2.1 PROVEEDORES DE MÉTRICA
+# -----------------------------------------------------------------------------
+# Todo el código que evalúa costos (calcular_metrica_ruta, delta_movimiento, la
+# solución inicial, SolucionCompacta) solo usa 'metrica[i, j]' con enteros o arreglos
+# de índices y 'metrica.shape'. Una matriz de NumPy ya cumple esa interfaz y es el
+# proveedor denso; MetricaHaversine la cumple sin guardar la matriz.
+RADIO_TIERRA_KM = 6371.0
+
+class MetricaHaversine:
+    """
+    Distancia de gran círculo entre ubicaciones, multiplicada por 'factor' (1.0 para
+    km, o el costo de combustible por km). Las consultas escalares pasan por una caché
+    LRU de aristas; las consultas con arreglos se calculan vectorizadas.
+    """
+
+    def __init__(self, latitudes, longitudes, factor=1.0, tam_cache=TAM_CACHE_ARISTAS):
+        self.lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+        self.lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+        self.factor = factor
+        self.tam_cache = tam_cache
+        self.shape = (len(self.lat), len(self.lat))
+        self._preparar_cache()
+
+    def _preparar_cache(self):
+        # Listas de Python: el acceso escalar es más rápido que con arreglos de NumPy
+        self._lat = self.lat.tolist()
+        self._lon = self.lon.tolist()
+        self._cos_lat = np.cos(self.lat).tolist()
+        self._arista = functools.lru_cache(maxsize=self.tam_cache)(self._calcular_arista)
+
+    def _calcular_arista(self, i, j):
+        seno_lat = math.sin((self._lat[j] - self._lat[i]) * 0.5)
+        seno_lon = math.sin((self._lon[j] - self._lon[i]) * 0.5)
+        a = seno_lat * seno_lat + self._cos_lat[i] * self._cos_lat[j] * seno_lon * seno_lon
+        return self.factor * 2.0 * RADIO_TIERRA_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+    def __getitem__(self, indices):
+        if not isinstance(indices, tuple):
+            indices = (indices, slice(None))  # metrica[filas] -> bloque de filas completas
+        i, j = indices
+        if isinstance(i, (int, np.integer)) and isinstance(j, (int, np.integer)):
+            # La métrica es simétrica: una sola entrada de caché por arista
+            return self._arista(int(i), int(j)) if i <= j else self._arista(int(j), int(i))
+        fila = isinstance(i, slice) or np.ndim(i) > 0
+        columna = isinstance(j, slice) or np.ndim(j) > 0
+        lat_i, lon_i = self.lat[i], self.lon[i]
+        lat_j, lon_j = self.lat[j], self.lon[j]
+        if isinstance(i, slice) and columna:
+            lat_i, lon_i = lat_i[:, None], lon_i[:, None]  # Bloque (filas x columnas)
+        elif fila and isinstance(j, slice):
+            lat_i, lon_i = np.asarray(lat_i)[..., None], np.asarray(lon_i)[..., None]
+        a = (np.sin((lat_j - lat_i) * 0.5) ** 2
+             + np.cos(lat_i) * np.cos(lat_j) * np.sin((lon_j - lon_i) * 0.5) ** 2)
+        return self.factor * 2.0 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def __getstate__(self):
+        # La caché no se serializa: cada proceso trabajador arma la suya
+        return {'lat': self.lat, 'lon': self.lon, 'factor': self.factor,
+                'tam_cache': self.tam_cache, 'shape': self.shape}
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._preparar_cache()
+
+def crear_metricas_haversine(df_ubicaciones, costo_por_km=None, tam_cache=None):
+    """Devuelve (metrica_costos, metrica_distancias) calculadas bajo demanda."""
+    costo_por_km = COSTO_COMBUSTIBLE_POR_KM if costo_por_km is None else costo_por_km
+    tam_cache = TAM_CACHE_ARISTAS if tam_cache is None else tam_cache
+    latitudes = df_ubicaciones['Latitud_WGS84'].to_numpy()
+    longitudes = df_ubicaciones['Longitud_WGS84'].to_numpy()
+    return (MetricaHaversine(latitudes, longitudes, costo_por_km, tam_cache),
+            MetricaHaversine(latitudes, longitudes, 1.0, tam_cache))
+
+def cargar_datos(path_ubicaciones, path_costos, path_distancias, proveedor='densa'):
     print("Cargando datos...")
     try:
         df_ubicaciones = pd.read_csv(path_ubicaciones, encoding='latin1')
         indices_depots = list(df_ubicaciones[df_ubicaciones['Tipo'] == 'Centro de Distribución'].index)
-        matriz_costos = pd.read_csv(path_costos, header=0).to_numpy()
-        matriz_distancias = pd.read_csv(path_distancias, header=0).to_numpy()
+        if proveedor == 'haversine':
+            matriz_costos, matriz_distancias = crear_metricas_haversine(df_ubicaciones)
+        else:
+            matriz_costos = cargar_matriz(path_costos)
+            matriz_distancias = cargar_matriz(path_distancias)
+        for matriz in (matriz_costos, matriz_distancias):
+            if matriz.shape[0] != len(df_ubicaciones):
+                raise ValueError(f"Las matrices tienen {matriz.shape[0]} nodos y hay "
+                                 f"{len(df_ubicaciones)} ubicaciones.")
         print(f"Datos cargados: {len(df_ubicaciones)} ubicaciones encontradas.")
         print(f"{len(indices_depots)} Centros de Distribución identificados en los índices: {indices_depots}")
         return df_ubicaciones, matriz_costos, matriz_distancias, indices_depots
@@ -49,123 +320,1756 @@ def cargar_datos(path_ubicaciones, path_costos, path_distancias):
 # 3. CREACIÓN DE LA SOLUCIÓN INICIAL (MÉTODO POR CLUSTER)
 # -----------------------------------------------------------------------------
 
-def crear_solucion_inicial_por_cluster(df_ubicaciones, depots, matriz_distancias):
+def calcular_demandas(df_ubicaciones, depots):
+    """Demanda por nodo (float64): min(Capacidad_Venta, Capacidad_Almacenamiento); 0 en los CD."""
+    demandas = np.minimum(df_ubicaciones['Capacidad_Venta'].to_numpy(dtype=np.float64),
+                          df_ubicaciones['Capacidad_Almacenamiento'].to_numpy(dtype=np.float64))
+    demandas[depots] = 0.0
+    return demandas
+
+def asignar_tiendas_a_depots(matriz_distancias, tiendas, depots, tam_bloque=None):
+    """
+    Posición (en 'depots') del CD más cercano a cada tienda: un argmin por filas de la
+    submatriz tiendas x CD, calculada por bloques para acotar la memoria.
+    """
+    if tam_bloque is None:
+        tam_bloque = max(1, 2**22 // max(1, len(depots)))
+    asignacion = np.empty(len(tiendas), dtype=np.int64)
+    for inicio in range(0, len(tiendas), tam_bloque):
+        bloque = tiendas[inicio:inicio + tam_bloque]
+        asignacion[inicio:inicio + len(bloque)] = np.argmin(
+            matriz_distancias[np.ix_(bloque, depots)], axis=1)
+    return asignacion
+
+def dividir_por_barrido(depot, tiendas, demandas, capacidad, latitudes, longitudes):
+    """
+    Heurística de barrido: ordena las tiendas del clúster por ángulo alrededor del CD
+    (empezando después del mayor hueco angular) y abre una ruta nueva cada vez que la
+    siguiente tienda excede la capacidad. Una tienda con demanda mayor a la capacidad
+    queda sola en su ruta.
+    """
+    angulos = np.arctan2(latitudes[tiendas] - latitudes[depot],
+                         (longitudes[tiendas] - longitudes[depot]) * math.cos(math.radians(latitudes[depot])))
+    orden = np.argsort(angulos, kind='stable')
+    if len(orden) > 1:
+        huecos = np.diff(angulos[orden], append=angulos[orden[0]] + 2 * math.pi)
+        orden = np.roll(orden, -(int(np.argmax(huecos)) + 1))
+    rutas = []
+    ruta, carga = [depot], 0.0
+    for tienda, demanda in zip(tiendas[orden].tolist(), demandas[tiendas[orden]].tolist()):
+        if len(ruta) > 1 and carga + demanda > capacidad:
+            rutas.append(ruta + [depot])
+            ruta, carga = [depot], 0.0
+        ruta.append(tienda)
+        carga += demanda
+    rutas.append(ruta + [depot])
+    return rutas
+
+def seleccionar_tiendas(df_ubicaciones, depots, tiendas=None):
+    """Índices (ordenados) de las tiendas a visitar: 'tiendas' o todo lo que no es CD."""
+    if tiendas is not None:
+        return np.unique(np.asarray(tiendas, dtype=np.int64))
+    es_depot = np.zeros(len(df_ubicaciones), dtype=bool)
+    es_depot[np.asarray(depots, dtype=np.int64)] = True
+    return np.flatnonzero(~es_depot)
+
+def crear_solucion_inicial_por_cluster(df_ubicaciones, depots, matriz_distancias, capacidad_vehiculo=None,
+                                       tiendas=None):
+    """
+    Asigna cada tienda al CD más cercano (argmin vectorizado). Sin capacidad, cada
+    clúster es una ruta ordenada por distancia al CD; con capacidad, el clúster se
+    divide en rutas de vehículo con la heurística de barrido. 'tiendas' limita las
+    tiendas a visitar (por defecto, todas las ubicaciones que no están en 'depots').
+    """
     print("Creando solución inicial por clúster...")
-    # Identifica los índices de las tiendas (nodos que no son CD)
-    indices_tiendas = list(set(df_ubicaciones.index) - set(depots))
-    clusters = {depot_idx: [] for depot_idx in depots}
-    # Asigna cada tienda al CD con la distancia mínima
-    for tienda_idx in indices_tiendas:
-        distancias_a_depots = matriz_distancias[tienda_idx, depots] # Distancias de la tienda a todos los CD
-        depot_mas_cercano_idx_en_lista = np.argmin(distancias_a_depots) # Encuentra el índice del CD más cercano en la lista 'depots'
-        depot_real_idx = depots[depot_mas_cercano_idx_en_lista]# Obtiene el índice real del CD
-        clusters[depot_real_idx].append(tienda_idx)# Agrupa la tienda al CD más cercano
-        
+    capacidad_vehiculo = CAPACIDAD_VEHICULO if capacidad_vehiculo is None else capacidad_vehiculo
+    depots_arr = np.asarray(depots, dtype=np.int64)
+    tiendas = seleccionar_tiendas(df_ubicaciones, depots_arr, tiendas)
+    asignacion = asignar_tiendas_a_depots(matriz_distancias, tiendas, depots_arr)
+
+    # Agrupa las tiendas por CD conservando el orden de índice dentro de cada grupo
+    orden = np.argsort(asignacion, kind='stable')
+    limites = np.concatenate(([0], np.cumsum(np.bincount(asignacion, minlength=len(depots)))))
+    if capacidad_vehiculo is not None:
+        demandas = calcular_demandas(df_ubicaciones, depots_arr)
+        latitudes = df_ubicaciones['Latitud_WGS84'].to_numpy(dtype=np.float64)
+        longitudes = df_ubicaciones['Longitud_WGS84'].to_numpy(dtype=np.float64)
+
     solucion_inicial = []
-    
-    # Construye las rutas para cada clúster (CD)
-    for depot_idx, tiendas_asignadas in clusters.items():
-        if tiendas_asignadas:
-            
-            # Ordena las tiendas asignadas por su distancia al CD (del más cercano al más lejano)
-            tiendas_ordenadas_por_distancia = sorted(
-                tiendas_asignadas,
-                key=lambda tienda: matriz_distancias[depot_idx, tienda] 
-            )
-            
-            # Formato de la ruta: [CD, Tienda_1, ..., Tienda_N, CD]
-            ruta = [depot_idx] + tiendas_ordenadas_por_distancia + [depot_idx]
-            solucion_inicial.append(ruta)
-            
+    for k, depot_idx in enumerate(depots):
+        tiendas_asignadas = tiendas[orden[limites[k]:limites[k + 1]]]
+        if len(tiendas_asignadas) == 0:
+            continue
+        if capacidad_vehiculo is None:
+            # Del más cercano al más lejano, formato [CD, Tienda_1, ..., Tienda_N, CD]
+            distancias = np.asarray(matriz_distancias[depot_idx, tiendas_asignadas])
+            tiendas_ordenadas = tiendas_asignadas[np.argsort(distancias, kind='stable')]
+            solucion_inicial.append([depot_idx] + tiendas_ordenadas.tolist() + [depot_idx])
+        else:
+            solucion_inicial.extend(dividir_por_barrido(depot_idx, tiendas_asignadas, demandas,
+                                                        capacidad_vehiculo, latitudes, longitudes))
     return solucion_inicial
 
+# -----------------------------------------------------------------------------
+# 3.1 SOLUCIÓN INICIAL POR AHORROS (CLARKE-WRIGHT)
+# -----------------------------------------------------------------------------
+def calcular_ahorros(matriz_distancias, depot, tiendas, k=None, tam_bloque=None):
+    """
+    Ahorros s(i, j) = d(CD, i) + d(CD, j) - d(i, j) de unir dos tiendas del clúster,
+    calculados por bloques de filas. Por tienda solo se conservan sus k mejores pares,
+    así la memoria es O(m * k) aunque el clúster sea grande.
+    Devuelve (i, j, ahorro) con i < j (índices globales) y ahorro > 0.
+    """
+    k = VECINOS_AHORROS if k is None else k
+    m = len(tiendas)
+    k = min(k, m - 1)
+    if k < 1:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    if tam_bloque is None:
+        tam_bloque = max(1, 2**22 // m)
+    al_depot = np.asarray(matriz_distancias[depot, tiendas], dtype=np.float64)
+    filas, columnas, ahorros = [], [], []
+    for inicio in range(0, m, tam_bloque):
+        fin = min(inicio + tam_bloque, m)
+        bloque = al_depot[inicio:fin, None] + al_depot[None, :] - np.asarray(
+            matriz_distancias[np.ix_(tiendas[inicio:fin], tiendas)], dtype=np.float64)
+        bloque[np.arange(fin - inicio), np.arange(inicio, fin)] = -np.inf  # Sin pares (i, i)
+        candidatos = np.argpartition(-bloque, k - 1, axis=1)[:, :k] if k < m - 1 else \
+            np.broadcast_to(np.arange(m), (fin - inicio, m))
+        filas.append(np.repeat(np.arange(inicio, fin), candidatos.shape[1]))
+        columnas.append(candidatos.ravel())
+        ahorros.append(np.take_along_axis(bloque, candidatos, axis=1).ravel())
+    filas, columnas, ahorros = np.concatenate(filas), np.concatenate(columnas), np.concatenate(ahorros)
+    # Cada par puede aparecer desde sus dos extremos: se normaliza a i < j y se deduplica
+    i, j = np.minimum(filas, columnas), np.maximum(filas, columnas)
+    validos = (i != j) & (ahorros > 0)
+    _, unicos = np.unique(i[validos] * m + j[validos], return_index=True)
+    i, j, ahorros = i[validos][unicos], j[validos][unicos], ahorros[validos][unicos]
+    return tiendas[i], tiendas[j], ahorros
+
+def _raiz(padre, nodo):
+    while padre[nodo] != nodo:
+        padre[nodo] = padre[padre[nodo]]  # Compresión de caminos a la mitad
+        nodo = padre[nodo]
+    return nodo
+
+def ahorros_clarke_wright(depot, tiendas, matriz_distancias, demandas, capacidad):
+    """
+    Clarke-Wright para un CD: cada tienda empieza en su propia ruta y los pares se
+    procesan en una cola de prioridad (heap) de mayor a menor ahorro. Dos rutas se
+    unen si i y j son extremos de rutas distintas (union-find) y la carga cabe.
+    La ruta menor se agrega al extremo correspondiente de la mayor (deque), de modo
+    que cada unión cuesta O(tamaño de la menor).
+    """
+    i, j, ahorros = calcular_ahorros(matriz_distancias, depot, tiendas)
+    cola = list(zip((-ahorros).tolist(), i.tolist(), j.tolist()))
+    heapq.heapify(cola)
+
+    padre = {t: t for t in tiendas.tolist()}
+    rutas = {t: deque([t]) for t in padre}
+    cargas = {t: float(demandas[t]) for t in padre}
+    while cola:
+        _, a, b = heapq.heappop(cola)
+        raiz_a, raiz_b = _raiz(padre, a), _raiz(padre, b)
+        if raiz_a == raiz_b or cargas[raiz_a] + cargas[raiz_b] > capacidad:
+            continue
+        ruta_a, ruta_b = rutas[raiz_a], rutas[raiz_b]
+        if a not in (ruta_a[0], ruta_a[-1]) or b not in (ruta_b[0], ruta_b[-1]):
+            continue  # Solo se unen extremos
+        if len(ruta_a) < len(ruta_b):
+            a, b, raiz_a, raiz_b, ruta_a, ruta_b = b, a, raiz_b, raiz_a, ruta_b, ruta_a
+        # 'b' debe quedar junto a 'a': se orienta la ruta menor y se pega en ese extremo
+        if a == ruta_a[-1]:
+            if b != ruta_b[0]:
+                ruta_b.reverse()
+            ruta_a.extend(ruta_b)
+        else:
+            if b != ruta_b[-1]:
+                ruta_b.reverse()
+            ruta_a.extendleft(reversed(ruta_b))
+        padre[raiz_b] = raiz_a
+        cargas[raiz_a] += cargas.pop(raiz_b)
+        del rutas[raiz_b]
+    return [[depot] + list(ruta) + [depot] for ruta in rutas.values()]
+
+def crear_solucion_inicial_por_ahorros(df_ubicaciones, depots, matriz_distancias, capacidad_vehiculo=None,
+                                       tiendas=None):
+    """
+    Versión multi-depósito de Clarke-Wright: las tiendas se asignan al CD más cercano
+    (como en el clúster) y cada clúster se resuelve con ahorros. Sin capacidad cada
+    clúster queda en una sola ruta salvo que sus pares candidatos (VECINOS_AHORROS)
+    no alcancen a unirlo todo. 'tiendas' como en crear_solucion_inicial_por_cluster.
+    """
+    print("Creando solución inicial por ahorros (Clarke-Wright)...")
+    capacidad_vehiculo = CAPACIDAD_VEHICULO if capacidad_vehiculo is None else capacidad_vehiculo
+    capacidad = math.inf if capacidad_vehiculo is None else capacidad_vehiculo
+    depots_arr = np.asarray(depots, dtype=np.int64)
+    tiendas = seleccionar_tiendas(df_ubicaciones, depots_arr, tiendas)
+    asignacion = asignar_tiendas_a_depots(matriz_distancias, tiendas, depots_arr)
+    demandas = calcular_demandas(df_ubicaciones, depots_arr)
+
+    solucion_inicial = []
+    for k, depot_idx in enumerate(depots):
+        tiendas_asignadas = tiendas[asignacion == k]
+        if len(tiendas_asignadas) > 0:
+            solucion_inicial.extend(ahorros_clarke_wright(depot_idx, tiendas_asignadas,
+                                                          matriz_distancias, demandas, capacidad))
+    return solucion_inicial
+
+def crear_solucion_inicial(df_ubicaciones, depots, matriz_distancias, constructor=None, tiendas=None):
+    """Construye la solución inicial con CONSTRUCTOR_INICIAL ('cluster' o 'ahorros')."""
+    constructor = CONSTRUCTOR_INICIAL if constructor is None else constructor
+    if constructor == 'ahorros':
+        return crear_solucion_inicial_por_ahorros(df_ubicaciones, depots, matriz_distancias, tiendas=tiendas)
+    if constructor == 'cluster':
+        return crear_solucion_inicial_por_cluster(df_ubicaciones, depots, matriz_distancias, tiendas=tiendas)
+    raise ValueError(f"Constructor inicial desconocido: {constructor!r} (usa 'cluster' o 'ahorros').")
+
 # -----------------------------------------------------------------------------
 # 4. FUNCIÓN OBJETIVO Y MOVIMIENTOS DE VECINDARIO
 # -----------------------------------------------------------------------------
 def calcular_metrica_ruta(ruta, matriz):
     total = 0.0
     for i in range(len(ruta) - 1):
-        total += matriz[ruta[i], ruta[i+1]]
+        total += float(matriz[ruta[i], ruta[i+1]])  # Acumula en float64 aunque la matriz sea float32
     return total
 
 def calcular_metrica_total(rutas, matriz):
     return sum(calcular_metrica_ruta(r, matriz) for r in rutas)
 
-def generar_vecino(rutas):
-    if not rutas or len(rutas) == 0:
-        return []
-    
-    nuevas_rutas = [r.copy() for r in rutas]
-    tipo_movimiento = random.choice(['swap', '2opt',])
+def elegir_movimiento(rutas, rng=random, tipo_movimiento=None):
+    """
+    Elige un movimiento aleatorio del tipo dado (o de uno de OPERADORES_VECINDARIO al
+    azar) sin modificar las rutas. Devuelve una tupla que describe el movimiento o
+    None si el movimiento elegido no es aplicable:
+        ('swap', ruta1, i, ruta2, j)          intercambia ruta1[i] y ruta2[j]
+        ('2opt', ruta, i, j)                  invierte ruta[i..j]
+        ('relocate', ruta1, i, ruta2, j)      mueve ruta1[i] antes de ruta2[j]
+        ('oropt', ruta, i, l, j, invertir)    mueve ruta[i:i+l] antes de ruta[j]
+        ('cross', ruta1, i, l1, ruta2, j, l2) intercambia ruta1[i:i+l1] y ruta2[j:j+l2]
+    """
+    if not rutas:
+        return None
+
+    if tipo_movimiento is None:
+        tipo_movimiento = rng.choice(OPERADORES_VECINDARIO)
 
-    if tipo_movimiento == 'swap' and len(nuevas_rutas) > 1:
-        idx_ruta1, idx_ruta2 = random.sample(range(len(nuevas_rutas)), 2)
-        ruta1, ruta2 = nuevas_rutas[idx_ruta1], nuevas_rutas[idx_ruta2]
+    if tipo_movimiento == 'swap' and len(rutas) > 1:
+        idx_ruta1, idx_ruta2 = rng.sample(range(len(rutas)), 2)
+        ruta1, ruta2 = rutas[idx_ruta1], rutas[idx_ruta2]
         if len(ruta1) > 2 and len(ruta2) > 2:  # Ambas deben tener tiendas
-            idx_tienda1 = random.randint(1, len(ruta1) - 2)
-            idx_tienda2 = random.randint(1, len(ruta2) - 2)
-            ruta1[idx_tienda1], ruta2[idx_tienda2] = ruta2[idx_tienda2], ruta1[idx_tienda1]
+            idx_tienda1 = rng.randint(1, len(ruta1) - 2)
+            idx_tienda2 = rng.randint(1, len(ruta2) - 2)
+            return ('swap', idx_ruta1, idx_tienda1, idx_ruta2, idx_tienda2)
 
     elif tipo_movimiento == '2opt':
-        idx_ruta = random.randrange(len(nuevas_rutas))
-        ruta = nuevas_rutas[idx_ruta]
+        idx_ruta = rng.randrange(len(rutas))
+        ruta = rutas[idx_ruta]
         if len(ruta) > 4:  # Necesita al menos 2 tiendas para hacer 2-opt
-            i, j = random.sample(range(1, len(ruta) - 1), 2)
+            i, j = rng.sample(range(1, len(ruta) - 1), 2)
             if i > j: i, j = j, i
-            ruta[i:j+1] = list(reversed(ruta[i:j+1]))
+            return ('2opt', idx_ruta, i, j)
+
+    elif tipo_movimiento == 'relocate' and len(rutas) > 1:
+        idx_ruta1, idx_ruta2 = rng.sample(range(len(rutas)), 2)
+        ruta1 = rutas[idx_ruta1]
+        if len(ruta1) > 2:  # La ruta destino puede estar vacía
+            idx_tienda = rng.randint(1, len(ruta1) - 2)
+            posicion = rng.randint(1, len(rutas[idx_ruta2]) - 1)
+            return ('relocate', idx_ruta1, idx_tienda, idx_ruta2, posicion)
+
+    elif tipo_movimiento == 'oropt':
+        idx_ruta = rng.randrange(len(rutas))
+        tiendas = len(rutas[idx_ruta]) - 2
+        longitud = rng.randint(1, LONGITUD_MAXIMA_SEGMENTO)
+        if tiendas > longitud:
+            i = rng.randint(1, tiendas - longitud + 1)
+            # Arista de inserción (ruta[j-1], ruta[j]) que no toca el segmento
+            j = rng.randint(1, tiendas - longitud)
+            if j >= i:
+                j += longitud + 1
+            return ('oropt', idx_ruta, i, longitud, j, rng.random() < 0.5)
+
+    elif tipo_movimiento == 'cross' and len(rutas) > 1:
+        idx_ruta1, idx_ruta2 = rng.sample(range(len(rutas)), 2)
+        ruta1, ruta2 = rutas[idx_ruta1], rutas[idx_ruta2]
+        longitud1 = rng.randint(1, LONGITUD_MAXIMA_SEGMENTO)
+        longitud2 = rng.randint(1, LONGITUD_MAXIMA_SEGMENTO)
+        if len(ruta1) - 2 >= longitud1 and len(ruta2) - 2 >= longitud2:
+            i = rng.randint(1, len(ruta1) - 1 - longitud1)
+            j = rng.randint(1, len(ruta2) - 1 - longitud2)
+            return ('cross', idx_ruta1, i, longitud1, idx_ruta2, j, longitud2)
+
+    return None
+
+def delta_movimiento(rutas, movimiento, matriz):
+    """
+    Calcula el cambio de costo de un movimiento usando solo las aristas que toca
+    (4 para swap, 2 para 2-opt, 3 para relocate y or-opt, 4 para cross-exchange;
+    se asume matriz simétrica). Cada arista se lee como float64, igual que en
+    calcular_metrica_ruta, para que el costo acumulado no se desvíe con matrices float32.
+    """
+    if movimiento is None:
+        return 0.0
+
+    if movimiento[0] == 'swap':
+        _, idx_ruta1, i, idx_ruta2, j = movimiento
+        ruta1, ruta2 = rutas[idx_ruta1], rutas[idx_ruta2]
+        a, b = ruta1[i], ruta2[j]
+        ant1, sig1 = ruta1[i - 1], ruta1[i + 1]
+        ant2, sig2 = ruta2[j - 1], ruta2[j + 1]
+        agregado = (float(matriz[ant1, b]) + float(matriz[b, sig1])
+                    + float(matriz[ant2, a]) + float(matriz[a, sig2]))
+        removido = (float(matriz[ant1, a]) + float(matriz[a, sig1])
+                    + float(matriz[ant2, b]) + float(matriz[b, sig2]))
+        return agregado - removido
+
+    if movimiento[0] == '2opt':
+        # Invertir ruta[i..j] solo cambia las aristas de los extremos
+        _, idx_ruta, i, j = movimiento
+        ruta = rutas[idx_ruta]
+        agregado = float(matriz[ruta[i - 1], ruta[j]]) + float(matriz[ruta[i], ruta[j + 1]])
+        removido = float(matriz[ruta[i - 1], ruta[i]]) + float(matriz[ruta[j], ruta[j + 1]])
+        return agregado - removido
+
+    if movimiento[0] == 'relocate':
+        _, idx_ruta1, i, idx_ruta2, j = movimiento
+        ruta1, ruta2 = rutas[idx_ruta1], rutas[idx_ruta2]
+        a, ant, sig = ruta1[i], ruta1[i - 1], ruta1[i + 1]
+        x, y = ruta2[j - 1], ruta2[j]
+        agregado = float(matriz[ant, sig]) + float(matriz[x, a]) + float(matriz[a, y])
+        removido = float(matriz[ant, a]) + float(matriz[a, sig]) + float(matriz[x, y])
+        return agregado - removido
+
+    if movimiento[0] == 'oropt':
+        # El segmento sale de entre 'ant' y 'sig' y entra entre 'x' e 'y'
+        _, idx_ruta, i, longitud, j, invertir = movimiento
+        ruta = rutas[idx_ruta]
+        primera, ultima = ruta[i], ruta[i + longitud - 1]
+        ant, sig = ruta[i - 1], ruta[i + longitud]
+        x, y = ruta[j - 1], ruta[j]
+        removido = float(matriz[ant, primera]) + float(matriz[ultima, sig]) + float(matriz[x, y])
+        if invertir:
+            primera, ultima = ultima, primera
+        agregado = float(matriz[ant, sig]) + float(matriz[x, primera]) + float(matriz[ultima, y])
+        return agregado - removido
+
+    # cross-exchange: solo cambian las aristas de los extremos de ambos segmentos
+    _, idx_ruta1, i, longitud1, idx_ruta2, j, longitud2 = movimiento
+    ruta1, ruta2 = rutas[idx_ruta1], rutas[idx_ruta2]
+    ant1, primera1, ultima1, sig1 = ruta1[i - 1], ruta1[i], ruta1[i + longitud1 - 1], ruta1[i + longitud1]
+    ant2, primera2, ultima2, sig2 = ruta2[j - 1], ruta2[j], ruta2[j + longitud2 - 1], ruta2[j + longitud2]
+    agregado = (float(matriz[ant1, primera2]) + float(matriz[ultima2, sig1])
+                + float(matriz[ant2, primera1]) + float(matriz[ultima1, sig2]))
+    removido = (float(matriz[ant1, primera1]) + float(matriz[ultima1, sig1])
+                + float(matriz[ant2, primera2]) + float(matriz[ultima2, sig2]))
+    return agregado - removido
+
+def aplicar_movimiento(rutas, movimiento):
+    """Aplica el movimiento sobre las rutas (en sitio)."""
+    if movimiento is None:
+        return
+
+    if movimiento[0] == 'swap':
+        _, idx_ruta1, i, idx_ruta2, j = movimiento
+        ruta1, ruta2 = rutas[idx_ruta1], rutas[idx_ruta2]
+        ruta1[i], ruta2[j] = ruta2[j], ruta1[i]
+    elif movimiento[0] == '2opt':
+        _, idx_ruta, i, j = movimiento
+        ruta = rutas[idx_ruta]
+        ruta[i:j+1] = ruta[j:i-1:-1]  # i >= 1 siempre (posición 0 es el CD)
+    elif movimiento[0] == 'relocate':
+        _, idx_ruta1, i, idx_ruta2, j = movimiento
+        rutas[idx_ruta2].insert(j, rutas[idx_ruta1].pop(i))
+    elif movimiento[0] == 'oropt':
+        _, idx_ruta, i, longitud, j, invertir = movimiento
+        ruta = rutas[idx_ruta]
+        segmento = ruta[i:i + longitud]
+        if invertir:
+            segmento.reverse()
+        del ruta[i:i + longitud]
+        if j > i:
+            j -= longitud
+        ruta[j:j] = segmento
+    else:
+        _, idx_ruta1, i, longitud1, idx_ruta2, j, longitud2 = movimiento
+        ruta1, ruta2 = rutas[idx_ruta1], rutas[idx_ruta2]
+        ruta1[i:i + longitud1], ruta2[j:j + longitud2] = ruta2[j:j + longitud2], ruta1[i:i + longitud1]
+
+def generar_vecino(rutas, rng=random, metricas=None):
+    if not rutas or len(rutas) == 0:
+        return []
+    
+    nuevas_rutas = [r.copy() for r in rutas]
+    movimiento = elegir_movimiento(nuevas_rutas, rng)
+    if metricas is not None:
+        metricas.registrar(movimiento, math.nan, movimiento is not None)
+    aplicar_movimiento(nuevas_rutas, movimiento)
     
     # SOLUCIÓN CRÍTICA: NO eliminar rutas, mantener todas incluso si solo tienen [depot, depot]
-    return nuevas_rutas  # ← CAMBIO CLAVE: quitar el filtro
+    return nuevas_rutas
+
+class RestriccionCapacidad:
+    """
+    Carga de cada ruta para rechazar movimientos entre rutas que excedan la capacidad
+    del vehículo. Un movimiento se permite si la ruta queda dentro de la capacidad o,
+    si ya la excedía (una tienda con demanda mayor a la capacidad), si su carga no aumenta.
+    """
+    __slots__ = ('demandas', 'capacidad', 'cargas')
+
+    def __init__(self, demandas, capacidad, rutas):
+        self.demandas = demandas.tolist() if isinstance(demandas, np.ndarray) else list(demandas)
+        self.capacidad = capacidad
+        self.cargas = [sum(self.demandas[n] for n in ruta[1:-1]) for ruta in rutas]
+
+    def transferencia(self, rutas, movimiento):
+        """(ruta 1, ruta 2, carga que gana la ruta 1 y pierde la 2), o None si es dentro de una ruta."""
+        tipo = movimiento[0]
+        if tipo == 'swap':
+            _, idx_ruta1, i, idx_ruta2, j = movimiento
+            return idx_ruta1, idx_ruta2, self.demandas[rutas[idx_ruta2][j]] - self.demandas[rutas[idx_ruta1][i]]
+        if tipo == 'relocate':
+            _, idx_ruta1, i, idx_ruta2, _ = movimiento
+            return idx_ruta1, idx_ruta2, -self.demandas[rutas[idx_ruta1][i]]
+        if tipo == 'cross':
+            _, idx_ruta1, i, longitud1, idx_ruta2, j, longitud2 = movimiento
+            cambio = (sum(self.demandas[n] for n in rutas[idx_ruta2][j:j + longitud2])
+                      - sum(self.demandas[n] for n in rutas[idx_ruta1][i:i + longitud1]))
+            return idx_ruta1, idx_ruta2, cambio
+        return None  # 2-opt y or-opt no cambian la carga de la ruta
+
+    def permite(self, rutas, movimiento):
+        transferencia = self.transferencia(rutas, movimiento)
+        if transferencia is None:
+            return True
+        idx_ruta1, idx_ruta2, cambio = transferencia
+        nueva1 = self.cargas[idx_ruta1] + cambio
+        nueva2 = self.cargas[idx_ruta2] - cambio
+        return ((nueva1 <= self.capacidad or cambio <= 0)
+                and (nueva2 <= self.capacidad or cambio >= 0))
+
+    def actualizar(self, rutas, movimiento):
+        """Actualiza las cargas con un movimiento aceptado (antes de aplicarlo)."""
+        transferencia = self.transferencia(rutas, movimiento)
+        if transferencia is not None:
+            idx_ruta1, idx_ruta2, cambio = transferencia
+            self.cargas[idx_ruta1] += cambio
+            self.cargas[idx_ruta2] -= cambio
+
+def crear_restriccion(rutas, demandas):
+    """RestriccionCapacidad si hay demandas y CAPACIDAD_VEHICULO, o None."""
+    if demandas is None or CAPACIDAD_VEHICULO is None:
+        return None
+    return RestriccionCapacidad(demandas, CAPACIDAD_VEHICULO, rutas)
+
+class SelectorOperadores:
+    """
+    Ruleta adaptativa sobre OPERADORES_VECINDARIO. En cada nivel acumula por operador la
+    mejora obtenida (lo que bajó el costo con sus movimientos de mejora) y el esfuerzo
+    gastado: movimientos evaluados o, con 'por_tiempo', segundos de CPU en proponerlos
+    y evaluarlos. Al cerrar el nivel cada peso se acerca a la tasa mejora / esfuerzo del
+    operador relativa a la del mejor, sin bajar de PESO_MINIMO_OPERADOR.
+    """
+    __slots__ = ('operadores', 'pesos', 'mejoras', 'esfuerzos', 'por_tiempo', 'reaccion', 'peso_minimo')
+
+    def __init__(self, operadores=None, por_tiempo=False, reaccion=None, peso_minimo=None):
+        self.operadores = list(OPERADORES_VECINDARIO if operadores is None else operadores)
+        self.pesos = [1.0] * len(self.operadores)
+        self.mejoras = [0.0] * len(self.operadores)
+        self.esfuerzos = [0.0] * len(self.operadores)
+        self.por_tiempo = por_tiempo
+        self.reaccion = REACCION_OPERADORES if reaccion is None else reaccion
+        self.peso_minimo = PESO_MINIMO_OPERADOR if peso_minimo is None else peso_minimo
+
+    def elegir(self, rng):
+        """Índice de un operador elegido con probabilidad proporcional a su peso."""
+        umbral = rng.random() * sum(self.pesos)
+        for k, peso in enumerate(self.pesos):
+            umbral -= peso
+            if umbral < 0:
+                return k
+        return len(self.pesos) - 1
+
+    def registrar(self, k, delta, esfuerzo=1.0):
+        if delta < 0:
+            self.mejoras[k] -= delta
+        self.esfuerzos[k] += esfuerzo
+
+    def actualizar_pesos(self):
+        tasas = [m / e if e > 0 else 0.0 for m, e in zip(self.mejoras, self.esfuerzos)]
+        maxima = max(tasas)
+        for k, tasa in enumerate(tasas):
+            if self.esfuerzos[k] > 0:  # Un operador sin uso en el nivel conserva su peso
+                puntaje = tasa / maxima if maxima > 0 else 0.0
+                self.pesos[k] = max(self.peso_minimo,
+                                    (1.0 - self.reaccion) * self.pesos[k] + self.reaccion * puntaje)
+            self.mejoras[k] = self.esfuerzos[k] = 0.0
+
+def crear_selector():
+    """SelectorOperadores según SELECCION_OPERADORES, o None para la elección uniforme."""
+    if SELECCION_OPERADORES == 'uniforme':
+        return None
+    if SELECCION_OPERADORES not in ('adaptativa', 'adaptativa_tiempo'):
+        raise ValueError(f"SELECCION_OPERADORES desconocida: {SELECCION_OPERADORES!r}.")
+    return SelectorOperadores(por_tiempo=SELECCION_OPERADORES == 'adaptativa_tiempo')
+
+# -----------------------------------------------------------------------------
+# 4.1 LISTAS DE VECINOS (VECINDARIO GRANULAR)
+# -----------------------------------------------------------------------------
+def construir_indice_vecinos(matriz_distancias, depots, k, tam_bloque=None):
+    """
+    Precalcula las k tiendas más cercanas de cada nodo con argpartition, por bloques
+    de filas para no duplicar la matriz en memoria. Devuelve un arreglo int32 (n, k)
+    ordenado de la más cercana a la más lejana.
+    """
+    n = matriz_distancias.shape[0]
+    k = min(k, n - len(depots) - 1)
+    if tam_bloque is None:
+        tam_bloque = max(1, min(1024, 2**22 // n))  # Bloques de ~32 MB en float64
+    vecinos = np.empty((n, k), dtype=np.int32)
+    for inicio in range(0, n, tam_bloque):
+        fin = min(inicio + tam_bloque, n)
+        bloque = np.array(matriz_distancias[inicio:fin], dtype=np.float64)
+        bloque[:, depots] = np.inf                                  # Los CD no se mueven
+        bloque[np.arange(fin - inicio), np.arange(inicio, fin)] = np.inf  # Ni el propio nodo
+        candidatos = np.argpartition(bloque, k, axis=1)[:, :k]
+        orden = np.argsort(np.take_along_axis(bloque, candidatos, axis=1), axis=1)
+        vecinos[inicio:fin] = np.take_along_axis(candidatos, orden, axis=1)
+    return vecinos
+
+class VecindarioGranular:
+    """
+    Propone solo movimientos que crean una arista corta (a, b), con b entre los k
+    vecinos más cercanos de a. Mantiene la posición (ruta, índice) de cada tienda
+    para ubicar a 'b' sin recorrer las rutas.
+    """
+    __slots__ = ('vecinos', 'tiendas', 'ruta_de', 'pos_de')
+
+    def __init__(self, vecinos, rutas):
+        self.vecinos = vecinos
+        self.tiendas = [nodo for ruta in rutas for nodo in ruta[1:-1]]
+        self.ruta_de = [0] * len(vecinos)
+        self.pos_de = [0] * len(vecinos)
+        for idx_ruta, ruta in enumerate(rutas):
+            for pos in range(1, len(ruta) - 1):
+                self.ruta_de[ruta[pos]] = idx_ruta
+                self.pos_de[ruta[pos]] = pos
+
+    def elegir_movimiento(self, rutas, rng=random):
+        a = self.tiendas[rng.randrange(len(self.tiendas))]
+        b = int(self.vecinos[a, rng.randrange(self.vecinos.shape[1])])
+        ruta_a, pos_a = self.ruta_de[a], self.pos_de[a]
+        ruta_b, pos_b = self.ruta_de[b], self.pos_de[b]
+
+        if ruta_a == ruta_b:
+            # 2-opt que deja a 'a' y 'b' consecutivos
+            if pos_a + 1 < pos_b:
+                return ('2opt', ruta_a, pos_a + 1, pos_b)
+            if pos_b < pos_a - 1:
+                return ('2opt', ruta_a, pos_b, pos_a - 1)
+            return None  # Ya son consecutivos
+
+        # Swap de 'a' con el sucesor (o predecesor) de 'b' en la otra ruta
+        ultima = len(rutas[ruta_b]) - 2
+        lado = 1 if rng.random() < 0.5 else -1
+        if not 1 <= pos_b + lado <= ultima:
+            lado = -lado
+        if not 1 <= pos_b + lado <= ultima:
+            return None  # 'b' es la única tienda de su ruta
+        return ('swap', ruta_a, pos_a, ruta_b, pos_b + lado)
+
+    def actualizar(self, rutas, movimiento):
+        """Actualiza las posiciones tras aplicar el movimiento."""
+        if movimiento[0] == 'swap':
+            _, idx_ruta1, i, idx_ruta2, j = movimiento
+            a, b = rutas[idx_ruta1][i], rutas[idx_ruta2][j]
+            self.ruta_de[a], self.pos_de[a] = idx_ruta1, i
+            self.ruta_de[b], self.pos_de[b] = idx_ruta2, j
+        else:
+            _, idx_ruta, i, j = movimiento
+            ruta = rutas[idx_ruta]
+            for pos in range(i, j + 1):
+                self.pos_de[ruta[pos]] = pos
+
+# -----------------------------------------------------------------------------
+# 4.2 REPRESENTACIÓN COMPACTA DE SOLUCIONES
+# -----------------------------------------------------------------------------
+class SolucionCompacta:
+    """
+    Conjunto de rutas guardado como un solo tour gigante int32 (solo tiendas, sin
+    repetir el CD), los desplazamientos donde empieza cada ruta, el CD de cada ruta
+    y el costo por ruta en caché. Copiar una solución es copiar estos buffers.
+
+    Capa de conversión: iterar sobre la solución (o indexarla) entrega cada ruta como
+    lista [CD, Tienda_1, ..., Tienda_N, CD], así que calcular_metrica_ruta,
+    calcular_metrica_total y la escritura del CSV funcionan sin cambios.
+    """
+    __slots__ = ('nodos', 'inicios', 'depots', 'costos')
+
+    def __init__(self, nodos, inicios, depots, costos=None):
+        self.nodos = nodos        # int32 (total de tiendas,)
+        self.inicios = inicios    # int32 (num_rutas + 1,)
+        self.depots = depots      # int32 (num_rutas,)
+        self.costos = costos      # float64 (num_rutas,) o None si no se ha calculado
+
+    @classmethod
+    def desde_rutas(cls, rutas, matriz=None):
+        longitudes = np.fromiter((len(r) - 2 for r in rutas), dtype=np.int32, count=len(rutas))
+        inicios = np.zeros(len(rutas) + 1, dtype=np.int32)
+        np.cumsum(longitudes, out=inicios[1:])
+        solucion = cls(np.empty(inicios[-1], dtype=np.int32), inicios,
+                       np.fromiter((r[0] for r in rutas), dtype=np.int32, count=len(rutas)))
+        solucion.cargar_rutas(rutas)
+        if matriz is not None:
+            solucion.calcular_costos(matriz)
+        return solucion
+
+    def cargar_rutas(self, rutas):
+        """Sobrescribe la solución con 'rutas' reutilizando los buffers si el tamaño coincide."""
+        total = sum(len(r) - 2 for r in rutas)
+        if total != len(self.nodos) or len(rutas) != len(self.depots):
+            otra = SolucionCompacta.desde_rutas(rutas)
+            self.nodos, self.inicios, self.depots = otra.nodos, otra.inicios, otra.depots
+        else:
+            pos = 0
+            for k, ruta in enumerate(rutas):
+                fin = pos + len(ruta) - 2
+                self.nodos[pos:fin] = ruta[1:-1]
+                self.inicios[k] = pos
+                self.depots[k] = ruta[0]
+                pos = fin
+            self.inicios[-1] = pos
+        self.costos = None
+
+    def calcular_costos(self, matriz):
+        """Calcula (y guarda en caché) el costo de cada ruta con un solo gather vectorizado."""
+        num_rutas = len(self.depots)
+        longitudes = np.diff(self.inicios)
+        id_ruta = np.repeat(np.arange(num_rutas), longitudes)
+        # Sucesor de cada tienda: la siguiente del tour o el CD si es la última de su ruta
+        siguientes = np.empty_like(self.nodos)
+        siguientes[:-1] = self.nodos[1:]
+        con_tiendas = longitudes > 0
+        siguientes[self.inicios[1:][con_tiendas] - 1] = self.depots[con_tiendas]
+        costos = np.bincount(id_ruta, weights=matriz[self.nodos, siguientes], minlength=num_rutas)
+        primeras = self.nodos[self.inicios[:-1][con_tiendas]]
+        costos[con_tiendas] += matriz[self.depots[con_tiendas], primeras]
+        costos[~con_tiendas] = matriz[self.depots[~con_tiendas], self.depots[~con_tiendas]]
+        self.costos = costos
+        return costos
+
+    def copy(self):
+        costos = None if self.costos is None else self.costos.copy()
+        return SolucionCompacta(self.nodos.copy(), self.inicios.copy(), self.depots.copy(), costos)
+
+    def ruta(self, k):
+        depot = int(self.depots[k])
+        return [depot] + self.nodos[self.inicios[k]:self.inicios[k + 1]].tolist() + [depot]
+
+    def a_rutas(self):
+        return [self.ruta(k) for k in range(len(self.depots))]
+
+    def __len__(self):
+        return len(self.depots)
+
+    def __getitem__(self, k):
+        return self.ruta(k)
+
+    def __iter__(self):
+        return (self.ruta(k) for k in range(len(self.depots)))
+
+    @property
+    def nbytes(self):
+        costos = 0 if self.costos is None else self.costos.nbytes
+        return self.nodos.nbytes + self.inicios.nbytes + self.depots.nbytes + costos
+
+# -----------------------------------------------------------------------------
+# 4.3 KERNEL COMPILADO (NUMBA) SOBRE LA REPRESENTACIÓN COMPACTA
+# -----------------------------------------------------------------------------
+def _kernel_nivel(nodos, inicios, depots, matriz, temperatura, aleatorios, mejor_nodos,
+                  costo, mejor_costo, demandas, cargas, capacidad, registrar, tipos, deltas, aceptaciones):
+    """
+    Un nivel completo de temperatura (una iteración por fila de 'aleatorios') con los
+    mismos movimientos swap / 2-opt y deltas que recorrer_temperatura, pero sobre el
+    tour gigante int32 de una SolucionCompacta. Cada fila trae 6 uniformes:
+    tipo, ruta 1, ruta 2, posición 1, posición 2 y aceptación. Los swaps respetan
+    'capacidad' con las mismas reglas que RestriccionCapacidad ('cargas' se actualiza).
+    Con registrar=True escribe por iteración el tipo de movimiento (1 swap, 2 2-opt,
+    0 si no se evaluó), el delta y si se aceptó en los arreglos de instrumentación.
+    Devuelve (costo, mejor_costo, aceptados); 'mejor_nodos' se copia en sitio.
+    """
+    num_rutas = depots.shape[0]
+    aceptados = 0
+    mejor_pendiente = False
+    for it in range(aleatorios.shape[0]):
+        u = aleatorios[it]
+        if u[0] < 0.5:
+            # swap de dos tiendas de rutas distintas
+            if num_rutas < 2:
+                continue
+            r1 = int(u[1] * num_rutas)
+            r2 = int(u[2] * (num_rutas - 1))
+            if r2 >= r1:
+                r2 += 1
+            ini1, fin1 = inicios[r1], inicios[r1 + 1]
+            ini2, fin2 = inicios[r2], inicios[r2 + 1]
+            if fin1 == ini1 or fin2 == ini2:
+                continue
+            p = ini1 + int(u[3] * (fin1 - ini1))
+            q = ini2 + int(u[4] * (fin2 - ini2))
+            a, b = nodos[p], nodos[q]
+            cambio = demandas[b] - demandas[a]
+            if ((cargas[r1] + cambio > capacidad and cambio > 0)
+                    or (cargas[r2] - cambio > capacidad and cambio < 0)):
+                continue
+            ant1 = nodos[p - 1] if p > ini1 else depots[r1]
+            sig1 = nodos[p + 1] if p + 1 < fin1 else depots[r1]
+            ant2 = nodos[q - 1] if q > ini2 else depots[r2]
+            sig2 = nodos[q + 1] if q + 1 < fin2 else depots[r2]
+            # Cada arista en float64 antes de sumar: el costo acumulado no se desvía con float32
+            delta = ((np.float64(matriz[ant1, b]) + np.float64(matriz[b, sig1])
+                      + np.float64(matriz[ant2, a]) + np.float64(matriz[a, sig2]))
+                     - (np.float64(matriz[ant1, a]) + np.float64(matriz[a, sig1])
+                        + np.float64(matriz[ant2, b]) + np.float64(matriz[b, sig2])))
+        else:
+            # 2-opt dentro de una ruta con al menos 3 tiendas
+            r1 = int(u[1] * num_rutas)
+            ini1, fin1 = inicios[r1], inicios[r1 + 1]
+            longitud = fin1 - ini1
+            if longitud < 3:
+                continue
+            i = int(u[3] * longitud)
+            j = int(u[4] * (longitud - 1))
+            if j >= i:
+                j += 1
+            if i > j:
+                i, j = j, i
+            p, q = ini1 + i, ini1 + j
+            ant1 = nodos[p - 1] if p > ini1 else depots[r1]
+            sig1 = nodos[q + 1] if q + 1 < fin1 else depots[r1]
+            delta = ((np.float64(matriz[ant1, nodos[q]]) + np.float64(matriz[nodos[p], sig1]))
+                     - (np.float64(matriz[ant1, nodos[p]]) + np.float64(matriz[nodos[q], sig1])))
+
+        aceptado = delta < 0 or u[5] < math.exp(-delta / temperatura)
+        if registrar:
+            tipos[it] = 1 if u[0] < 0.5 else 2
+            deltas[it] = delta
+            aceptaciones[it] = aceptado
+        if aceptado:
+            if mejor_pendiente and delta > 0:
+                mejor_nodos[:] = nodos
+                mejor_pendiente = False
+            if u[0] < 0.5:
+                nodos[p], nodos[q] = b, a
+                cargas[r1] += cambio
+                cargas[r2] -= cambio
+            else:
+                while p < q:
+                    nodos[p], nodos[q] = nodos[q], nodos[p]
+                    p += 1
+                    q -= 1
+            costo += delta
+            aceptados += 1
+            if costo < mejor_costo:
+                mejor_costo = costo
+                mejor_pendiente = True
+    if mejor_pendiente:
+        mejor_nodos[:] = nodos
+    return costo, mejor_costo, aceptados
+
+if numba is not None:
+    _kernel_nivel = numba.njit(cache=True, nogil=True)(_kernel_nivel)
+
+# -----------------------------------------------------------------------------
+# 4.4 INSTRUMENTACIÓN Y PERFILADO
+# -----------------------------------------------------------------------------
+TIPOS_MOVIMIENTO = ('ninguno', 'swap', '2opt', 'relocate', 'oropt', 'cross')  # swap = 1 y 2opt = 2 en el kernel
+CODIGOS_MOVIMIENTO = {tipo: codigo for codigo, tipo in enumerate(TIPOS_MOVIMIENTO)}
+
+class MetricasRecocido:
+    """
+    Telemetría del recocido. Durante un nivel solo se agregan el tipo, el delta y la
+    aceptación de cada movimiento a listas; al cerrar el nivel se resumen de forma
+    vectorizada en un registro (conteos propuestos / aceptados por tipo, tiempo, costo
+    actual y mejor, histograma de deltas con BORDES_HISTOGRAMA_DELTAS) que va a un
+    buffer circular. Con archivo, el buffer lleno se escribe en JSONL o Parquet; sin
+    archivo, los registros más antiguos se sobrescriben.
+    """
+
+    def __init__(self, archivo=None, tam_buffer=None, bordes=None):
+        self.archivo = archivo
+        self.tam_buffer = TAM_BUFFER_METRICAS if tam_buffer is None else tam_buffer
+        self.bordes = np.asarray(BORDES_HISTOGRAMA_DELTAS if bordes is None else bordes, dtype=np.float64)
+        self.buffer = [None] * self.tam_buffer
+        self.inicio = 0
+        self.cantidad = 0
+        self.nivel = 0
+        self._escritor_parquet = None
+        self._tipos, self._deltas, self._aceptaciones = [], [], []
+        if archivo is not None and os.path.exists(archivo):
+            os.remove(archivo)  # Cada corrida escribe su propio archivo
+
+    def registrar(self, movimiento, delta, aceptado):
+        """Un movimiento del recorrido en Python (movimiento=None si no fue aplicable)."""
+        self._tipos.append(0 if movimiento is None else CODIGOS_MOVIMIENTO[movimiento[0]])
+        self._deltas.append(delta)
+        self._aceptaciones.append(aceptado)
+
+    def registrar_arreglos(self, tipos, deltas, aceptaciones):
+        """Los arreglos de un nivel del kernel compilado."""
+        self._tipos.extend(tipos.tolist())
+        self._deltas.extend(deltas.tolist())
+        self._aceptaciones.extend(aceptaciones.tolist())
+
+    def cerrar_nivel(self, temperatura, tiempo, costo, mejor_costo):
+        tipos = np.array(self._tipos, dtype=np.int64)
+        deltas = np.array(self._deltas, dtype=np.float64)
+        aceptaciones = np.array(self._aceptaciones, dtype=bool)
+        self._tipos, self._deltas, self._aceptaciones = [], [], []
+        propuestos = np.bincount(tipos, minlength=len(TIPOS_MOVIMIENTO))
+        aceptados = np.bincount(tipos[aceptaciones], minlength=len(TIPOS_MOVIMIENTO))
+        histograma, _ = np.histogram(deltas[np.isfinite(deltas)], bins=self.bordes)
+        registro = {'nivel': self.nivel, 'temperatura': temperatura, 'tiempo_nivel': tiempo,
+                    'costo': costo, 'mejor_costo': mejor_costo}
+        for codigo, tipo in enumerate(TIPOS_MOVIMIENTO[1:], start=1):
+            registro[f'propuestos_{tipo}'] = int(propuestos[codigo])
+            registro[f'aceptados_{tipo}'] = int(aceptados[codigo])
+        registro['histograma_deltas'] = histograma.tolist()
+        self.nivel += 1
+
+        if self.cantidad == self.tam_buffer:
+            if self.archivo is not None:
+                self.volcar()
+            else:
+                self.inicio = (self.inicio + 1) % self.tam_buffer  # Se pierde el más antiguo
+                self.cantidad -= 1
+        self.buffer[(self.inicio + self.cantidad) % self.tam_buffer] = registro
+        self.cantidad += 1
+
+    def registros(self):
+        """Registros en memoria, del más antiguo al más reciente."""
+        return [self.buffer[(self.inicio + k) % self.tam_buffer] for k in range(self.cantidad)]
+
+    def volcar(self):
+        if self.archivo is None or self.cantidad == 0:
+            return
+        registros = self.registros()
+        if self.archivo.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            tabla = pa.Table.from_pylist(registros)
+            if self._escritor_parquet is None:
+                self._escritor_parquet = pq.ParquetWriter(self.archivo, tabla.schema)
+            self._escritor_parquet.write_table(tabla)
+        else:
+            with open(self.archivo, 'a', encoding='utf-8') as archivo:
+                for registro in registros:
+                    archivo.write(json.dumps(registro) + '\n')
+        self.inicio = self.cantidad = 0
+
+    def cerrar(self):
+        self.volcar()
+        if self._escritor_parquet is not None:
+            self._escritor_parquet.close()
+            self._escritor_parquet = None
+
+class Perfilador:
+    """Envuelve el ciclo del recocido con cProfile o pyinstrument (si está instalado)."""
+
+    def __init__(self, tipo, archivo=None):
+        self.tipo = tipo
+        self.archivo = ARCHIVO_PERFIL if archivo is None else archivo
+        if tipo == 'pyinstrument':
+            from pyinstrument import Profiler
+            self.perfil = Profiler()
+        elif tipo == 'cprofile':
+            self.perfil = cProfile.Profile()
+        else:
+            raise ValueError(f"Perfilador desconocido: {tipo!r} (usa 'cprofile' o 'pyinstrument').")
+
+    def iniciar(self):
+        self.perfil.start() if self.tipo == 'pyinstrument' else self.perfil.enable()
+
+    def detener(self):
+        if self.tipo == 'pyinstrument':
+            self.perfil.stop()
+            with open(self.archivo + '.html', 'w', encoding='utf-8') as archivo:
+                archivo.write(self.perfil.output_html())
+            print(f"Perfil guardado en -> {self.archivo}.html")
+        else:
+            self.perfil.disable()
+            self.perfil.dump_stats(self.archivo + '.prof')
+            pstats.Stats(self.perfil).sort_stats('cumulative').print_stats(15)
+            print(f"Perfil guardado en -> {self.archivo}.prof")
 
 # -----------------------------------------------------------------------------
 # 5. ALGORITMO DE RECOCIDO SIMULADO
 # -----------------------------------------------------------------------------
-def recocido_simulado(rutas_iniciales, matriz_costos, semilla):
-    print("\nIniciando optimización con Recocido Simulado...")
-    random.seed(semilla)
-    solucion_actual = [r.copy() for r in rutas_iniciales]
-    costo_actual = calcular_metrica_total(solucion_actual, matriz_costos)
-    mejor_solucion = [r.copy() for r in solucion_actual]
-    mejor_costo = costo_actual
-    temperatura = TEMPERATURA_INICIAL
+def recorrer_temperatura(solucion, costo, mejor_solucion, mejor_costo, matriz_costos,
+                         temperatura, iteraciones, rng, vecindario=None, restriccion=None, metricas=None,
+                         selector=None):
+    """
+    Ejecuta 'iteraciones' movimientos de Metropolis a temperatura fija sobre
+    'solucion' (se modifica en sitio). 'mejor_solucion' es una SolucionCompacta que
+    se sobrescribe en sus propios buffers. Si se da un VecindarioGranular, los
+    movimientos se proponen con sus listas de vecinos; con una RestriccionCapacidad
+    se descartan los que exceden la capacidad; con MetricasRecocido se registra cada
+    movimiento evaluado. Sin vecindario, un SelectorOperadores elige el operador de cada
+    movimiento y sus pesos se actualizan al terminar el nivel.
+    Devuelve (costo, mejor_solucion, mejor_costo, aceptados).
+    """
+    aceptados = 0
+    # La copia del mejor se difiere: mientras la solución actual sea la mejor basta con
+    # recordarlo y copiarla justo antes de aceptar un movimiento que la empeore (o al
+    # final del nivel). Así una racha de mejoras cuesta una sola copia O(n).
+    mejor_pendiente = False
+    for _ in range(iteraciones):
+        # El movimiento se evalúa con su delta y solo se aplica si se acepta
+        if vecindario is not None:
+            movimiento = vecindario.elegir_movimiento(solucion, rng)
+        elif selector is None:
+            movimiento = elegir_movimiento(solucion, rng)
+        else:
+            if selector.por_tiempo:
+                inicio = time.perf_counter()
+            operador = selector.elegir(rng)
+            movimiento = elegir_movimiento(solucion, rng, selector.operadores[operador])
+        if restriccion is not None and movimiento is not None and not restriccion.permite(solucion, movimiento):
+            if selector is not None:
+                selector.registrar(operador, 0.0, time.perf_counter() - inicio if selector.por_tiempo else 1.0)
+            continue
+        diferencia_costo = delta_movimiento(solucion, movimiento, matriz_costos)
+        if selector is not None:
+            selector.registrar(operador, diferencia_costo,
+                               time.perf_counter() - inicio if selector.por_tiempo else 1.0)
+        aceptado = diferencia_costo < 0 or rng.random() < math.exp(-diferencia_costo / temperatura)
+        if metricas is not None:
+            metricas.registrar(movimiento, diferencia_costo, aceptado)
+        if aceptado:
+            if movimiento is None:
+                continue
+            if mejor_pendiente and diferencia_costo > 0:
+                mejor_solucion.cargar_rutas(solucion)
+                mejor_pendiente = False
+            if restriccion is not None:
+                restriccion.actualizar(solucion, movimiento)
+            aplicar_movimiento(solucion, movimiento)
+            if vecindario is not None:
+                vecindario.actualizar(solucion, movimiento)
+            costo += diferencia_costo
+            aceptados += 1
+            if costo < mejor_costo:
+                mejor_costo = costo
+                mejor_pendiente = True
+    if mejor_pendiente:
+        mejor_solucion.cargar_rutas(solucion)
+    if selector is not None:
+        selector.actualizar_pesos()
+    return costo, mejor_solucion, mejor_costo, aceptados
+
+def calibrar_temperatura_inicial(rutas, matriz_costos, semilla, muestras=None, aceptacion=None):
+    """
+    Estima T0 = -media(deltas > 0) / ln(aceptacion) evaluando movimientos al azar sobre
+    la solución inicial, de modo que un empeoramiento típico se acepte con esa probabilidad.
+    Usa su propio generador para no alterar la secuencia del recocido.
+    """
+    muestras = MUESTRAS_CALIBRACION if muestras is None else muestras
+    aceptacion = ACEPTACION_INICIAL_DESEADA if aceptacion is None else aceptacion
+    rng = random.Random(semilla)
+    empeoramientos = []
+    for _ in range(muestras):
+        mov = elegir_movimiento(rutas, rng)
+        if mov is None:
+            continue
+        delta = delta_movimiento(rutas, mov, matriz_costos)
+        if delta > 0:
+            empeoramientos.append(delta)
+    if not empeoramientos:
+        return TEMPERATURA_INICIAL
+    return -(sum(empeoramientos) / len(empeoramientos)) / math.log(aceptacion)
+
+def siguiente_temperatura(temperatura, tasa_aceptacion, objetivo):
+    """Paso del esquema de enfriamiento configurado en ESQUEMA_ENFRIAMIENTO."""
+    if ESQUEMA_ENFRIAMIENTO == 'adaptativo':
+        # Con la tasa en el objetivo se enfría al ritmo geométrico; por encima hasta 4 veces
+        # más rápido y por debajo a la mitad, de modo que la temperatura siempre desciende
+        exponente = min(max(tasa_aceptacion / objetivo, 0.5), 4.0)
+        return temperatura * TASA_ENFRIAMIENTO ** exponente
+    return temperatura * TASA_ENFRIAMIENTO
+
+class MotorListas:
+    """Estado del recocido en listas de Python; cada nivel usa recorrer_temperatura."""
+
+    def __init__(self, rutas, matriz_costos, semilla, vecinos=None, demandas=None):
+        self.matriz = matriz_costos
+        self.rng = random.Random(semilla)
+        self.solucion = [r.copy() for r in rutas]
+        self.vecindario = VecindarioGranular(vecinos, self.solucion) if vecinos is not None else None
+        self.restriccion = crear_restriccion(self.solucion, demandas)
+        self.selector = crear_selector() if self.vecindario is None else None
+        self.costo = calcular_metrica_total(self.solucion, matriz_costos)
+        self.mejor = SolucionCompacta.desde_rutas(self.solucion)
+        self.mejor_costo = self.costo
+
+    def recorrer(self, temperatura, iteraciones, metricas=None):
+        self.costo, self.mejor, self.mejor_costo, aceptados = recorrer_temperatura(
+            self.solucion, self.costo, self.mejor, self.mejor_costo, self.matriz,
+            temperatura, iteraciones, self.rng, self.vecindario, self.restriccion, metricas,
+            self.selector
+        )
+        return aceptados
+
+    def estado(self):
+        version, interno, gauss = self.rng.getstate()
+        estado = {'rng': np.array(interno, dtype=np.uint32),
+                  'rng_gauss': np.nan if gauss is None else gauss}
+        if self.vecindario is not None:
+            # El orden de muestreo de las tiendas no se deduce de las rutas actuales
+            estado['tiendas'] = np.array(self.vecindario.tiendas, dtype=np.int32)
+        if self.selector is not None:
+            estado['pesos_operadores'] = np.array(self.selector.pesos)
+        return SolucionCompacta.desde_rutas(self.solucion), estado
+
+    def restaurar(self, actual, estado):
+        self.solucion = actual.a_rutas()
+        gauss = float(estado['rng_gauss'])
+        self.rng.setstate((3, tuple(int(x) for x in estado['rng']), None if math.isnan(gauss) else gauss))
+        if self.vecindario is not None:
+            self.vecindario = VecindarioGranular(self.vecindario.vecinos, self.solucion)
+            self.vecindario.tiendas = estado['tiendas'].tolist()
+        if self.restriccion is not None:
+            self.restriccion = RestriccionCapacidad(self.restriccion.demandas, self.restriccion.capacidad,
+                                                    self.solucion)
+        if self.selector is not None:
+            self.selector.pesos = estado['pesos_operadores'].tolist()
+
+class MotorCompilado:
+    """
+    Estado del recocido en una SolucionCompacta; cada nivel es una sola llamada a
+    _kernel_nivel y solo el costo y el mejor costo regresan a Python. Los números
+    aleatorios del nivel se generan de una vez con np.random.Generator.
+    """
+
+    def __init__(self, rutas, matriz_costos, semilla, demandas=None):
+        self.matriz = np.ascontiguousarray(matriz_costos)
+        self.generador = np.random.default_rng(semilla)
+        self.actual = SolucionCompacta.desde_rutas(rutas)
+        self.mejor = self.actual.copy()
+        # Sin restricción: demandas en cero y capacidad infinita (la verificación nunca falla)
+        if demandas is None or CAPACIDAD_VEHICULO is None:
+            self.demandas = np.zeros(self.matriz.shape[0])
+            self.capacidad = math.inf
+        else:
+            self.demandas = np.asarray(demandas, dtype=np.float64)
+            self.capacidad = float(CAPACIDAD_VEHICULO)
+        self.cargas = np.array([self.demandas[ruta[1:-1]].sum() for ruta in rutas], dtype=np.float64)
+        self.costo = calcular_metrica_total(rutas, self.matriz)
+        self.mejor_costo = self.costo
+
+    def recorrer(self, temperatura, iteraciones, metricas=None):
+        aleatorios = self.generador.random((iteraciones, 6))
+        mejor_costo_previo = self.mejor_costo
+        n = iteraciones if metricas is not None else 0
+        tipos, deltas, aceptaciones = np.zeros(n, np.int8), np.zeros(n), np.zeros(n, np.bool_)
+        self.costo, self.mejor_costo, aceptados = _kernel_nivel(
+            self.actual.nodos, self.actual.inicios, self.actual.depots, self.matriz,
+            temperatura, aleatorios, self.mejor.nodos, self.costo, self.mejor_costo,
+            self.demandas, self.cargas, self.capacidad, metricas is not None, tipos, deltas, aceptaciones
+        )
+        if metricas is not None:
+            evaluados = tipos > 0
+            metricas.registrar_arreglos(tipos[evaluados], deltas[evaluados], aceptaciones[evaluados])
+        if self.mejor_costo < mejor_costo_previo:
+            self.mejor.costos = None  # La caché de costos por ruta ya no es válida
+        return aceptados
+
+    def estado(self):
+        return self.actual, {'generador': np.array(json.dumps(self.generador.bit_generator.state))}
+
+    def restaurar(self, actual, estado):
+        self.actual = actual
+        self.generador.bit_generator.state = json.loads(str(estado['generador']))
+        self.cargas = np.array([self.demandas[ruta[1:-1]].sum() for ruta in actual], dtype=np.float64)
+
+def crear_motor(rutas, matriz_costos, semilla, vecinos=None, usar_kernel=False, demandas=None):
+    if usar_kernel:
+        if not isinstance(matriz_costos, np.ndarray):
+            print("El kernel compilado requiere una matriz densa; se usa el recorrido en Python.")
+        else:
+            if vecinos is not None:
+                print("El kernel compilado usa movimientos uniformes; se ignoran las listas de vecinos.")
+            return MotorCompilado(rutas, matriz_costos, semilla, demandas)
+    return MotorListas(rutas, matriz_costos, semilla, vecinos, demandas)
+
+def guardar_checkpoint(path, motor, variables):
+    """
+    Guarda en un .npz la solución actual y la mejor (arreglos int32), los costos, las
+    variables del ciclo y el estado del generador aleatorio. Se escribe en un archivo
+    temporal y se renombra, así un corte a mitad de escritura no daña el anterior.
+    """
+    actual, estado_motor = motor.estado()
+    temporal = path + '.tmp'
+    with open(temporal, 'wb') as archivo:
+        np.savez(archivo, tipo_motor=np.array(type(motor).__name__),
+                 costos=np.array([motor.costo, motor.mejor_costo]),
+                 variables=np.array(json.dumps(variables)),
+                 actual_nodos=actual.nodos, actual_inicios=actual.inicios, actual_depots=actual.depots,
+                 mejor_nodos=motor.mejor.nodos, mejor_inicios=motor.mejor.inicios,
+                 mejor_depots=motor.mejor.depots, **estado_motor)
+    os.replace(temporal, path)
+
+def cargar_checkpoint(path, motor):
+    """Restaura el motor desde un checkpoint y devuelve las variables del ciclo."""
+    with np.load(path) as datos:
+        if str(datos['tipo_motor']) != type(motor).__name__:
+            raise ValueError(f"{path} se guardó con {datos['tipo_motor']} y la configuración actual "
+                             f"usa {type(motor).__name__}.")
+        if len(datos['actual_nodos']) != len(motor.mejor.nodos):
+            raise ValueError(f"{path} no corresponde a esta instancia "
+                             f"({len(datos['actual_nodos'])} tiendas en lugar de {len(motor.mejor.nodos)}).")
+        actual = SolucionCompacta(datos['actual_nodos'], datos['actual_inicios'], datos['actual_depots'])
+        motor.mejor = SolucionCompacta(datos['mejor_nodos'], datos['mejor_inicios'], datos['mejor_depots'])
+        motor.costo, motor.mejor_costo = (float(c) for c in datos['costos'])
+        motor.restaurar(actual, {clave: datos[clave] for clave in datos.files})
+        return json.loads(str(datos['variables']))
+
+def recocido_simulado(rutas_iniciales, matriz_costos, semilla, mostrar_progreso=True, vecinos=None,
+                      usar_kernel=None, tiempo_maximo=None, costo_objetivo=None, estadisticas=None,
+                      demandas=None, temperatura_inicial=None, checkpoint=None, reanudar=False,
+                      metricas=None):
+    """
+    Recocido simulado de una cadena. 'tiempo_maximo', 'costo_objetivo' y
+    'temperatura_inicial' sustituyen a TIEMPO_MAXIMO_SEGUNDOS, COSTO_OBJETIVO y
+    TEMPERATURA_INICIAL (o su calibración); con 'demandas' (ver calcular_demandas) y
+    CAPACIDAD_VEHICULO los swaps respetan la capacidad. Si se pasa un dict en 'estadisticas' se
+    llena con la temperatura inicial, niveles, iteraciones, recalentamientos, tiempo
+    y el motivo de parada.
+    Con 'checkpoint' (ruta de archivo) el estado se guarda cada INTERVALO_CHECKPOINT_SEGUNDOS
+    al terminar un nivel; con reanudar=True se continúa desde ese archivo exactamente
+    donde se detuvo (misma secuencia aleatoria que una corrida sin interrupciones).
+    Con INSTRUMENTACION (o un MetricasRecocido en 'metricas') se registran métricas por
+    nivel; con PERFILADOR el ciclo se ejecuta bajo cProfile o pyinstrument.
+    """
+    usar_kernel = USAR_KERNEL_COMPILADO if usar_kernel is None else usar_kernel
+    tiempo_maximo = TIEMPO_MAXIMO_SEGUNDOS if tiempo_maximo is None else tiempo_maximo
+    costo_objetivo = COSTO_OBJETIVO if costo_objetivo is None else costo_objetivo
+    if mostrar_progreso:
+        print("\nIniciando optimización con Recocido Simulado...")
+        if usar_kernel and numba is None:
+            print("Numba no está instalado: el kernel se ejecuta sin compilar (más lento).")
     start_time = time.time()
+    if temperatura_inicial is not None or reanudar:
+        pass
+    elif CALIBRAR_TEMPERATURA_INICIAL:
+        temperatura_inicial = calibrar_temperatura_inicial(rutas_iniciales, matriz_costos, semilla)
+        if mostrar_progreso:
+            print(f"Temperatura inicial calibrada: {temperatura_inicial:.4f}")
+    else:
+        temperatura_inicial = TEMPERATURA_INICIAL
+    motor = crear_motor(rutas_iniciales, matriz_costos, semilla, vecinos, usar_kernel, demandas)
+    temperatura = temperatura_inicial
+    objetivo = ACEPTACION_OBJETIVO_INICIAL
+    niveles = niveles_sin_mejora = recalentamientos = 0
+    motivo = 'temperatura minima'
+    if reanudar:
+        variables = cargar_checkpoint(checkpoint, motor)
+        temperatura_inicial, temperatura = variables['temperatura_inicial'], variables['temperatura']
+        objetivo, niveles = variables['objetivo'], variables['niveles']
+        niveles_sin_mejora, recalentamientos = variables['niveles_sin_mejora'], variables['recalentamientos']
+        start_time -= variables['transcurrido']  # El presupuesto de tiempo sigue corriendo
+        if mostrar_progreso:
+            print(f"Reanudando desde {checkpoint}: nivel {niveles}, temperatura {temperatura:.4f}, "
+                  f"mejor costo ${motor.mejor_costo:,.2f}")
+    ultimo_checkpoint = time.time()
+    if metricas is None and INSTRUMENTACION:
+        metricas = MetricasRecocido(ARCHIVO_METRICAS)
+    perfilador = Perfilador(PERFILADOR) if PERFILADOR is not None else None
+    if perfilador is not None:
+        perfilador.iniciar()
     
     while temperatura > TEMPERATURA_MINIMA:
-        for _ in range(ITERACIONES_POR_TEMPERATURA):
-            solucion_vecina = generar_vecino(solucion_actual)
-            costo_vecino = calcular_metrica_total(solucion_vecina, matriz_costos)
-            diferencia_costo = costo_vecino - costo_actual
-            if diferencia_costo < 0 or random.random() < math.exp(-diferencia_costo / temperatura):
-                solucion_actual = solucion_vecina
-                costo_actual = costo_vecino
-                if costo_actual < mejor_costo:
-                    mejor_solucion = [r.copy() for r in solucion_actual]
-                    mejor_costo = costo_actual
-        temperatura *= TASA_ENFRIAMIENTO
-        print(f"Temperatura: {temperatura:.2f}, Mejor Costo Actual: ${mejor_costo:,.2f}", end="\r")
+        mejor_costo_previo = motor.mejor_costo
+        if metricas is None:
+            aceptados = motor.recorrer(temperatura, ITERACIONES_POR_TEMPERATURA)
+        else:
+            inicio_nivel = time.perf_counter()
+            aceptados = motor.recorrer(temperatura, ITERACIONES_POR_TEMPERATURA, metricas)
+            metricas.cerrar_nivel(temperatura, time.perf_counter() - inicio_nivel, motor.costo, motor.mejor_costo)
+        niveles += 1
+        niveles_sin_mejora = 0 if motor.mejor_costo < mejor_costo_previo else niveles_sin_mejora + 1
+
+        if costo_objetivo is not None and motor.mejor_costo <= costo_objetivo:
+            motivo = 'costo objetivo'
+            break
+        if tiempo_maximo is not None and time.time() - start_time >= tiempo_maximo:
+            motivo = 'tiempo maximo'
+            break
+        if MAX_NIVELES_SIN_MEJORA is not None and niveles_sin_mejora >= MAX_NIVELES_SIN_MEJORA:
+            motivo = 'sin mejora'
+            break
+
+        temperatura = siguiente_temperatura(temperatura, aceptados / ITERACIONES_POR_TEMPERATURA, objetivo)
+        objetivo *= DECAIMIENTO_ACEPTACION_OBJETIVO
+        if (NIVELES_SIN_MEJORA_RECALENTAR is not None and recalentamientos < MAX_RECALENTAMIENTOS
+                and niveles_sin_mejora > 0 and niveles_sin_mejora % NIVELES_SIN_MEJORA_RECALENTAR == 0):
+            temperatura = min(temperatura * FACTOR_RECALENTAMIENTO, temperatura_inicial)
+            recalentamientos += 1
+        if (checkpoint is not None and INTERVALO_CHECKPOINT_SEGUNDOS is not None
+                and time.time() - ultimo_checkpoint >= INTERVALO_CHECKPOINT_SEGUNDOS):
+            guardar_checkpoint(checkpoint, motor, {
+                'temperatura_inicial': temperatura_inicial, 'temperatura': temperatura,
+                'objetivo': objetivo, 'niveles': niveles, 'niveles_sin_mejora': niveles_sin_mejora,
+                'recalentamientos': recalentamientos, 'transcurrido': time.time() - start_time})
+            ultimo_checkpoint = time.time()
+        if mostrar_progreso:
+            print(f"Temperatura: {temperatura:.2f}, Mejor Costo Actual: ${motor.mejor_costo:,.2f}", end="\r")
+
+    tiempo = time.time() - start_time
+    if perfilador is not None:
+        perfilador.detener()
+    if metricas is not None:
+        metricas.cerrar()
+        if mostrar_progreso and metricas.archivo is not None:
+            print(f"\nMétricas de {metricas.nivel} niveles guardadas en -> {metricas.archivo}")
+    if checkpoint is not None and os.path.exists(checkpoint):
+        os.remove(checkpoint)  # La corrida terminó: un --resume posterior no debe retomarla
+    if mostrar_progreso:
+        print("\nOptimización completada en {:.2f} segundos ({}).".format(tiempo, motivo))
+    if estadisticas is not None:
+        estadisticas.update(temperatura_inicial=temperatura_inicial, niveles=niveles,
+                            iteraciones=niveles * ITERACIONES_POR_TEMPERATURA,
+                            recalentamientos=recalentamientos, tiempo=tiempo, motivo_parada=motivo)
+    motor.mejor.calcular_costos(matriz_costos)
+    return motor.mejor, motor.mejor_costo
+
+# -----------------------------------------------------------------------------
+# 5.1 MULTI-ARRANQUE EN PARALELO
+# -----------------------------------------------------------------------------
+# Matriz de costos (listas de vecinos y demandas) del proceso trabajador. Se asignan una sola
+# vez por proceso en el inicializador del pool (con 'fork' las páginas se comparten
+# en solo lectura) en lugar de enviarlas con cada tarea.
+# Una matriz abierta con np.memmap se envía como su ruta y cada trabajador la vuelve
+# a abrir, así todos comparten las mismas páginas del archivo.
+_matriz_costos_trabajador = None
+_vecinos_trabajador = None
+_demandas_trabajador = None
+
+def _referencia_matriz(matriz):
+    mapeo = matriz if isinstance(matriz, np.memmap) else getattr(matriz, 'base', None)
+    if isinstance(mapeo, np.memmap) and mapeo.filename is not None:
+        return mapeo.filename
+    return matriz
+
+def _inicializar_trabajador(matriz_costos, vecinos=None, demandas=None):
+    global _matriz_costos_trabajador, _vecinos_trabajador, _demandas_trabajador
+    if isinstance(matriz_costos, str):
+        matriz_costos = cargar_matriz_binaria(matriz_costos)
+    _matriz_costos_trabajador = matriz_costos
+    _vecinos_trabajador = vecinos
+    _demandas_trabajador = demandas
+
+def _ejecutar_cadena(rutas_iniciales, semilla):
+    inicio = time.time()
+    solucion, costo = recocido_simulado(
+        rutas_iniciales, _matriz_costos_trabajador, semilla, mostrar_progreso=False,
+        vecinos=_vecinos_trabajador, demandas=_demandas_trabajador
+    )
+    return {'semilla': semilla, 'costo': costo, 'tiempo': time.time() - inicio, 'solucion': solucion}
+
+def recocido_simulado_multiarranque(rutas_iniciales, matriz_costos, semillas, num_procesos=None,
+                                    vecinos=None, demandas=None):
+    """
+    Ejecuta una cadena de recocido independiente por semilla en un ProcessPoolExecutor
+    y conserva la mejor solución. Devuelve (mejor_solucion, mejor_costo, resultados),
+    donde resultados trae el costo y el tiempo de cada cadena.
+    """
+    print(f"\nIniciando {len(semillas)} cadenas de Recocido Simulado en paralelo...")
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=num_procesos, initializer=_inicializar_trabajador,
+                             initargs=(_referencia_matriz(matriz_costos), vecinos, demandas)) as pool:
+        resultados = list(pool.map(_ejecutar_cadena, repeat(rutas_iniciales), semillas))
+    tiempo_total = time.time() - start_time
+
+    for resultado in resultados:
+        print(f"  Cadena (semilla {resultado['semilla']}): Costo ${resultado['costo']:,.2f} "
+              f"en {resultado['tiempo']:.2f} segundos")
+    tiempo_cadenas = sum(r['tiempo'] for r in resultados)
+    print("Optimización completada en {:.2f} segundos ({:.2f} s de cómputo, aceleración {:.1f}x).".format(
+        tiempo_total, tiempo_cadenas, tiempo_cadenas / tiempo_total))
+
+    mejor = min(resultados, key=lambda r: r['costo'])
+    return mejor['solucion'], mejor['costo'], resultados
+
+# -----------------------------------------------------------------------------
+# 5.2 INTERCAMBIO DE RÉPLICAS (PARALLEL TEMPERING)
+# -----------------------------------------------------------------------------
+def escalera_temperaturas(num_replicas, temperatura_max=None, temperatura_min=None, razon_maxima=None):
+    """
+    Temperaturas fijas en progresión geométrica de la más fría a la más caliente. Si
+    repartir el rango entre num_replicas exige una razón entre vecinas mayor que
+    razon_maxima, la escalera sube desde la más fría con esa razón y no llega a
+    temperatura_max: con vecinas muy separadas los intercambios nunca se aceptan.
+    """
+    temperatura_max = TEMPERATURA_INICIAL if temperatura_max is None else temperatura_max
+    temperatura_min = TEMPERATURA_MINIMA if temperatura_min is None else temperatura_min
+    razon_maxima = RAZON_MAXIMA_ESCALERA if razon_maxima is None else razon_maxima
+    if num_replicas == 1:
+        return [temperatura_min]
+    razon = (max(temperatura_max, temperatura_min) / temperatura_min) ** (1.0 / (num_replicas - 1))
+    razon = min(razon, razon_maxima)
+    return [temperatura_min * razon ** k for k in range(num_replicas)]
+
+def replicas_necesarias(temperatura_max, temperatura_min=None, razon_maxima=None):
+    """Réplicas con las que la escalera llega a temperatura_max sin pasar de razon_maxima."""
+    temperatura_min = TEMPERATURA_MINIMA if temperatura_min is None else temperatura_min
+    razon_maxima = RAZON_MAXIMA_ESCALERA if razon_maxima is None else razon_maxima
+    if temperatura_max <= temperatura_min:
+        return 1
+    return math.ceil(math.log(temperatura_max / temperatura_min) / math.log(razon_maxima) - 1e-9) + 1
+
+def _ejecutar_replica(estado, costo, temperatura, iteraciones, rng, selector):
+    # La réplica viaja en forma compacta y con su propio generador (y ruleta de
+    # operadores) para que el resultado no dependa del proceso que la ejecute
+    solucion = estado.a_rutas()
+    mejor_solucion = estado.copy()
+    vecindario = None
+    if _vecinos_trabajador is not None:
+        vecindario = VecindarioGranular(_vecinos_trabajador, solucion)
+    costo, mejor_solucion, mejor_costo, aceptados = recorrer_temperatura(
+        solucion, costo, mejor_solucion, costo, _matriz_costos_trabajador,
+        temperatura, iteraciones, rng, vecindario, crear_restriccion(solucion, _demandas_trabajador),
+        selector=None if vecindario is not None else selector
+    )
+    return SolucionCompacta.desde_rutas(solucion), costo, mejor_solucion, mejor_costo, aceptados, rng, selector
+
+def recocido_intercambio_replicas(rutas_iniciales, matriz_costos, semilla, num_replicas=None,
+                                  rondas=None, iteraciones_por_ronda=None, num_procesos=None,
+                                  vecinos=None, demandas=None):
+    """
+    Ejecuta K cadenas a temperaturas fijas (escalera geométrica entre TEMPERATURA_MINIMA
+    y TEMPERATURA_MAXIMA_REPLICAS o la T0 calibrada, con razón entre vecinas de a lo más
+    RAZON_MAXIMA_ESCALERA) en procesos del pool. Tras cada ronda intenta intercambiar los
+    estados de temperaturas vecinas con el criterio de Metropolis:
+        p = min(1, exp((1/T_i - 1/T_j) * (E_i - E_j)))
+    Devuelve (mejor_solucion, mejor_costo, estadisticas); estadisticas incluye las
+    temperaturas, la tasa de aceptación de intercambios por par de vecinas y la tasa
+    de aceptación de movimientos por réplica.
+    """
+    num_replicas = NUM_REPLICAS if num_replicas is None else num_replicas
+    rondas = RONDAS_INTERCAMBIO if rondas is None else rondas
+    iteraciones_por_ronda = ITERACIONES_ENTRE_INTERCAMBIOS if iteraciones_por_ronda is None else iteraciones_por_ronda
+
+    print(f"\nIniciando intercambio de réplicas con {num_replicas} temperaturas...")
+    rng_intercambio = random.Random(semilla)
+    temperatura_max = TEMPERATURA_MAXIMA_REPLICAS
+    if temperatura_max is None:
+        # Por encima de la T0 calibrada toda réplica es prácticamente una caminata al azar
+        temperatura_max = calibrar_temperatura_inicial(rutas_iniciales, matriz_costos, semilla)
+        print(f"Temperatura máxima calibrada: {temperatura_max:.4f}")
+    temperaturas = escalera_temperaturas(num_replicas, temperatura_max)
+    if temperaturas[-1] < temperatura_max * (1 - 1e-9):
+        print(f"Con razón {RAZON_MAXIMA_ESCALERA} entre vecinas la escalera llega a T = {temperaturas[-1]:.3f}; "
+              f"para cubrir hasta {temperatura_max:.3f} se necesitan "
+              f"{replicas_necesarias(temperatura_max)} réplicas.")
+    costo_inicial = calcular_metrica_total(rutas_iniciales, matriz_costos)
+    # Estado en la posición k = réplica que está a temperaturas[k]
+    mejor_solucion = SolucionCompacta.desde_rutas(rutas_iniciales)
+    soluciones = [mejor_solucion.copy() for _ in range(num_replicas)]
+    costos = [costo_inicial] * num_replicas
+    generadores = [random.Random(semilla + 1 + k) for k in range(num_replicas)]
+    selectores = [crear_selector() for _ in range(num_replicas)]
+    mejor_costo = costo_inicial
+
+    intentos = [0] * (num_replicas - 1)
+    intercambios = [0] * (num_replicas - 1)
+    aceptados_por_replica = [0] * num_replicas
+    start_time = time.time()
+
+    with ProcessPoolExecutor(max_workers=num_procesos, initializer=_inicializar_trabajador,
+                             initargs=(_referencia_matriz(matriz_costos), vecinos, demandas)) as pool:
+        for ronda in range(rondas):
+            resultados = list(pool.map(_ejecutar_replica, soluciones, costos, temperaturas,
+                                       repeat(iteraciones_por_ronda), generadores, selectores))
+            for k, (solucion, costo, mejor_sol_k, mejor_costo_k, aceptados, rng, selector) in enumerate(resultados):
+                soluciones[k], costos[k], generadores[k], selectores[k] = solucion, costo, rng, selector
+                aceptados_por_replica[k] += aceptados
+                if mejor_costo_k < mejor_costo:
+                    mejor_solucion, mejor_costo = mejor_sol_k, mejor_costo_k
+
+            # Pares pares en rondas pares e impares en rondas impares
+            for k in range(ronda % 2, num_replicas - 1, 2):
+                intentos[k] += 1
+                exponente = (1.0 / temperaturas[k] - 1.0 / temperaturas[k + 1]) * (costos[k] - costos[k + 1])
+                if exponente >= 0 or rng_intercambio.random() < math.exp(exponente):
+                    soluciones[k], soluciones[k + 1] = soluciones[k + 1], soluciones[k]
+                    costos[k], costos[k + 1] = costos[k + 1], costos[k]
+                    intercambios[k] += 1
+
+            print(f"Ronda {ronda + 1}/{rondas}, Mejor Costo Actual: ${mejor_costo:,.2f}", end="\r")
+
+    tiempo_total = time.time() - start_time
+    tasas_intercambio = [i / n if n else 0.0 for i, n in zip(intercambios, intentos)]
+    tasas_aceptacion = [a / (rondas * iteraciones_por_ronda) for a in aceptados_por_replica]
+
+    print("\nOptimización completada en {:.2f} segundos.".format(tiempo_total))
+    for k, temperatura in enumerate(temperaturas):
+        linea = f"  T = {temperatura:10.3f}: aceptación de movimientos {tasas_aceptacion[k]:6.1%}"
+        if k < num_replicas - 1:
+            linea += f", intercambio con T = {temperaturas[k + 1]:.3f}: {tasas_intercambio[k]:6.1%}"
+        print(linea)
+
+    estadisticas = {
+        'temperaturas': temperaturas,
+        'tasas_intercambio': tasas_intercambio,
+        'tasas_aceptacion': tasas_aceptacion,
+        'tiempo': tiempo_total,
+    }
+    return mejor_solucion, mejor_costo, estadisticas
+
+# -----------------------------------------------------------------------------
+# 5.3 REOPTIMIZACIÓN INCREMENTAL (ARRANQUE EN CALIENTE)
+# -----------------------------------------------------------------------------
+def leer_rutas_csv(path_rutas):
+    """Rutas de un rutas_optimizadas.csv como listas de índices de nodo."""
+    df_rutas = pd.read_csv(path_rutas)
+    return [[int(nodo) for nodo in str(nodos).split(';')] for nodos in df_rutas['nodos']]
+
+def guardar_ubicaciones(df_ubicaciones, path):
+    """Guarda las ubicaciones de esta ejecución para reconocer cambios en la siguiente."""
+    columnas = ['Tipo', 'Nombre', 'Latitud_WGS84', 'Longitud_WGS84']
+    df_ubicaciones[columnas].to_csv(path, index_label='indice', encoding='latin1')
+
+def mapear_ubicaciones(df_previo, df_actual):
+    """
+    Empareja ubicaciones por 'Nombre'. Devuelve un dict índice_previo -> índice_actual
+    solo con las que conservan tipo y coordenadas; las movidas se tratan como nuevas.
+    Los nombres repetidos no se emparejan (sus tiendas se vuelven a insertar).
+    """
+    union = df_previo.reset_index(drop=True).reset_index().merge(
+        df_actual.reset_index(drop=True).reset_index(), on='Nombre', suffixes=('_previo', '_actual'))
+    union = union[~union['Nombre'].duplicated(keep=False)]
+    iguales = ((union['Tipo_previo'] == union['Tipo_actual'])
+               & np.isclose(union['Latitud_WGS84_previo'], union['Latitud_WGS84_actual'], rtol=0, atol=1e-7)
+               & np.isclose(union['Longitud_WGS84_previo'], union['Longitud_WGS84_actual'], rtol=0, atol=1e-7))
+    return dict(zip(union.loc[iguales, 'index_previo'].tolist(), union.loc[iguales, 'index_actual'].tolist()))
+
+def insertar_mas_barato(rutas, tiendas, matriz_costos, depots, demandas=None, capacidad=None):
+    """
+    Inserta cada tienda en la arista (u, v) que menos encarece, d(u,t) + d(t,v) - d(u,v),
+    evaluando todas las aristas de todas las rutas en un solo gather. Con capacidad solo
+    se consideran rutas donde la tienda cabe; si no cabe en ninguna abre una ruta nueva
+    desde el CD más cercano. Modifica 'rutas' y devuelve los índices de rutas tocadas.
+    """
+    origen = np.array([r[i] for r in rutas for i in range(len(r) - 1)], dtype=np.int64)
+    destino = np.array([r[i + 1] for r in rutas for i in range(len(r) - 1)], dtype=np.int64)
+    ruta_arista = np.repeat(np.arange(len(rutas)), [len(r) - 1 for r in rutas])
+    pos_arista = np.concatenate([np.arange(1, len(r)) for r in rutas]) if rutas else np.empty(0, dtype=np.int64)
+    cargas = np.array([demandas[r[1:-1]].sum() if demandas is not None else 0.0 for r in rutas])
+    depots = np.asarray(depots, dtype=np.int64)
+    afectadas = set()
+
+    for tienda in tiendas:
+        incremento = np.full(len(origen), np.inf)
+        if len(origen):
+            incremento = np.asarray(matriz_costos[origen, tienda] + matriz_costos[tienda, destino]
+                                    - matriz_costos[origen, destino], dtype=np.float64)
+            if capacidad is not None:
+                incremento[cargas[ruta_arista] + demandas[tienda] > capacidad] = np.inf
+        if len(origen) == 0 or not np.isfinite(incremento.min()):
+            # Ruta nueva desde el CD más cercano
+            depot = int(depots[np.argmin(np.asarray(matriz_costos[tienda, depots]))])
+            rutas.append([depot, tienda, depot])
+            origen = np.append(origen, [depot, tienda])
+            destino = np.append(destino, [tienda, depot])
+            ruta_arista = np.append(ruta_arista, [len(rutas) - 1] * 2)
+            pos_arista = np.append(pos_arista, [1, 2])
+            cargas = np.append(cargas, demandas[tienda] if demandas is not None else 0.0)
+            afectadas.add(len(rutas) - 1)
+            continue
+        e = int(np.argmin(incremento))
+        k, pos = int(ruta_arista[e]), int(pos_arista[e])
+        rutas[k].insert(pos, tienda)
+        # La arista (u, v) se parte en (u, t) y (t, v); las siguientes de la ruta se corren
+        pos_arista[(ruta_arista == k) & (np.arange(len(pos_arista)) > e)] += 1
+        origen = np.insert(origen, e + 1, tienda)
+        destino = np.insert(destino, e, tienda)
+        ruta_arista = np.insert(ruta_arista, e + 1, k)
+        pos_arista = np.insert(pos_arista, e + 1, pos + 1)
+        if demandas is not None:
+            cargas[k] += demandas[tienda]
+        afectadas.add(k)
+    return afectadas
+
+def reoptimizar_incremental(df_ubicaciones, matriz_costos, depots, semilla, path_rutas=None,
+                            path_ubicaciones=None, demandas=None, mostrar_progreso=True):
+    """
+    Arranque en caliente desde la ejecución anterior: traduce sus rutas a los índices
+    actuales (por 'Nombre', con el archivo de ubicaciones guardado), quita las tiendas
+    eliminadas o movidas, inserta las nuevas en su posición más barata y ejecuta un
+    recocido corto (T0 calibrada con ACEPTACION_INCREMENTAL) solo sobre las rutas
+    afectadas. Devuelve (rutas, costo, estadisticas).
+    """
+    path_rutas = ARCHIVO_SALIDA_RUTAS if path_rutas is None else path_rutas
+    path_ubicaciones = ARCHIVO_SALIDA_UBICACIONES if path_ubicaciones is None else path_ubicaciones
+    start_time = time.time()
+    rutas_previas = leer_rutas_csv(path_rutas)
+    if os.path.exists(path_ubicaciones):
+        df_previo = pd.read_csv(path_ubicaciones, index_col='indice', encoding='latin1')
+        mapeo = mapear_ubicaciones(df_previo, df_ubicaciones)
+    else:
+        # Sin el archivo de ubicaciones se asume que los índices no cambiaron
+        print(f"Aviso: no existe {path_ubicaciones}; se asume que los índices de las rutas previas "
+              "corresponden a las ubicaciones actuales.")
+        mapeo = {i: i for i in range(len(df_ubicaciones))}
+
+    es_depot = np.zeros(len(df_ubicaciones), dtype=bool)
+    es_depot[depots] = True
+    rutas, afectadas, colocadas = [], set(), set()
+    quitadas = 0  # Tiendas previas eliminadas o movidas
+    for ruta in rutas_previas:
+        depot = mapeo.get(ruta[0])
+        tiendas = [mapeo[n] for n in ruta[1:-1] if n in mapeo and not es_depot[mapeo[n]]]
+        quitadas += len(ruta) - 2 - len(tiendas)
+        if depot is None or not es_depot[depot]:
+            continue  # CD eliminado: sus tiendas se reinsertan
+        if len(tiendas) != len(ruta) - 2:
+            afectadas.add(len(rutas))
+        rutas.append([depot] + tiendas + [depot])
+        colocadas.update(tiendas)
+    # Los CD nuevos empiezan con una ruta vacía para que puedan recibir tiendas
+    con_ruta = {ruta[0] for ruta in rutas}
+    rutas.extend([d, d] for d in depots if d not in con_ruta)
+
+    pendientes = [t for t in np.flatnonzero(~es_depot).tolist() if t not in colocadas]
+    afectadas |= insertar_mas_barato(rutas, pendientes, matriz_costos, depots, demandas,
+                                     CAPACIDAD_VEHICULO if demandas is not None else None)
+
+    if mostrar_progreso:
+        print(f"Tiendas quitadas (eliminadas o movidas): {quitadas}, insertadas: {len(pendientes)}, "
+              f"rutas afectadas: {len(afectadas)} de {len(rutas)}")
+    if afectadas:
+        indices = sorted(afectadas)
+        subconjunto = [rutas[k] for k in indices]
+        temperatura = calibrar_temperatura_inicial(subconjunto, matriz_costos, semilla,
+                                                   aceptacion=ACEPTACION_INCREMENTAL)
+        solucion, _ = recocido_simulado(subconjunto, matriz_costos, semilla, mostrar_progreso,
+                                        demandas=demandas, temperatura_inicial=temperatura)
+        for k, ruta in zip(indices, solucion):
+            rutas[k] = ruta
+
+    estadisticas = {'insertadas': len(pendientes), 'quitadas': quitadas,
+                    'rutas_afectadas': len(afectadas), 'tiempo': time.time() - start_time}
+    return rutas, calcular_metrica_total(rutas, matriz_costos), estadisticas
+
+# -----------------------------------------------------------------------------
+# 5.4 ESCRITURA DE RESULTADOS
+# -----------------------------------------------------------------------------
+_aviso_pyarrow_mostrado = False
+
+def tablas_tipadas(rutas, matriz_costos, matriz_distancias):
+    """
+    Construye de forma vectorizada (un solo gather por matriz sobre el tour de todas las
+    rutas) la tabla de rutas (id_ruta, depot, num_tiendas, costo_combustible,
+    distancia_km) y la de paradas (id_ruta, secuencia, id_nodo, distancia_acumulada_km,
+    costo_acumulado), con enteros int32 y reales float64.
+    """
+    longitudes = np.fromiter((len(ruta) for ruta in rutas), dtype=np.int64, count=len(rutas))
+    nodos = np.fromiter((nodo for ruta in rutas for nodo in ruta), dtype=np.int64, count=int(longitudes.sum()))
+    inicios = np.zeros(len(rutas), dtype=np.int64)
+    np.cumsum(longitudes[:-1], out=inicios[1:])
+    desplazamientos = np.repeat(inicios, longitudes)
+    columnas = {}
+    for nombre, matriz in (('distancia_acumulada_km', matriz_distancias), ('costo_acumulado', matriz_costos)):
+        # Tramo que llega a cada parada (0 en la salida del CD) y acumulado dentro de su ruta
+        tramos = np.zeros(len(nodos))
+        if len(nodos) > 1:
+            tramos[1:] = np.asarray(matriz[nodos[:-1], nodos[1:]], dtype=np.float64)
+        tramos[inicios] = 0.0
+        acumulado = np.cumsum(tramos)
+        columnas[nombre] = acumulado - acumulado[desplazamientos]
+    df_paradas = pd.DataFrame({
+        'id_ruta': np.repeat(np.arange(1, len(rutas) + 1, dtype=np.int32), longitudes),
+        'secuencia': (np.arange(len(nodos)) - desplazamientos).astype(np.int32),
+        'id_nodo': nodos.astype(np.int32),
+        **columnas,
+    })
+    finales = inicios + longitudes - 1
+    df_rutas = pd.DataFrame({
+        'id_ruta': np.arange(1, len(rutas) + 1, dtype=np.int32),
+        'depot': nodos[inicios].astype(np.int32),
+        'num_tiendas': (longitudes - 2).astype(np.int32),
+        'costo_combustible': columnas['costo_acumulado'][finales],
+        'distancia_km': columnas['distancia_acumulada_km'][finales],
+    })
+    return df_rutas, df_paradas
+
+def escribir_tabla(df, path):
+    """Escribe 'df' en Parquet o Feather según la extensión. Sin pyarrow avisa (una vez) y devuelve False."""
+    global _aviso_pyarrow_mostrado
+    try:
+        if path.endswith(('.feather', '.arrow')):
+            df.to_feather(path)
+        else:
+            df.to_parquet(path, index=False)
+    except ImportError:
+        if not _aviso_pyarrow_mostrado:
+            print("Aviso: pyarrow no está instalado; solo se escribe la salida CSV (pip install pyarrow).")
+            _aviso_pyarrow_mostrado = True
+        return False
+    return True
+
+def leer_tabla(path):
+    if path.endswith(('.feather', '.arrow')):
+        return pd.read_feather(path)
+    return pd.read_parquet(path)
+
+def leer_salida_tipada(path_rutas_tipada=None, path_paradas=None, path_rutas_csv=None):
+    """
+    Devuelve (df_rutas, df_paradas) de la última ejecución con columnas numéricas. Lee la
+    salida tipada si existe y no es más vieja que el CSV; si no (o falta pyarrow) convierte
+    el CSV clásico de forma vectorizada, en cuyo caso las paradas no traen las columnas
+    acumuladas.
+    """
+    path_rutas_tipada = ARCHIVO_SALIDA_RUTAS_TIPADA if path_rutas_tipada is None else path_rutas_tipada
+    path_paradas = ARCHIVO_SALIDA_PARADAS if path_paradas is None else path_paradas
+    path_rutas_csv = ARCHIVO_SALIDA_RUTAS if path_rutas_csv is None else path_rutas_csv
+    if (os.path.exists(path_rutas_tipada) and os.path.exists(path_paradas)
+            and (not os.path.exists(path_rutas_csv)
+                 or os.path.getmtime(path_paradas) >= os.path.getmtime(path_rutas_csv))):
+        try:
+            return leer_tabla(path_rutas_tipada), leer_tabla(path_paradas)
+        except ImportError:
+            pass
+    df_csv = pd.read_csv(path_rutas_csv)
+    nodos = df_csv['nodos'].astype(str).str.split(';')
+    longitudes = nodos.str.len().to_numpy()
+    id_nodo = np.array([int(nodo) for lista in nodos for nodo in lista], dtype=np.int32)
+    inicios = np.concatenate(([0], np.cumsum(longitudes)[:-1])).astype(np.int64)
+    df_paradas = pd.DataFrame({
+        'id_ruta': np.repeat(df_csv['id_ruta'].to_numpy(dtype=np.int32), longitudes),
+        'secuencia': (np.arange(len(id_nodo)) - np.repeat(inicios, longitudes)).astype(np.int32),
+        'id_nodo': id_nodo,
+    })
+    df_rutas = pd.DataFrame({
+        'id_ruta': df_csv['id_ruta'].to_numpy(dtype=np.int32),
+        'depot': id_nodo[inicios],
+        'num_tiendas': (longitudes - 2).astype(np.int32),
+        'costo_combustible': df_csv['costo_combustible'].astype(str).str.replace(r'[$,]', '', regex=True).astype(float),
+        'distancia_km': df_csv['distancia_km'].astype(str).str.replace(',', '').astype(float),
+    })
+    return df_rutas, df_paradas
+
+def guardar_resultados(rutas, matriz_costos, matriz_distancias, path_rutas=None, path_resumen=None,
+                       path_rutas_tipada=None, path_paradas=None):
+    """
+    Escribe el CSV de rutas (nodos separados por ';', costo y distancia por ruta), el
+    resumen con los totales y el número de vehículos y, con GUARDAR_SALIDA_TIPADA, las
+    tablas de tablas_tipadas. Las rutas sin tiendas no se escriben.
+    Devuelve (costo_total, distancia_total, numero_vehiculos).
+    """
+    path_rutas = ARCHIVO_SALIDA_RUTAS if path_rutas is None else path_rutas
+    path_resumen = ARCHIVO_SALIDA_RESUMEN if path_resumen is None else path_resumen
+    path_rutas_tipada = ARCHIVO_SALIDA_RUTAS_TIPADA if path_rutas_tipada is None else path_rutas_tipada
+    path_paradas = ARCHIVO_SALIDA_PARADAS if path_paradas is None else path_paradas
+    rutas = [ruta for ruta in rutas if len(ruta) > 2]
+    df_tipada, df_paradas = tablas_tipadas(rutas, matriz_costos, matriz_distancias)
+
+    # CSV clásico (texto con formato) generado desde las columnas tipadas
+    df_rutas = pd.DataFrame({
+        'id_ruta': df_tipada['id_ruta'],
+        'nodos': [';'.join(map(str, ruta)) for ruta in rutas],
+        'costo_combustible': [f"${costo:,.2f}" for costo in df_tipada['costo_combustible']],
+        'distancia_km': [f"{distancia:,.2f}" for distancia in df_tipada['distancia_km']],
+    })
+    df_rutas.to_csv(path_rutas, index=False)
     
-    print("\nOptimización completada en {:.2f} segundos.".format(time.time() - start_time))
-    return mejor_solucion, mejor_costo
+    costo_total = float(df_tipada['costo_combustible'].sum())
+    distancia_total = float(df_tipada['distancia_km'].sum())
+    resumen = {
+        'costo_total_combustible': f"${costo_total:,.2f}",
+        'distancia_total_km': f"{distancia_total:,.2f}", 'numero_vehiculos': len(rutas)
+    }
+    df_resumen = pd.DataFrame([resumen])
+    df_resumen.to_csv(path_resumen, index=False)
+
+    if GUARDAR_SALIDA_TIPADA and escribir_tabla(df_tipada, path_rutas_tipada):
+        escribir_tabla(df_paradas, path_paradas)
+    return costo_total, distancia_total, len(rutas)
 
 # -----------------------------------------------------------------------------
 # 6. SCRIPT PRINCIPAL
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimización de rutas con recocido simulado.")
+    parser.add_argument('--incremental', action='store_true',
+                        help=f"Partir de {ARCHIVO_SALIDA_RUTAS} y reoptimizar solo las rutas afectadas "
+                             "por tiendas nuevas, eliminadas o movidas.")
+    parser.add_argument('--resume', action='store_true',
+                        help=f"Continuar la corrida interrumpida guardada en {ARCHIVO_CHECKPOINT}.")
+    args = parser.parse_args()
+    if args.resume and not os.path.exists(ARCHIVO_CHECKPOINT):
+        print(f"No existe {ARCHIVO_CHECKPOINT}; se inicia una corrida nueva.")
+        args.resume = False
+    if args.resume and (NUM_REPLICAS > 1 or NUM_CADENAS > 1 or args.incremental):
+        print("--resume solo aplica a la cadena única de recocido; se ignora.")
+        args.resume = False
+    if args.resume and INTERVALO_CHECKPOINT_SEGUNDOS is None:
+        INTERVALO_CHECKPOINT_SEGUNDOS = 60.0  # Una corrida reanudada sigue guardando su avance
+
+    if USAR_MATRICES_BINARIAS:
+        path_costos, path_distancias = ARCHIVO_COSTOS_BINARIO, ARCHIVO_DISTANCIAS_BINARIO
+    else:
+        path_costos, path_distancias = ARCHIVO_COSTOS_COMBUSTIBLE, ARCHIVO_DISTANCIAS
     df_ubicaciones, matriz_costos, matriz_distancias, depots = cargar_datos(
-        ARCHIVO_UBICACIONES, ARCHIVO_COSTOS_COMBUSTIBLE, ARCHIVO_DISTANCIAS
+        ARCHIVO_UBICACIONES, path_costos, path_distancias, PROVEEDOR_METRICA
     )
-    
-    rutas_iniciales = crear_solucion_inicial_por_cluster(df_ubicaciones, depots, matriz_distancias)
-    
-    costo_inicial = calcular_metrica_total(rutas_iniciales, matriz_costos)
-    distancia_inicial = calcular_metrica_total(rutas_iniciales, matriz_distancias)
-    
-    print("\n--- Solución Inicial (por Clúster) ---")
-    print(f"Número de rutas generadas: {len(rutas_iniciales)}")
-    print(f"Costo de combustible inicial: ${costo_inicial:,.2f}")
-    print(f"Distancia total inicial: {distancia_inicial:,.2f} km")
-    
-    rutas_optimizadas, costo_optimizado = recocido_simulado(rutas_iniciales, matriz_costos, SEMILLA_ALEATORIA)
+    demandas = calcular_demandas(df_ubicaciones, depots) if CAPACIDAD_VEHICULO is not None else None
+
+    if args.incremental and not os.path.exists(ARCHIVO_SALIDA_RUTAS):
+        print(f"No existe {ARCHIVO_SALIDA_RUTAS}; se ejecuta la optimización completa.")
+        args.incremental = False
+
+    if args.incremental:
+        print(f"\nReoptimización incremental a partir de {ARCHIVO_SALIDA_RUTAS}...")
+        rutas_optimizadas, costo_optimizado, estadisticas = reoptimizar_incremental(
+            df_ubicaciones, matriz_costos, depots, SEMILLA_ALEATORIA, demandas=demandas
+        )
+        print(f"Reoptimización incremental completada en {estadisticas['tiempo']:.2f} segundos.")
+    else:
+        rutas_iniciales = crear_solucion_inicial(df_ubicaciones, depots, matriz_distancias)
+
+        vecinos = None
+        if USAR_LISTAS_VECINOS:
+            vecinos = construir_indice_vecinos(matriz_distancias, depots, K_VECINOS)
+            print(f"Listas de vecinos construidas: {K_VECINOS} tiendas más cercanas por nodo.")
+
+        costo_inicial = calcular_metrica_total(rutas_iniciales, matriz_costos)
+        distancia_inicial = calcular_metrica_total(rutas_iniciales, matriz_distancias)
+
+        print(f"\n--- Solución Inicial ({'por Ahorros' if CONSTRUCTOR_INICIAL == 'ahorros' else 'por Clúster'}) ---")
+        print(f"Número de rutas generadas: {len(rutas_iniciales)}")
+        print(f"Costo de combustible inicial: ${costo_inicial:,.2f}")
+        print(f"Distancia total inicial: {distancia_inicial:,.2f} km")
+
+        if NUM_REPLICAS > 1:
+            rutas_optimizadas, costo_optimizado, _ = recocido_intercambio_replicas(
+                rutas_iniciales, matriz_costos, SEMILLA_ALEATORIA, num_procesos=NUM_PROCESOS,
+                vecinos=vecinos, demandas=demandas
+            )
+        elif NUM_CADENAS > 1:
+            semillas = [SEMILLA_ALEATORIA + k for k in range(NUM_CADENAS)]
+            rutas_optimizadas, costo_optimizado, _ = recocido_simulado_multiarranque(
+                rutas_iniciales, matriz_costos, semillas, NUM_PROCESOS, vecinos=vecinos,
+                demandas=demandas
+            )
+        else:
+            checkpoint = ARCHIVO_CHECKPOINT if INTERVALO_CHECKPOINT_SEGUNDOS is not None else None
+            rutas_optimizadas, costo_optimizado = recocido_simulado(
+                rutas_iniciales, matriz_costos, SEMILLA_ALEATORIA, vecinos=vecinos, demandas=demandas,
+                checkpoint=checkpoint, reanudar=args.resume
+            )
+    # relocate puede dejar un CD sin tiendas; esas rutas vacías no se reportan
+    rutas_optimizadas = [ruta for ruta in rutas_optimizadas if len(ruta) > 2]
     distancia_optimizada = calcular_metrica_total(rutas_optimizadas, matriz_distancias)
     
     print("\n--- Solución Optimizada ---")
@@ -174,25 +2078,9 @@ if __name__ == "__main__":
     print(f"Distancia total optimizada: {distancia_optimizada:,.2f} km")
     
     print("\nGuardando resultados...")
-    datos_rutas_salida = []
-    for i, ruta in enumerate(rutas_optimizadas):
-        costo_ruta = calcular_metrica_ruta(ruta, matriz_costos)
-        distancia_ruta = calcular_metrica_ruta(ruta, matriz_distancias)
-        nodos_str = ';'.join(map(str, ruta))
-        datos_rutas_salida.append({
-            'id_ruta': i + 1, 'nodos': nodos_str,
-            'costo_combustible': f"${costo_ruta:,.2f}", 'distancia_km': f"{distancia_ruta:,.2f}"
-        })
-        
-    df_rutas = pd.DataFrame(datos_rutas_salida)
-    df_rutas.to_csv(ARCHIVO_SALIDA_RUTAS, index=False)
-    
-    resumen = {
-        'costo_total_combustible': f"${costo_optimizado:,.2f}",
-        'distancia_total_km': f"{distancia_optimizada:,.2f}", 'numero_vehiculos': len(rutas_optimizadas)
-    }
-    df_resumen = pd.DataFrame([resumen])
-    df_resumen.to_csv(ARCHIVO_SALIDA_RESUMEN, index=False)
-    
+    guardar_resultados(rutas_optimizadas, matriz_costos, matriz_distancias)
     print(f"Rutas guardadas en -> {ARCHIVO_SALIDA_RUTAS}")
-    print(f"Resumen guardado en -> {ARCHIVO_SALIDA_RESUMEN}")
\ No newline at end of file
+    print(f"Resumen guardado en -> {ARCHIVO_SALIDA_RESUMEN}")
+    if GUARDAR_SALIDA_TIPADA and not _aviso_pyarrow_mostrado:
+        print(f"Tablas tipadas guardadas en -> {ARCHIVO_SALIDA_RUTAS_TIPADA}, {ARCHIVO_SALIDA_PARADAS}")
+    guardar_ubicaciones(df_ubicaciones, ARCHIVO_SALIDA_UBICACIONES)
\ No newline at end of file
@@ -0,0 +1,291 @@
+# teselas_mapa.py
+"""
+Escribe la geometría de rutas y tiendas como archivos GeoJSON por tesela y por banda
+de zoom, para que el mapa de crear_mapa.py (MODO_TESELAS = True) los cargue bajo
+demanda en lugar de incrustar todos los vértices en el HTML.
+
+En cada banda las rutas se simplifican con Douglas-Peucker (tolerancia en píxeles del
+zoom más cercano de la banda) y las coordenadas se cuantizan a enteros.
+"""
+
+import json
+import math
+import os
+import shutil
+
+import numpy as np
+from branca.element import MacroElement, Template
+
+# ----- 1. CONFIGURACIÓN -----
+BANDAS_ZOOM = [0, 9, 12, 15]     # Zoom inicial de cada banda (hasta el anterior a la siguiente); la última no se simplifica
+ZOOM_MAXIMO = 19
+DESPLAZAMIENTO_ZOOM_TESELAS = 2  # Las teselas de una banda se cortan a (zoom mínimo - 2): ~4x4 teselas de pantalla
+PIXELES_TOLERANCIA = 1.0         # Error máximo de la simplificación, en píxeles de pantalla
+ZOOM_MINIMO_TIENDAS = 12         # Las tiendas solo se escriben en las bandas desde este zoom
+DECIMALES_MAXIMOS = 6
+ARCHIVO_INDICE_TESELAS = 'indice.json'
+LATITUD_MAXIMA_MERCATOR = 85.05112878
+
+
+# ----- 2. PROYECCIÓN Y SIMPLIFICACIÓN -----
+def proyectar_mercator(latitudes, longitudes):
+    """Coordenadas Web Mercator normalizadas a [0, 1] (x hacia el este, y hacia el sur)."""
+    lat = np.radians(np.clip(latitudes, -LATITUD_MAXIMA_MERCATOR, LATITUD_MAXIMA_MERCATOR))
+    x = (np.asarray(longitudes) + 180.0) / 360.0
+    y = (1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0
+    return x, y
+
+
+def douglas_peucker(puntos, tolerancia):
+    """Máscara de los vértices que conserva Douglas-Peucker (puntos de forma (n, 2))."""
+    n = len(puntos)
+    conservar = np.ones(n, dtype=bool)
+    if n <= 2 or tolerancia <= 0:
+        return conservar
+    conservar[1:-1] = False
+    pila = [(0, n - 1)]
+    while pila:
+        inicio, fin = pila.pop()
+        if fin - inicio < 2:
+            continue
+        a = puntos[inicio]
+        ab = puntos[fin] - a
+        intermedios = puntos[inicio + 1:fin] - a
+        largo = math.hypot(ab[0], ab[1])
+        if largo == 0:
+            distancias = np.hypot(intermedios[:, 0], intermedios[:, 1])
+        else:
+            distancias = np.abs(ab[0] * intermedios[:, 1] - ab[1] * intermedios[:, 0]) / largo
+        k = int(np.argmax(distancias))
+        if distancias[k] > tolerancia:
+            medio = inicio + 1 + k
+            conservar[medio] = True
+            pila.append((inicio, medio))
+            pila.append((medio, fin))
+    return conservar
+
+
+def decimales_para_zoom(zoom):
+    """Decimales que bastan para que el error de cuantización quede bajo medio píxel."""
+    grados_por_pixel = 360.0 / (256 * 2 ** zoom)
+    return int(min(DECIMALES_MAXIMOS, max(0, math.ceil(-math.log10(grados_por_pixel / 2)))))
+
+
+def definir_bandas(bandas_zoom=None, zoom_maximo=None):
+    """Lista de bandas con su rango de zoom, zoom de teselas y escala de cuantización."""
+    bandas_zoom = BANDAS_ZOOM if bandas_zoom is None else bandas_zoom
+    zoom_maximo = ZOOM_MAXIMO if zoom_maximo is None else zoom_maximo
+    bandas = []
+    for i, zoom_min in enumerate(bandas_zoom):
+        ultima = i == len(bandas_zoom) - 1
+        zoom_max = zoom_maximo if ultima else bandas_zoom[i + 1] - 1
+        bandas.append({
+            'zoom_min': zoom_min, 'zoom_max': zoom_max,
+            'zoom_teselas': max(0, zoom_min - DESPLAZAMIENTO_ZOOM_TESELAS),
+            # La tolerancia se mide en el zoom más cercano de la banda, donde más se nota
+            'tolerancia': 0.0 if ultima else PIXELES_TOLERANCIA,
+            'escala': 10 ** decimales_para_zoom(zoom_max),
+        })
+    return bandas
+
+
+# ----- 3. ESCRITURA DE TESELAS -----
+def _teselas_de_segmentos(tx, ty, segmentos):
+    """Expande cada segmento (i, i+1) a todas las teselas que toca su caja envolvente."""
+    x0 = np.minimum(tx[segmentos], tx[segmentos + 1])
+    x1 = np.maximum(tx[segmentos], tx[segmentos + 1])
+    y0 = np.minimum(ty[segmentos], ty[segmentos + 1])
+    y1 = np.maximum(ty[segmentos], ty[segmentos + 1])
+    ancho = x1 - x0 + 1
+    cuenta = ancho * (y1 - y0 + 1)
+    repetido = np.repeat(np.arange(len(segmentos)), cuenta)
+    offset = np.arange(cuenta.sum()) - np.repeat(np.cumsum(cuenta) - cuenta, cuenta)
+    return (segmentos[repetido],
+            x0[repetido] + offset % ancho[repetido],
+            y0[repetido] + offset // ancho[repetido])
+
+
+def _guardar_tesela(directorio, banda, clave, caracteristicas):
+    path = os.path.join(directorio, str(banda), f"{clave}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        # json.dumps usa el codificador en C; json.dump escribe por fragmentos en Python
+        f.write(json.dumps({'type': 'FeatureCollection', 'features': caracteristicas},
+                           ensure_ascii=False, separators=(',', ':')))
+    return os.path.getsize(path)
+
+
+def escribir_teselas(directorio, latitudes_paradas, longitudes_paradas, limites, propiedades_rutas,
+                     latitudes_tiendas=None, longitudes_tiendas=None, nombres_tiendas=None, bandas=None):
+    """
+    Escribe directorio/<banda>/<x>/<y>.json para cada banda de zoom y devuelve el índice.
+    Las paradas van concatenadas ruta por ruta, partidas por 'limites' (como np.split), con
+    una entrada de 'propiedades_rutas' por ruta. Cada tesela guarda solo los tramos de ruta
+    que la cruzan, con coordenadas enteras [lon * escala, lat * escala].
+    """
+    bandas = definir_bandas() if bandas is None else bandas
+    # Solo se borra un directorio que ya fue escrito por esta función
+    if os.path.exists(os.path.join(directorio, ARCHIVO_INDICE_TESELAS)):
+        shutil.rmtree(directorio)
+    os.makedirs(directorio, exist_ok=True)
+
+    latitudes_paradas = np.asarray(latitudes_paradas, dtype=np.float64)
+    longitudes_paradas = np.asarray(longitudes_paradas, dtype=np.float64)
+    mx, my = proyectar_mercator(latitudes_paradas, longitudes_paradas)
+    inicios_rutas = np.concatenate(([0], np.asarray(limites, dtype=np.int64)))
+    finales_rutas = np.append(inicios_rutas[1:], len(mx))
+    tiendas_presentes = latitudes_tiendas is not None and len(latitudes_tiendas) > 0
+    if tiendas_presentes:
+        latitudes_tiendas = np.asarray(latitudes_tiendas, dtype=np.float64)
+        longitudes_tiendas = np.asarray(longitudes_tiendas, dtype=np.float64)
+        mx_tiendas, my_tiendas = proyectar_mercator(latitudes_tiendas, longitudes_tiendas)
+
+    total_bytes = 0
+    for num_banda, banda in enumerate(bandas):
+        # Simplificar cada ruta en píxeles del zoom máximo de la banda
+        pixeles = 256 * 2 ** banda['zoom_max']
+        conservar = np.ones(len(mx), dtype=bool)
+        if banda['tolerancia'] > 0:
+            puntos = np.column_stack((mx, my)) * pixeles
+            for inicio, fin in zip(inicios_rutas, finales_rutas):
+                conservar[inicio:fin] = douglas_peucker(puntos[inicio:fin], banda['tolerancia'])
+        indices = np.flatnonzero(conservar)
+        id_ruta = np.searchsorted(inicios_rutas, indices, side='right') - 1
+
+        # Cuantizar y quitar vértices repetidos consecutivos de la misma ruta
+        escala = banda['escala']
+        qx = np.round(longitudes_paradas[indices] * escala).astype(np.int64)
+        qy = np.round(latitudes_paradas[indices] * escala).astype(np.int64)
+        distinto = np.ones(len(indices), dtype=bool)
+        distinto[1:] = (qx[1:] != qx[:-1]) | (qy[1:] != qy[:-1]) | (id_ruta[1:] != id_ruta[:-1])
+        indices, id_ruta, qx, qy = indices[distinto], id_ruta[distinto], qx[distinto], qy[distinto]
+
+        # Repartir segmentos entre teselas y unir los consecutivos de una misma ruta
+        teselas = 2 ** banda['zoom_teselas']
+        tx = np.minimum((mx[indices] * teselas).astype(np.int64), teselas - 1)
+        ty = np.minimum((my[indices] * teselas).astype(np.int64), teselas - 1)
+        segmentos = np.flatnonzero(id_ruta[1:] == id_ruta[:-1])
+        seg, sx, sy = _teselas_de_segmentos(tx, ty, segmentos)
+        orden = np.lexsort((seg, sy, sx))
+        seg, sx, sy = seg[orden], sx[orden], sy[orden]
+
+        caracteristicas_por_tesela = {}
+        if len(seg):
+            otra_tesela = (sx[1:] != sx[:-1]) | (sy[1:] != sy[:-1])
+            corte = np.flatnonzero(otra_tesela | (seg[1:] != seg[:-1] + 1)
+                                   | (id_ruta[seg[1:]] != id_ruta[seg[:-1]])) + 1
+            for tramo in np.split(np.arange(len(seg)), corte):
+                primero, ultimo = seg[tramo[0]], seg[tramo[-1]] + 1
+                r = int(id_ruta[primero])
+                clave = f"{sx[tramo[0]]}/{sy[tramo[0]]}"
+                caracteristicas_por_tesela.setdefault(clave, []).append({
+                    'type': 'Feature',
+                    'geometry': {'type': 'LineString',
+                                 'coordinates': np.column_stack((qx[primero:ultimo + 1],
+                                                                 qy[primero:ultimo + 1])).tolist()},
+                    'properties': propiedades_rutas[r],
+                })
+
+        if tiendas_presentes and banda['zoom_min'] >= ZOOM_MINIMO_TIENDAS:
+            tx_t = np.minimum((mx_tiendas * teselas).astype(np.int64), teselas - 1)
+            ty_t = np.minimum((my_tiendas * teselas).astype(np.int64), teselas - 1)
+            qx_t = np.round(longitudes_tiendas * escala).astype(np.int64).tolist()
+            qy_t = np.round(latitudes_tiendas * escala).astype(np.int64).tolist()
+            for x, y, lon, lat, nombre in zip(tx_t.tolist(), ty_t.tolist(), qx_t, qy_t, nombres_tiendas):
+                caracteristicas_por_tesela.setdefault(f"{x}/{y}", []).append({
+                    'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                    'properties': {'nombre': str(nombre)},
+                })
+
+        for clave, caracteristicas in caracteristicas_por_tesela.items():
+            total_bytes += _guardar_tesela(directorio, num_banda, clave, caracteristicas)
+        banda['teselas'] = sorted(caracteristicas_por_tesela)
+        banda['vertices'] = int(len(indices))
+
+    indice = {'bandas': bandas, 'total_bytes': total_bytes}
+    with open(os.path.join(directorio, ARCHIVO_INDICE_TESELAS), 'w', encoding='utf-8') as f:
+        json.dump(indice, f, separators=(',', ':'))
+    return indice
+
+
+# ----- 4. CARGA BAJO DEMANDA EN EL MAPA -----
+class CargadorTeselas(MacroElement):
+    """Elemento de folium que descarga las teselas visibles de la banda del zoom actual."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function () {
+            var mapa = {{ this._parent.get_name() }};
+            var config = {{ this.config }};
+            var grupos = config.bandas.map(function () { return L.layerGroup(); });
+            var disponibles = config.bandas.map(function (b) { return new Set(b.teselas); });
+            var cargadas = config.bandas.map(function () { return new Set(); });
+
+            function capa(datos, escala) {
+                return L.geoJSON(datos, {
+                    coordsToLatLng: function (c) { return L.latLng(c[1] / escala, c[0] / escala); },
+                    style: function (f) { return {color: f.properties.color, weight: 3, opacity: 0.9}; },
+                    pointToLayer: function (f, ll) {
+                        return L.circleMarker(ll, {radius: 5, color: 'blue', fill: true, fillColor: 'blue'});
+                    },
+                    onEachFeature: function (f, l) {
+                        var p = f.properties;
+                        l.bindPopup(p.nombre !== undefined
+                            ? '<b>' + p.nombre + '</b><br>Tipo: Tienda'
+                            : '<b>' + p.ruta + '</b><br>Costo: ' + p.costo + '<br>Distancia: ' + p.distancia);
+                    }
+                });
+            }
+
+            function tesela(lat, lon, z) {
+                var n = Math.pow(2, z), r = lat * Math.PI / 180;
+                var x = Math.floor((lon + 180) / 360 * n);
+                var y = Math.floor((1 - Math.asinh(Math.tan(r)) / Math.PI) / 2 * n);
+                return [Math.min(Math.max(x, 0), n - 1), Math.min(Math.max(y, 0), n - 1)];
+            }
+
+            function actualizar() {
+                var zoom = mapa.getZoom(), activa = -1;
+                config.bandas.forEach(function (b, i) { if (zoom >= b.zoom_min && zoom <= b.zoom_max) activa = i; });
+                // Por debajo de la primera banda se usa la más gruesa: la flota completa sigue visible
+                if (activa < 0 && zoom < config.bandas[0].zoom_min) activa = 0;
+                grupos.forEach(function (g, i) {
+                    if (i === activa) { mapa.addLayer(g); } else { mapa.removeLayer(g); }
+                });
+                if (activa < 0) return;
+                var banda = config.bandas[activa], limites = mapa.getBounds();
+                var no = tesela(limites.getNorth(), limites.getWest(), banda.zoom_teselas);
+                var se = tesela(limites.getSouth(), limites.getEast(), banda.zoom_teselas);
+                for (var x = no[0]; x <= se[0]; x++) {
+                    for (var y = no[1]; y <= se[1]; y++) {
+                        var clave = x + '/' + y;
+                        if (!disponibles[activa].has(clave) || cargadas[activa].has(clave)) continue;
+                        cargadas[activa].add(clave);
+                        // Si la descarga falla la tesela deja de contar como cargada y se
+                        // vuelve a pedir en el siguiente 'moveend'
+                        (function (g, escala, cargadasBanda, clave, url) {
+                            fetch(url)
+                                .then(function (r) {
+                                    if (!r.ok) throw new Error(r.status + ' ' + url);
+                                    return r.json();
+                                })
+                                .then(function (datos) { capa(datos, escala).addTo(g); })
+                                .catch(function () { cargadasBanda.delete(clave); });
+                        })(grupos[activa], banda.escala, cargadas[activa], clave,
+                           config.url + '/' + activa + '/' + clave + '.json');
+                    }
+                }
+            }
+
+            mapa.on('moveend', actualizar);
+            actualizar();
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, url, indice):
+        super().__init__()
+        self._name = 'CargadorTeselas'
+        bandas = [{k: b[k] for k in ('zoom_min', 'zoom_max', 'zoom_teselas', 'escala', 'teselas')}
+                  for b in indice['bandas']]
+        self.config = json.dumps({'url': url, 'bandas': bandas}, separators=(',', ':'))
\ No newline at end of file
@@ -1,29 +1,153 @@
 # verificar_rutas.py
-import pandas as pd
+"""
+Valida la solución de la última ejecución contra las matrices: cada tienda visitada
+exactamente una vez, cada ruta inicia y termina en el mismo Centro de Distribución y el
+costo y la distancia reportados coinciden con los recalculados. Todas las revisiones se
+hacen de forma vectorizada sobre el arreglo de paradas; termina con código 1 si hay errores,
+para usarse como compuerta después de cada corrida.
 
-# Nombre del archivo que vamos a verificar
+Uso:
+    python verificar_rutas.py
+    python verificar_rutas.py --tiendas-parciales   # escenarios con un subconjunto de tiendas
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from routing_sa import (
+    ARCHIVO_UBICACIONES, ARCHIVO_COSTOS_COMBUSTIBLE, ARCHIVO_DISTANCIAS,
+    ARCHIVO_COSTOS_BINARIO, ARCHIVO_DISTANCIAS_BINARIO, USAR_MATRICES_BINARIAS, PROVEEDOR_METRICA,
+    cargar_datos, leer_salida_tipada,
+)
+
+# Nombre del archivo que vamos a verificar (la salida tipada se prefiere si existe)
 ARCHIVO_RUTAS = 'rutas_optimizadas.csv'
+ARCHIVO_RUTAS_TIPADA = 'rutas_optimizadas.parquet'
+ARCHIVO_PARADAS = 'paradas_optimizadas.parquet'
 
-print(f"--- Verificando el archivo: {ARCHIVO_RUTAS} ---")
-
-try:
-    df_rutas = pd.read_csv(ARCHIVO_RUTAS)
-    
-    num_rutas = len(df_rutas)
-    print(f"\nResultado: Se encontraron {num_rutas} rutas en el archivo.")
-    
-    if num_rutas > 0:
-        print("\nAnálisis de cada ruta encontrada:")
-        for index, row in df_rutas.iterrows():
-            id_ruta = row['id_ruta']
-            nodos = row['nodos'].split(';')
-            nodo_inicio = nodos[0]
-            print(f"  - Ruta #{id_ruta}: Inicia en el Centro de Distribución con ID '{nodo_inicio}'")
-    
-    print("\n--- Verificación Terminada ---")
+TOLERANCIA_COSTO = 0.01      # El CSV reporta costo y distancia redondeados a 2 decimales
+MAX_EJEMPLOS_ERROR = 10      # Nodos o rutas que se listan por cada tipo de error
+
+
+def validar_solucion(df_rutas, df_paradas, matriz_costos, matriz_distancias, depots,
+                     tiendas_parciales=False, tolerancia=None):
+    """
+    Devuelve un diccionario {revisión: arreglo de rutas o nodos con error}; vacío si la
+    solución es válida. Un solo gather por matriz y un conteo de visitas sobre las paradas.
+    """
+    tolerancia = TOLERANCIA_COSTO if tolerancia is None else tolerancia
+    num_nodos = matriz_costos.shape[0]
+    errores = {}
+
+    # Paradas ordenadas ruta por ruta; cada ruta es un tramo contiguo del arreglo
+    id_ruta = df_paradas['id_ruta'].to_numpy()
+    orden = np.lexsort((df_paradas['secuencia'].to_numpy(), id_ruta))
+    id_ruta = id_ruta[orden]
+    nodos = df_paradas['id_nodo'].to_numpy().astype(np.int64)[orden]
+
+    fuera_de_rango = (nodos < 0) | (nodos >= num_nodos)
+    if fuera_de_rango.any():
+        errores['nodos_fuera_de_rango'] = np.unique(nodos[fuera_de_rango])
+        return errores  # Sin índices válidos no se puede indexar las matrices
+
+    inicios = np.flatnonzero(np.r_[True, id_ruta[1:] != id_ruta[:-1]])
+    finales = np.r_[inicios[1:], len(nodos)] - 1
+    ids = id_ruta[inicios]
+    es_depot = np.zeros(num_nodos, dtype=bool)
+    es_depot[np.asarray(depots, dtype=np.int64)] = True
+
+    # Rutas que no coinciden entre las dos tablas
+    ids_reportados = df_rutas['id_ruta'].to_numpy()
+    sin_paradas = np.setdiff1d(ids_reportados, ids)
+    if len(sin_paradas):
+        errores['rutas_sin_paradas'] = sin_paradas
+    sin_resumen = np.setdiff1d(ids, ids_reportados)
+    if len(sin_resumen):
+        errores['paradas_sin_ruta'] = sin_resumen
+
+    # Cierre: cada ruta sale y vuelve al mismo Centro de Distribución
+    primero, ultimo = nodos[inicios], nodos[finales]
+    mal_cerradas = ~es_depot[primero] | (primero != ultimo) | (finales - inicios < 2)
+    if mal_cerradas.any():
+        errores['rutas_sin_cierre_en_depot'] = ids[mal_cerradas]
 
-except FileNotFoundError:
-    print(f"\nERROR: No se encontró el archivo '{ARCHIVO_RUTAS}'.")
-    print("Asegúrate de que este script esté en la misma carpeta que 'rutas_optimizadas.csv'.")
-except Exception as e:
-    print(f"\nOcurrió un error inesperado al leer el archivo: {e}")
\ No newline at end of file
+    # Las paradas intermedias son tiendas (un depot a media ruta también se reporta)
+    intermedia = np.ones(len(nodos), dtype=bool)
+    intermedia[inicios] = False
+    intermedia[finales] = False
+    depot_intermedio = intermedia & es_depot[nodos]
+    if depot_intermedio.any():
+        errores['depot_a_media_ruta'] = np.unique(id_ruta[depot_intermedio])
+
+    # Cobertura: visitas por nodo en un solo conteo
+    visitas = np.bincount(nodos[intermedia], minlength=num_nodos)
+    duplicadas = np.flatnonzero((visitas > 1) & ~es_depot)
+    if len(duplicadas):
+        errores['tiendas_duplicadas'] = duplicadas
+    if not tiendas_parciales:
+        faltantes = np.flatnonzero((visitas == 0) & ~es_depot)
+        if len(faltantes):
+            errores['tiendas_sin_visitar'] = faltantes
+
+    # Costo y distancia recalculados: un gather por matriz y una suma por ruta
+    df_rutas = df_rutas.set_index('id_ruta').reindex(ids)
+    mismo_tramo = id_ruta[1:] == id_ruta[:-1]
+    posicion_ruta = np.cumsum(np.r_[False, ~mismo_tramo])  # Posición de la ruta de cada parada
+    ruta_del_tramo = posicion_ruta[1:][mismo_tramo]
+    for revision, columna, matriz in (('costo_distinto', 'costo_combustible', matriz_costos),
+                                      ('distancia_distinta', 'distancia_km', matriz_distancias)):
+        tramos = np.asarray(matriz[nodos[:-1][mismo_tramo], nodos[1:][mismo_tramo]], dtype=np.float64)
+        recalculado = np.bincount(ruta_del_tramo, weights=tramos, minlength=len(ids))
+        reportado = df_rutas[columna].to_numpy(dtype=np.float64)
+        distinto = ~np.isclose(reportado, recalculado, rtol=0, atol=tolerancia)
+        if distinto.any():
+            errores[revision] = ids[distinto]
+
+    # El resumen por ruta describe las paradas
+    depot_distinto = df_rutas['depot'].to_numpy() != primero
+    num_tiendas_distinto = df_rutas['num_tiendas'].to_numpy() != finales - inicios - 1
+    if (depot_distinto | num_tiendas_distinto).any():
+        errores['resumen_inconsistente'] = ids[depot_distinto | num_tiendas_distinto]
+    return errores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Valida la solución contra las matrices de costos y distancias.")
+    parser.add_argument('--tiendas-parciales', action='store_true',
+                        help="No exigir que se visiten todas las tiendas (escenarios con un subconjunto).")
+    args = parser.parse_args()
+
+    print(f"--- Verificando el archivo: {ARCHIVO_RUTAS} ---")
+
+    try:
+        df_rutas, df_paradas = leer_salida_tipada(ARCHIVO_RUTAS_TIPADA, ARCHIVO_PARADAS, ARCHIVO_RUTAS)
+    except FileNotFoundError:
+        print(f"\nERROR: No se encontró el archivo '{ARCHIVO_RUTAS}'.")
+        print("Asegúrate de que este script esté en la misma carpeta que 'rutas_optimizadas.csv'.")
+        sys.exit(1)
+
+    if USAR_MATRICES_BINARIAS:
+        path_costos, path_distancias = ARCHIVO_COSTOS_BINARIO, ARCHIVO_DISTANCIAS_BINARIO
+    else:
+        path_costos, path_distancias = ARCHIVO_COSTOS_COMBUSTIBLE, ARCHIVO_DISTANCIAS
+    _, matriz_costos, matriz_distancias, depots = cargar_datos(
+        ARCHIVO_UBICACIONES, path_costos, path_distancias, PROVEEDOR_METRICA
+    )
+
+    inicio = time.time()
+    errores = validar_solucion(df_rutas, df_paradas, matriz_costos, matriz_distancias, depots,
+                               tiendas_parciales=args.tiendas_parciales)
+    print(f"\nResultado: {len(df_rutas)} rutas y {len(df_paradas)} paradas revisadas "
+          f"en {time.time() - inicio:.3f} segundos.")
+
+    for revision, elementos in errores.items():
+        ejemplos = ', '.join(str(e) for e in elementos[:MAX_EJEMPLOS_ERROR])
+        print(f"  - ERROR {revision}: {len(elementos)} ({ejemplos}{', ...' if len(elementos) > MAX_EJEMPLOS_ERROR else ''})")
+    if not errores:
+        print("  Solución válida: cobertura completa, rutas cerradas en su depot y costos consistentes.")
+
+    print("\n--- Verificación Terminada ---")
+    sys.exit(1 if errores else 0)
\ No newline at end of file
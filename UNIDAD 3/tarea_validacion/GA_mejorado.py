@@ -8,13 +8,15 @@ CORRECCIONES IMPLEMENTADAS:
 - Reproducción mejorada con más variabilidad
 - Detección de estancamiento con reinicio parcial
 - Validación de mejora en cada generación
+- Rutas codificadas como permutaciones de enteros sobre una matriz de distancias
+  precalculada; la aptitud de toda la población se evalúa de una sola vez
+- Modelo de islas: subpoblaciones en procesos paralelos con migración de la élite
 
 """
 
-import random
 import numpy as np
-import pandas as pd
-import operator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from typing import List, Tuple, Dict
 
 
@@ -44,7 +46,11 @@ class Municipio:
     
     def distancia(self, otro_municipio: 'Municipio') -> float:
         """
-        Calcula la distancia entre dos municipios.        
+        Calcula la distancia entre dos municipios.
+        
+        El algoritmo ya no la usa: las distancias salen de matriz_distancias.
+        Se conserva como referencia escalar para comprobar esa matriz.
+        
         Args:
             otro_municipio: El municipio destino
             
@@ -72,12 +78,18 @@ class Municipio:
 
 
 # ============================================================================
-# CLASE APTITUD - Evalúa la calidad de una ruta
+# CLASE APTITUD - Referencia escalar de la evaluación de una ruta
 # ============================================================================
 
 class Aptitud:
     """
-    Evalúa la aptitud (fitness) de una ruta específica.
+    Evalúa la aptitud (fitness) de una ruta específica, arista por arista.
+    
+    Es la versión original de la evaluación y el algoritmo ya no la usa: la
+    aptitud de toda la población sale de distancias_poblacion. Se conserva
+    como referencia escalar, p. ej.
+    Aptitud([lista[i] for i in ruta]).distancia_ruta() coincide con
+    distancias_poblacion(ruta[None, :], matriz)[0].
     
     Atributos:
         ruta (List[Municipio]): Lista ordenada de municipios
@@ -136,101 +148,209 @@ class Aptitud:
         return self.f_aptitud
 
 
+# ============================================================================
+# MATRIZ DE DISTANCIAS - Rutas como permutaciones de enteros
+# ============================================================================
+
+def matriz_distancias(lista_municipios: List[Municipio]) -> np.ndarray:
+    """
+    Precalcula la distancia euclidiana entre cada par de municipios.
+    
+    Args:
+        lista_municipios: Lista de municipios (el índice de cada uno es su gen)
+        
+    Returns:
+        np.ndarray: Matriz (n, n) de distancias
+    """
+    coordenadas = np.array([(m.x, m.y) for m in lista_municipios], dtype=np.float64)
+    diferencias = coordenadas[:, None, :] - coordenadas[None, :, :]
+    return np.sqrt((diferencias ** 2).sum(axis=2))
+
+
+def distancias_poblacion(poblacion: np.ndarray, matriz: np.ndarray) -> np.ndarray:
+    """
+    Calcula la distancia total (con retorno al origen) de todas las rutas a la vez.
+    
+    Args:
+        poblacion: Arreglo (tamano_poblacion, n) de permutaciones de índices
+        matriz: Matriz de distancias
+        
+    Returns:
+        np.ndarray: Distancia de cada ruta
+    """
+    n = matriz.shape[0]
+    if n * n >= np.iinfo(poblacion.dtype).max:
+        poblacion = poblacion.astype(np.intp)
+    # Índice lineal de cada arista (i -> i+1, y la última hacia la primera): un solo
+    # gather sobre la matriz aplanada y una suma por fila
+    aristas = poblacion * n
+    aristas[:, :-1] += poblacion[:, 1:]
+    aristas[:, -1] += poblacion[:, 0]
+    return np.take(matriz.ravel(), aristas).sum(axis=1)
+
+
 # ============================================================================
 # FUNCIONES DE INICIALIZACIÓN
 # ============================================================================
 
-def crear_ruta(lista_municipios: List[Municipio]) -> List[Municipio]:
+def crear_generador(semilla: int = None) -> np.random.Generator:
+    """
+    Crea el generador aleatorio del algoritmo.
+    
+    Args:
+        semilla: Semilla para reproducir una corrida (None = aleatoria)
+        
+    Returns:
+        np.random.Generator: Generador de números aleatorios
+    """
+    return np.random.default_rng(semilla)
+
+
+def crear_ruta(num_municipios: int, rng: np.random.Generator = None) -> np.ndarray:
     """
     Crea una ruta aleatoria visitando todos los municipios.
     
     Args:
-        lista_municipios: Lista de municipios disponibles
+        num_municipios: Número de municipios disponibles
+        rng: Generador aleatorio
         
     Returns:
-        List[Municipio]: Ruta aleatoria (permutación de municipios)
+        np.ndarray: Ruta aleatoria (permutación de índices de municipios)
     """
-    return random.sample(lista_municipios, len(lista_municipios))
+    rng = crear_generador() if rng is None else rng
+    return rng.permutation(num_municipios).astype(np.int32)
 
 
-def poblacion_inicial(tamano_poblacion: int, lista_municipios: List[Municipio]) -> List[List[Municipio]]:
+def poblacion_inicial(tamano_poblacion: int, num_municipios: int,
+                      rng: np.random.Generator = None) -> np.ndarray:
     """
     Genera la población inicial de rutas aleatorias.
     
     Args:
         tamano_poblacion: Número de individuos en la población
-        lista_municipios: Lista de municipios a visitar
+        num_municipios: Número de municipios a visitar
+        rng: Generador aleatorio
         
     Returns:
-        List[List[Municipio]]: Población de rutas aleatorias
+        np.ndarray: Población (tamano_poblacion, num_municipios) de permutaciones
     """
-    poblacion = []
-    for i in range(tamano_poblacion):
-        poblacion.append(crear_ruta(lista_municipios))
-    return poblacion
+    rng = crear_generador() if rng is None else rng
+    # Una permutación independiente por fila
+    base = np.broadcast_to(np.arange(num_municipios, dtype=np.int32), (tamano_poblacion, num_municipios))
+    return rng.permuted(base, axis=1)
 
 
 # ============================================================================
 # FUNCIONES DE SELECCIÓN
 # ============================================================================
 
-def clasificacion_rutas(poblacion: List[List[Municipio]]) -> List[Tuple[int, float]]:
+METODOS_SELECCION = ('ruleta', 'torneo', 'sus')
+
+
+def aptitud_poblacion(poblacion: np.ndarray, matriz: np.ndarray) -> np.ndarray:
+    """
+    Calcula la aptitud (1 / distancia) de todas las rutas a la vez.
+    
+    Args:
+        poblacion: Arreglo (tamano_poblacion, n) de rutas (individuos)
+        matriz: Matriz de distancias
+        
+    Returns:
+        np.ndarray: Aptitud de cada ruta
+    """
+    return 1 / distancias_poblacion(poblacion, matriz)
+
+
+def clasificacion_rutas(poblacion: np.ndarray, matriz: np.ndarray) -> List[Tuple[int, float]]:
     """
     Clasifica todas las rutas de la población según su aptitud.
     
     Args:
-        poblacion: Lista de rutas (individuos)
+        poblacion: Arreglo (tamano_poblacion, n) de rutas (individuos)
+        matriz: Matriz de distancias
         
     Returns:
         List[]: Lista de tuplas (índice, aptitud) ordenada
     """
-    resultados_fitness = {}
-    
-    for i in range(len(poblacion)):
-        resultados_fitness[i] = Aptitud(poblacion[i]).ruta_apta()
+    aptitudes = aptitud_poblacion(poblacion, matriz)
     
     # Ordenar por aptitud (de mayor a menor)
-    return sorted(resultados_fitness.items(), key=operator.itemgetter(1), reverse=True)
+    orden = np.argsort(-aptitudes, kind='stable')
+    return list(zip(orden.tolist(), aptitudes[orden].tolist()))
 
 
-def seleccion_rutas(poblacion_clasificada: List[Tuple[int, float]], 
-                   elite_size: int) -> List[int]:
+def indices_elite(aptitudes: np.ndarray, elite_size: int) -> np.ndarray:
     """
-    Selecciona individuos para reproducción usando selección por ruleta.
+    Obtiene los índices de los mejores individuos, del mejor al peor.
+    
+    Args:
+        aptitudes: Aptitud de cada individuo
+        elite_size: Número de mejores individuos
+        
+    Returns:
+        np.ndarray: Índices de la élite
+    """
+    elite_size = min(elite_size, len(aptitudes))
+    if elite_size <= 0:
+        return np.empty(0, dtype=np.intp)
+    
+    # argpartition separa la élite en O(pop); solo la élite se ordena
+    elite = np.argpartition(-aptitudes, elite_size - 1)[:elite_size]
+    return elite[np.argsort(-aptitudes[elite], kind='stable')]
+
+
+def seleccion_rutas(aptitudes: np.ndarray, 
+                   elite_size: int,
+                   metodo: str = 'ruleta',
+                   tamano_torneo: int = 3,
+                   rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Selecciona individuos para reproducción.
     Combina elitismo (mejores individuos) con selección probabilística.
+    
+    Métodos:
+    - 'ruleta': probabilidad proporcional a la aptitud (np.searchsorted sobre la suma acumulada)
+    - 'torneo': el mejor de 'tamano_torneo' individuos elegidos al azar
+    - 'sus': muestreo estocástico universal (un solo giro con punteros equiespaciados)
         
     Args:
-        poblacion_clasificada: Población ordenada por aptitud
+        aptitudes: Aptitud de cada individuo
         elite_size: Número de mejores individuos a preservar (elitismo)
+        metodo: Método de selección para el resto
+        tamano_torneo: Individuos por torneo
+        rng: Generador aleatorio
         
     Returns:
-        List[]: Índices de los individuos seleccionados
+        np.ndarray: Índices de los individuos seleccionados (la élite primero)
     """
-    indices_seleccionados = []
-    
-    # Crear DataFrame para cálculos de probabilidad
-    df = pd.DataFrame(np.array(poblacion_clasificada), columns=["Indice", "Aptitud"])
-    df['suma_acumulada'] = df.Aptitud.cumsum()
-    df['porcentaje_acumulado'] = 100 * df.suma_acumulada / df.Aptitud.sum()
-    
-    # Elitismo: preservar los mejores individuos
-    for i in range(elite_size):
-        indices_seleccionados.append(int(poblacion_clasificada[i][0]))
+    rng = crear_generador() if rng is None else rng
+    tamano = len(aptitudes)
+    elite = indices_elite(aptitudes, elite_size)
+    restantes = tamano - len(elite)
     
-    # Selección por ruleta para el resto
-    for i in range(len(poblacion_clasificada) - elite_size):
-        seleccion_aleatoria = 100 * random.random()
-        
-        for j in range(len(poblacion_clasificada)):
-            if seleccion_aleatoria <= df.iat[j, 3]:
-                indices_seleccionados.append(int(poblacion_clasificada[j][0]))
-                break
+    if metodo == 'ruleta':
+        suma_acumulada = np.cumsum(aptitudes)
+        giros = rng.random(restantes) * suma_acumulada[-1]
+        elegidos = np.searchsorted(suma_acumulada, giros, side='right')
+    elif metodo == 'sus':
+        suma_acumulada = np.cumsum(aptitudes)
+        paso = suma_acumulada[-1] / max(restantes, 1)
+        punteros = (rng.random() + np.arange(restantes)) * paso
+        elegidos = np.searchsorted(suma_acumulada, punteros, side='right')
+    elif metodo == 'torneo':
+        candidatos = rng.integers(0, tamano, size=(restantes, tamano_torneo))
+        ganador = np.argmax(aptitudes[candidatos], axis=1)
+        elegidos = candidatos[np.arange(restantes), ganador]
+    else:
+        raise ValueError(f"Método de selección desconocido: {metodo} (opciones: {METODOS_SELECCION})")
     
-    return indices_seleccionados
+    # El redondeo de la suma acumulada puede dejar un giro justo en el total
+    elegidos = np.minimum(elegidos, tamano - 1)
+    return np.concatenate([elite, elegidos])
 
 
-def grupo_apareamiento(poblacion: List[List[Municipio]], 
-                      indices_seleccionados: List[int]) -> List[List[Municipio]]:
+def grupo_apareamiento(poblacion: np.ndarray, 
+                      indices_seleccionados: List[int]) -> np.ndarray:
     """
     Crea el grupo de apareamiento a partir de los índices seleccionados.
     
@@ -239,61 +359,96 @@ def grupo_apareamiento(poblacion: List[List[Municipio]],
         indices_seleccionados: Índices de individuos seleccionados
         
     Returns:
-        List[]: Grupo de individuos para reproducción
+        np.ndarray: Grupo de individuos para reproducción
     """
-    grupo = []
-    for indice in indices_seleccionados:
-        grupo.append(poblacion[indice])
-    return grupo
+    return poblacion[np.asarray(indices_seleccionados, dtype=np.intp)]
 
 
 # ============================================================================
 # FUNCIONES DE REPRODUCCIÓN (CROSSOVER)
 # ============================================================================
 
-def reproduccion(progenitor1: List[Municipio], 
-                progenitor2: List[Municipio]) -> List[Municipio]:
+def puntos_corte(num_individuos: int, tamano: int,
+                 rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Realiza el cruce (crossover) entre dos progenitores.
-    Usa el método de Ordered Crossover (OX).
-        
+    Elige dos puntos de corte distintos por individuo.
+    
     Args:
-        progenitor1: Primera ruta padre
-        progenitor2: Segunda ruta padre
+        num_individuos: Número de individuos
+        tamano: Número de genes
+        rng: Generador aleatorio
         
     Returns:
-        List[Municipio]: Ruta hijo resultante del cruce
+        Tuple[np.ndarray, np.ndarray]: Inicio y fin (inicio < fin) de cada segmento
+    """
+    punto_a = rng.integers(0, tamano, size=num_individuos)
+    # Desplazamiento de 1 a tamano-1: el segundo punto nunca coincide con el primero
+    punto_b = (punto_a + rng.integers(1, max(tamano, 2), size=num_individuos)) % tamano
+    return np.minimum(punto_a, punto_b), np.maximum(punto_a, punto_b)
+
+
+def cruce_ox(padres: np.ndarray, madres: np.ndarray,
+             rng: np.random.Generator) -> np.ndarray:
     """
-    hijo = []
-    hijo_parte1 = []
-    hijo_parte2 = []
+    Ordered Crossover (OX) para muchas parejas a la vez.
     
-    # CORRECCIÓN: Asegurar puntos de corte diferentes y válidos
-    tamano = len(progenitor1)
-    punto_corte_a = random.randint(0, tamano - 1)
-    punto_corte_b = random.randint(0, tamano - 1)
+    Cada hijo toma un segmento del padre y lo completa con los genes de la madre
+    que no están en el segmento, en el orden en que aparecen en ella.
     
-    # Asegurar que sean diferentes
-    while punto_corte_a == punto_corte_b:
-        punto_corte_b = random.randint(0, tamano - 1)
+    Args:
+        padres: Arreglo (k, n) de primeros progenitores
+        madres: Arreglo (k, n) de segundos progenitores
+        rng: Generador aleatorio
+        
+    Returns:
+        np.ndarray: Arreglo (k, n) de hijos
+    """
+    num_hijos, tamano = padres.shape
+    inicio, fin = puntos_corte(num_hijos, tamano, rng)
+    filas = np.arange(num_hijos)[:, None]
+    posiciones = np.arange(tamano)
     
-    inicio_segmento = min(punto_corte_a, punto_corte_b)
-    fin_segmento = max(punto_corte_a, punto_corte_b)
+    # Máscara de posiciones del segmento y, a partir de ella, máscara de pertenencia por gen
+    en_segmento = (posiciones >= inicio[:, None]) & (posiciones < fin[:, None])
+    gen_en_segmento = np.zeros((num_hijos, tamano), dtype=bool)
+    gen_en_segmento[filas, padres] = en_segmento
+    conservar = ~gen_en_segmento[filas, madres]
     
-    # Copiar segmento del progenitor 1
-    for i in range(inicio_segmento, fin_segmento):
-        hijo_parte1.append(progenitor1[i])
+    hijos = np.empty_like(padres)
     
-    # Completar con genes del progenitor 2 (preservando orden)
-    hijo_parte2 = [item for item in progenitor2 if item not in hijo_parte1]
+    # Segmento del padre al inicio del hijo
+    fila, columna = np.nonzero(en_segmento)
+    hijos[fila, columna - inicio[fila]] = padres[fila, columna]
     
-    # Combinar ambas partes
-    hijo = hijo_parte1 + hijo_parte2
-    return hijo
+    # Genes restantes de la madre, en su orden, a continuación del segmento
+    destino = (fin - inicio)[:, None] + np.cumsum(conservar, axis=1) - 1
+    fila, columna = np.nonzero(conservar)
+    hijos[fila, destino[fila, columna]] = madres[fila, columna]
+    return hijos
+
+
+def reproduccion(progenitor1: np.ndarray, 
+                progenitor2: np.ndarray,
+                rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Realiza el cruce (crossover) entre dos progenitores.
+    Usa el método de Ordered Crossover (OX).
+        
+    Args:
+        progenitor1: Primera ruta padre
+        progenitor2: Segunda ruta padre
+        rng: Generador aleatorio
+        
+    Returns:
+        np.ndarray: Ruta hijo resultante del cruce
+    """
+    rng = crear_generador() if rng is None else rng
+    return cruce_ox(progenitor1[None, :], progenitor2[None, :], rng)[0]
 
 
-def reproduccion_poblacion(grupo: List[List[Municipio]], 
-                          elite_size: int) -> List[List[Municipio]]:
+def reproduccion_poblacion(grupo: np.ndarray, 
+                          elite_size: int,
+                          rng: np.random.Generator = None) -> np.ndarray:
     """
     Genera una nueva población mediante reproducción.
     
@@ -302,104 +457,153 @@ def reproduccion_poblacion(grupo: List[List[Municipio]],
     Args:
         grupo: Grupo de apareamiento
         elite_size: Número de individuos élite a preservar
+        rng: Generador aleatorio
         
     Returns:
-        List[List[Municipio]]: Nueva población de hijos
+        np.ndarray: Nueva población de hijos
     """
-    hijos = []
+    rng = crear_generador() if rng is None else rng
     tamano_reproduccion = len(grupo) - elite_size
     
-    # Preservar la élite sin cambios
-    for i in range(elite_size):
-        hijos.append(grupo[i])
-    
     # CORRECCIÓN: Mezclar mejor el pool de reproducción
-    pool_padres = random.sample(grupo, len(grupo))
-    pool_madres = random.sample(grupo, len(grupo))
+    pool_padres = rng.permutation(len(grupo))
+    pool_madres = rng.permutation(len(grupo))
     
-    # Generar hijos mediante cruce
-    for i in range(tamano_reproduccion):
-        padre = pool_padres[i % len(pool_padres)]
-        madre = pool_madres[(i + 1) % len(pool_madres)]
-        hijo = reproduccion(padre, madre)
-        hijos.append(hijo)
+    # Generar todos los hijos mediante cruce de una sola vez
+    i = np.arange(tamano_reproduccion)
+    padres = grupo[pool_padres[i % len(grupo)]]
+    madres = grupo[pool_madres[(i + 1) % len(grupo)]]
+    hijos = cruce_ox(padres, madres, rng)
     
-    return hijos
+    # Preservar la élite sin cambios
+    return np.concatenate([grupo[:elite_size], hijos])
 
 
 # ============================================================================
 # FUNCIONES DE MUTACIÓN - MEJORADAS
 # ============================================================================
 
-def mutacion(individuo: List[Municipio], tasa_mutacion: float) -> List[Municipio]:
+TIPOS_MUTACION = ('swap', 'inversion', 'scramble')
+
+
+def _mutacion_swap(poblacion: np.ndarray, tasa_mutacion: float,
+                   rng: np.random.Generator) -> None:
+    """Intercambia cada gen, con probabilidad tasa_mutacion, con otra posición al azar."""
+    num_individuos, tamano = poblacion.shape
+    fila, posicion = np.nonzero(rng.random((num_individuos, tamano)) < tasa_mutacion)
+    if len(fila) == 0 or tamano < 2:
+        return
+    otra = (posicion + rng.integers(1, tamano, size=len(fila))) % tamano
+    
+    # Los intercambios de un mismo individuo se aplican en orden: en cada ronda va a lo
+    # más uno por individuo, así que la ronda completa es una asignación vectorizada
+    primero_de_fila = np.searchsorted(fila, fila, side='left')
+    ronda = np.arange(len(fila)) - primero_de_fila
+    for r in range(ronda.max() + 1):
+        sel = ronda == r
+        f, a, b = fila[sel], posicion[sel], otra[sel]
+        poblacion[f, a], poblacion[f, b] = poblacion[f, b], poblacion[f, a]
+
+
+def _mutacion_segmento(poblacion: np.ndarray, tasa_mutacion: float,
+                       rng: np.random.Generator, tipo: str) -> None:
+    """Invierte o revuelve un segmento al azar de cada individuo que muta."""
+    num_individuos, tamano = poblacion.shape
+    # Misma probabilidad de que un individuo cambie que con el swap por gen
+    prob_individuo = 1 - (1 - tasa_mutacion) ** tamano
+    mutan = np.flatnonzero(rng.random(num_individuos) < prob_individuo)
+    if len(mutan) == 0 or tamano < 2:
+        return
+    inicio, fin = puntos_corte(len(mutan), tamano, rng)
+    posiciones = np.arange(tamano)
+    en_segmento = (posiciones >= inicio[:, None]) & (posiciones <= fin[:, None])
+    
+    if tipo == 'inversion':
+        origen = np.where(en_segmento, (inicio + fin)[:, None] - posiciones, posiciones)
+    else:
+        # Claves aleatorias dentro del segmento, fijas fuera de él: argsort solo revuelve el segmento
+        claves = np.where(en_segmento,
+                          inicio[:, None] - 0.5 + rng.random((len(mutan), tamano)) * (fin - inicio + 1)[:, None],
+                          posiciones)
+        origen = np.argsort(claves, axis=1)
+    poblacion[mutan] = np.take_along_axis(poblacion[mutan], origen, axis=1)
+
+
+def mutacion_poblacion(poblacion: np.ndarray, 
+                      tasa_mutacion: float,
+                      rng: np.random.Generator = None,
+                      tipo: str = 'swap',
+                      elite_size: int = 0) -> np.ndarray:
     """
-    Aplica mutación por intercambio (swap mutation) a un individuo.
+    Aplica mutación a toda la población a la vez.
     
-    CORRECCIÓN: Garantiza al menos un intercambio si la tasa lo permite
+    Tipos:
+    - 'swap': cada gen se intercambia con otro con probabilidad tasa_mutacion
+    - 'inversion': invierte un segmento al azar
+    - 'scramble': revuelve un segmento al azar
+    
+    En 'inversion' y 'scramble' un individuo muta con la misma probabilidad de
+    ser alterado que con 'swap': 1 - (1 - tasa_mutacion) ** n.
     
     Args:
-        individuo: Ruta a mutar
-        tasa_mutacion: Probabilidad de mutación para cada gen
+        poblacion: Población a mutar
+        tasa_mutacion: Probabilidad de mutación
+        rng: Generador aleatorio
+        tipo: Tipo de mutación
+        elite_size: Primeros individuos que no se mutan (la élite)
         
     Returns:
-        List[Municipio]: Individuo mutado
+        np.ndarray: Población mutada
     """
-    # Crear copia para no modificar el original
-    individuo_mutado = individuo.copy()
+    rng = crear_generador() if rng is None else rng
+    # Crear copia para no modificar la original
+    poblacion_mutada = poblacion.copy()
+    candidatos = poblacion_mutada[elite_size:]
     
-    for posicion in range(len(individuo_mutado)):
-        # Decidir si mutar basado en la tasa de mutación
-        if random.random() < tasa_mutacion:
-            # Seleccionar posición aleatoria para intercambio (diferente a la actual)
-            posicion_intercambio = random.randint(0, len(individuo_mutado) - 1)
-            
-            # Asegurar que no sea la misma posición
-            while posicion_intercambio == posicion:
-                posicion_intercambio = random.randint(0, len(individuo_mutado) - 1)
-            
-            # Intercambiar genes
-            ciudad1 = individuo_mutado[posicion]
-            ciudad2 = individuo_mutado[posicion_intercambio]
-            
-            individuo_mutado[posicion] = ciudad2
-            individuo_mutado[posicion_intercambio] = ciudad1
+    if tipo == 'swap':
+        _mutacion_swap(candidatos, tasa_mutacion, rng)
+    elif tipo in ('inversion', 'scramble'):
+        _mutacion_segmento(candidatos, tasa_mutacion, rng, tipo)
+    else:
+        raise ValueError(f"Tipo de mutación desconocido: {tipo} (opciones: {TIPOS_MUTACION})")
     
-    return individuo_mutado
+    return poblacion_mutada
 
 
-def mutacion_poblacion(poblacion: List[List[Municipio]], 
-                      tasa_mutacion: float) -> List[List[Municipio]]:
+def mutacion(individuo: np.ndarray, tasa_mutacion: float,
+             rng: np.random.Generator = None, tipo: str = 'swap') -> np.ndarray:
     """
-    Aplica mutación a toda la población.
+    Aplica mutación a un individuo.
     
     Args:
-        poblacion: Población a mutar
-        tasa_mutacion: Probabilidad de mutación
+        individuo: Ruta a mutar
+        tasa_mutacion: Probabilidad de mutación para cada gen
+        rng: Generador aleatorio
+        tipo: 'swap', 'inversion' o 'scramble'
         
     Returns:
-        List[List[Municipio]]: Población mutada
+        np.ndarray: Individuo mutado
     """
-    poblacion_mutada = []
-    
-    for individuo in poblacion:
-        individuo_mutado = mutacion(individuo, tasa_mutacion)
-        poblacion_mutada.append(individuo_mutado)
-    
-    return poblacion_mutada
+    return mutacion_poblacion(individuo[None, :], tasa_mutacion, rng, tipo)[0]
 
 
 # ============================================================================
 # FUNCIÓN PRINCIPAL DE EVOLUCIÓN - MEJORADA
 # ============================================================================
 
-def nueva_generacion(generacion_actual: List[List[Municipio]], 
+def nueva_generacion(generacion_actual: np.ndarray, 
                     elite_size: int, 
-                    tasa_mutacion: float) -> List[List[Municipio]]:
+                    tasa_mutacion: float,
+                    matriz: np.ndarray,
+                    metodo_seleccion: str = 'ruleta',
+                    aptitudes: np.ndarray = None,
+                    rng: np.random.Generator = None,
+                    tipo_mutacion: str = 'swap') -> np.ndarray:
     """
     Genera una nueva generación completa aplicando todos los operadores genéticos.
     
     Pasos:
-    1. Clasificar rutas por aptitud
+    1. Evaluar la aptitud de las rutas
     2. Seleccionar individuos para reproducción
     3. Crear grupo de apareamiento
     4. Realizar cruces para generar hijos
@@ -409,24 +613,32 @@ def nueva_generacion(generacion_actual: List[List[Municipio]],
         generacion_actual: Población actual
         elite_size: Tamaño de la élite
         tasa_mutacion: Probabilidad de mutación
+        matriz: Matriz de distancias
+        metodo_seleccion: 'ruleta', 'torneo' o 'sus'
+        aptitudes: Aptitud ya calculada de generacion_actual (opcional)
+        rng: Generador aleatorio
+        tipo_mutacion: 'swap', 'inversion' o 'scramble'
         
     Returns:
-        List[List[Municipio]]: Nueva generación
+        np.ndarray: Nueva generación
     """
-    # Paso 1: Clasificar rutas
-    poblacion_clasificada = clasificacion_rutas(generacion_actual)
+    rng = crear_generador() if rng is None else rng
+    
+    # Paso 1: Evaluar rutas
+    if aptitudes is None:
+        aptitudes = aptitud_poblacion(generacion_actual, matriz)
     
     # Paso 2: Seleccionar candidatos
-    indices_seleccionados = seleccion_rutas(poblacion_clasificada, elite_size)
+    indices_seleccionados = seleccion_rutas(aptitudes, elite_size, metodo_seleccion, rng=rng)
     
     # Paso 3: Generar grupo de apareamiento
     grupo = grupo_apareamiento(generacion_actual, indices_seleccionados)
     
     # Paso 4: Generar población cruzada
-    hijos = reproduccion_poblacion(grupo, elite_size)
+    hijos = reproduccion_poblacion(grupo, elite_size, rng)
     
-    # Paso 5: Incluir mutaciones
-    siguiente_generacion = mutacion_poblacion(hijos, tasa_mutacion)
+    # Paso 5: Incluir mutaciones (la élite pasa sin cambios)
+    siguiente_generacion = mutacion_poblacion(hijos, tasa_mutacion, rng, tipo_mutacion, elite_size)
     
     return siguiente_generacion
 
@@ -440,7 +652,10 @@ def algoritmo_genetico(lista_ciudades: List[Municipio],
                       elite_size: int,
                       tasa_mutacion: float,
                       num_generaciones: int,
-                      verbose: bool = True) -> Tuple[List[Municipio], float]:
+                      verbose: bool = True,
+                      metodo_seleccion: str = 'ruleta',
+                      tipo_mutacion: str = 'swap',
+                      semilla: int = None) -> Tuple[List[Municipio], float]:
     """
     Ejecuta el algoritmo genético completo para resolver el TSP.
     
@@ -457,16 +672,24 @@ def algoritmo_genetico(lista_ciudades: List[Municipio],
         tasa_mutacion: Tasa de mutación (0.0 a 1.0)
         num_generaciones: Número de generaciones a evolucionar
         verbose: Si True, muestra progreso
+        metodo_seleccion: 'ruleta', 'torneo' o 'sus'
+        tipo_mutacion: 'swap', 'inversion' o 'scramble'
+        semilla: Semilla del generador aleatorio (la misma semilla repite la corrida)
         
     Returns:
         Tuple[List[Municipio], float]: Mejor ruta encontrada y su distancia
     """
+    rng = crear_generador(semilla)
+    
+    # Las rutas son permutaciones de índices sobre la matriz de distancias
+    matriz = matriz_distancias(lista_ciudades)
+    
     # Generar población inicial
-    poblacion = poblacion_inicial(tamano_poblacion, lista_ciudades)
+    poblacion = poblacion_inicial(tamano_poblacion, len(lista_ciudades), rng)
     
     # Calcular distancia inicial
-    clasificacion_inicial = clasificacion_rutas(poblacion)
-    distancia_inicial = 1 / clasificacion_inicial[0][1]
+    aptitudes = aptitud_poblacion(poblacion, matriz)
+    distancia_inicial = 1 / aptitudes.max()
     mejor_distancia_historica = distancia_inicial
     generaciones_sin_mejora = 0
     
@@ -487,11 +710,12 @@ def algoritmo_genetico(lista_ciudades: List[Municipio],
     
     # Evolucionar por n generaciones
     for generacion in range(num_generaciones):
-        poblacion = nueva_generacion(poblacion, elite_size, tasa_mutacion_actual)
+        poblacion = nueva_generacion(poblacion, elite_size, tasa_mutacion_actual, matriz,
+                                     metodo_seleccion, aptitudes, rng, tipo_mutacion)
         
-        # Obtener mejor distancia actual
-        clasificacion_actual = clasificacion_rutas(poblacion)
-        distancia_actual = 1 / clasificacion_actual[0][1]
+        # Obtener mejor distancia actual (la aptitud se reutiliza en la siguiente selección)
+        aptitudes = aptitud_poblacion(poblacion, matriz)
+        distancia_actual = 1 / aptitudes.max()
         
         # Verificar si hubo mejora
         if distancia_actual < mejor_distancia_historica - 0.001:  # Mejora significativa
@@ -511,22 +735,15 @@ def algoritmo_genetico(lista_ciudades: List[Municipio],
             
             # Reiniciar 50% de la población (mantener élite)
             if generaciones_sin_mejora > 100:
-                num_reiniciar = tamano_poblacion // 2
-                poblacion_clasificada = clasificacion_rutas(poblacion)
-                
                 # Mantener los mejores
-                mejores_indices = [int(idx) for idx, _ in poblacion_clasificada[:elite_size]]
-                mejores = [poblacion[idx] for idx in mejores_indices]
+                mejores = poblacion[indices_elite(aptitudes, elite_size)]
                 
-                # Generar nuevos aleatorios
-                nuevos = [crear_ruta(lista_ciudades) for _ in range(num_reiniciar)]
+                # Generar nuevos aleatorios hasta el tamaño original
+                nuevos = poblacion_inicial(tamano_poblacion - len(mejores), len(lista_ciudades), rng)
                 
                 # Combinar
-                poblacion = mejores + nuevos
-                
-                # Rellenar hasta el tamaño original
-                while len(poblacion) < tamano_poblacion:
-                    poblacion.append(crear_ruta(lista_ciudades))
+                poblacion = np.concatenate([mejores, nuevos])
+                aptitudes = aptitud_poblacion(poblacion, matriz)
                 
                 generaciones_sin_mejora = 0
                 
@@ -540,10 +757,9 @@ def algoritmo_genetico(lista_ciudades: List[Municipio],
                   f"(Mejora: {mejora:.2f}%) [Sin mejora: {generaciones_sin_mejora}]")
     
     # Obtener mejor ruta final
-    clasificacion_final = clasificacion_rutas(poblacion)
-    indice_mejor_ruta = int(clasificacion_final[0][0])
-    mejor_ruta = poblacion[indice_mejor_ruta]
-    distancia_final = 1 / clasificacion_final[0][1]
+    indice_mejor_ruta = int(np.argmax(aptitudes))
+    mejor_ruta = [lista_ciudades[i] for i in poblacion[indice_mejor_ruta]]
+    distancia_final = float(1 / aptitudes[indice_mejor_ruta])
     
     if verbose:
         print("=" * 60)
@@ -564,6 +780,220 @@ def algoritmo_genetico(lista_ciudades: List[Municipio],
     return mejor_ruta, distancia_final
 
 
+# ============================================================================
+# MODELO DE ISLAS - Subpoblaciones en paralelo con migración
+# ============================================================================
+
+TOPOLOGIAS_MIGRACION = ('anillo', 'aleatoria')
+
+# Matriz de distancias del proceso trabajador: se asigna una sola vez en el
+# inicializador del pool en lugar de enviarla con cada época
+_matriz_isla = None
+
+
+def _inicializar_isla(matriz: np.ndarray) -> None:
+    """Guarda la matriz de distancias en el proceso trabajador."""
+    global _matriz_isla
+    _matriz_isla = matriz
+
+
+def diversidad_aristas(poblacion: np.ndarray) -> float:
+    """
+    Mide la diversidad de una población por sus aristas distintas.
+    
+    Args:
+        poblacion: Arreglo (tamano_poblacion, n) de rutas
+        
+    Returns:
+        float: Aristas distintas (sin dirección) entre n; 1.0 = todas las rutas iguales
+    """
+    n = poblacion.shape[1]
+    origen = poblacion.astype(np.int64)
+    destino = np.roll(origen, -1, axis=1)
+    aristas = np.minimum(origen, destino) * n + np.maximum(origen, destino)
+    return len(np.unique(aristas)) / n
+
+
+def _evolucionar_isla(isla: Dict, num_generaciones: int) -> Dict:
+    """
+    Evoluciona una isla durante una época (las generaciones entre migraciones).
+    
+    Args:
+        isla: Estado de la isla (población, aptitudes, generador y parámetros)
+        num_generaciones: Generaciones a evolucionar
+        
+    Returns:
+        Dict: Estado actualizado de la isla
+    """
+    matriz = _matriz_isla
+    for _ in range(num_generaciones):
+        isla['poblacion'] = nueva_generacion(isla['poblacion'], isla['elite_size'], isla['tasa_actual'],
+                                             matriz, isla['metodo_seleccion'], isla['aptitudes'],
+                                             isla['rng'], isla['tipo_mutacion'])
+        isla['aptitudes'] = aptitud_poblacion(isla['poblacion'], matriz)
+        distancia = 1 / isla['aptitudes'].max()
+        
+        # Mutación adaptativa; la migración sustituye al reinicio parcial
+        if distancia < isla['mejor_distancia'] - 0.001:
+            isla['mejor_distancia'] = distancia
+            isla['sin_mejora'] = 0
+            isla['tasa_actual'] = isla['tasa_mutacion']
+        else:
+            isla['sin_mejora'] += 1
+        if isla['sin_mejora'] > 50:
+            isla['tasa_actual'] = min(isla['tasa_mutacion'] * 3, 0.15)
+    return isla
+
+
+def migracion(islas: List[Dict], num_migrantes: int, topologia: str,
+              rng: np.random.Generator) -> None:
+    """
+    Copia la élite de cada isla sobre los peores individuos de su isla destino.
+    
+    Args:
+        islas: Estados de las islas
+        num_migrantes: Individuos que emigra cada isla
+        topologia: 'anillo' (isla i -> i+1) o 'aleatoria' (otra isla al azar en cada migración)
+        rng: Generador aleatorio
+    """
+    num_islas = len(islas)
+    if num_islas < 2 or num_migrantes <= 0:
+        return
+    if topologia == 'anillo':
+        destinos = (np.arange(num_islas) + 1) % num_islas
+    elif topologia == 'aleatoria':
+        destinos = (np.arange(num_islas) + rng.integers(1, num_islas, size=num_islas)) % num_islas
+    else:
+        raise ValueError(f"Topología desconocida: {topologia} (opciones: {TOPOLOGIAS_MIGRACION})")
+    
+    # Todos los emigrantes se eligen antes de reemplazar a nadie
+    emigrantes = []
+    for isla in islas:
+        elite = indices_elite(isla['aptitudes'], num_migrantes)
+        emigrantes.append((isla['poblacion'][elite], isla['aptitudes'][elite]))
+    
+    for origen, destino in enumerate(destinos):
+        isla = islas[destino]
+        rutas, aptitudes = emigrantes[origen]
+        peores = indices_elite(-isla['aptitudes'], len(rutas))
+        isla['poblacion'][peores] = rutas
+        isla['aptitudes'][peores] = aptitudes
+
+
+def algoritmo_genetico_islas(lista_ciudades: List[Municipio],
+                             tamano_poblacion: int,
+                             elite_size: int,
+                             tasa_mutacion: float,
+                             num_generaciones: int,
+                             num_islas: int = 4,
+                             intervalo_migracion: int = 20,
+                             num_migrantes: int = 5,
+                             topologia: str = 'anillo',
+                             num_procesos: int = None,
+                             verbose: bool = True,
+                             metodo_seleccion: str = 'ruleta',
+                             tipo_mutacion: str = 'swap',
+                             semilla: int = None) -> Tuple[List[Municipio], float]:
+    """
+    Ejecuta el algoritmo genético con el modelo de islas.
+    
+    Cada isla evoluciona su propia subpoblación en un proceso trabajador durante
+    'intervalo_migracion' generaciones; después, la élite de cada isla migra a otra
+    según la topología. El aislamiento entre migraciones conserva la diversidad
+    sin los reinicios aleatorios del algoritmo de una sola población.
+    
+    Args:
+        lista_ciudades: Lista de ciudades a visitar
+        tamano_poblacion: Tamaño de la población de cada isla
+        elite_size: Número de individuos élite por isla
+        tasa_mutacion: Tasa de mutación (0.0 a 1.0)
+        num_generaciones: Número de generaciones a evolucionar
+        num_islas: Número de subpoblaciones
+        intervalo_migracion: Generaciones entre migraciones
+        num_migrantes: Individuos que emigra cada isla
+        topologia: 'anillo' o 'aleatoria'
+        num_procesos: Procesos trabajadores (None = uno por núcleo; 1 = sin pool)
+        verbose: Si True, muestra progreso
+        metodo_seleccion: 'ruleta', 'torneo' o 'sus'
+        tipo_mutacion: 'swap', 'inversion' o 'scramble'
+        semilla: Semilla (el resultado no depende del número de procesos)
+        
+    Returns:
+        Tuple[List[Municipio], float]: Mejor ruta encontrada y su distancia
+    """
+    matriz = matriz_distancias(lista_ciudades)
+    
+    # Un generador independiente por isla derivado de la misma semilla
+    secuencias = np.random.SeedSequence(semilla).spawn(num_islas + 1)
+    rng_migracion = np.random.default_rng(secuencias[0])
+    islas = []
+    for secuencia in secuencias[1:]:
+        rng = np.random.default_rng(secuencia)
+        poblacion = poblacion_inicial(tamano_poblacion, len(lista_ciudades), rng)
+        aptitudes = aptitud_poblacion(poblacion, matriz)
+        islas.append({'poblacion': poblacion, 'aptitudes': aptitudes, 'rng': rng,
+                      'elite_size': elite_size, 'tasa_mutacion': tasa_mutacion, 'tasa_actual': tasa_mutacion,
+                      'metodo_seleccion': metodo_seleccion, 'tipo_mutacion': tipo_mutacion,
+                      'mejor_distancia': 1 / aptitudes.max(), 'sin_mejora': 0})
+    
+    distancia_inicial = min(isla['mejor_distancia'] for isla in islas)
+    if verbose:
+        print("=" * 60)
+        print("🧬 ALGORITMO GENÉTICO - MODELO DE ISLAS")
+        print("=" * 60)
+        print(f"Número de ciudades: {len(lista_ciudades)}")
+        print(f"Islas: {num_islas} x {tamano_poblacion} individuos")
+        print(f"Migración: {num_migrantes} cada {intervalo_migracion} generaciones ({topologia})")
+        print(f"Generaciones: {num_generaciones}")
+        print("=" * 60)
+        print(f"Distancia inicial: {distancia_inicial:.2f}")
+    
+    pool = None
+    if num_procesos != 1:
+        pool = ProcessPoolExecutor(max_workers=num_procesos, initializer=_inicializar_isla, initargs=(matriz,))
+    else:
+        _inicializar_isla(matriz)
+    
+    try:
+        generacion = 0
+        while generacion < num_generaciones:
+            epoca = min(intervalo_migracion, num_generaciones - generacion)
+            if pool is not None:
+                islas = list(pool.map(_evolucionar_isla, islas, repeat(epoca)))
+            else:
+                islas = [_evolucionar_isla(isla, epoca) for isla in islas]
+            generacion += epoca
+            
+            if verbose:
+                distancia_actual = min(1 / isla['aptitudes'].max() for isla in islas)
+                mejora = ((distancia_inicial - distancia_actual) / distancia_inicial) * 100
+                diversidad = np.mean([diversidad_aristas(isla['poblacion']) for isla in islas])
+                print(f"Generación {generacion:4d}: Distancia = {distancia_actual:.4f} "
+                      f"(Mejora: {mejora:.2f}%) [Diversidad: {diversidad:.2f}]")
+            
+            if generacion < num_generaciones:
+                migracion(islas, num_migrantes, topologia, rng_migracion)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    
+    # Mejor ruta entre todas las islas
+    mejor_isla = max(islas, key=lambda isla: isla['aptitudes'].max())
+    indice_mejor_ruta = int(np.argmax(mejor_isla['aptitudes']))
+    mejor_ruta = [lista_ciudades[i] for i in mejor_isla['poblacion'][indice_mejor_ruta]]
+    distancia_final = float(1 / mejor_isla['aptitudes'][indice_mejor_ruta])
+    
+    if verbose:
+        print("=" * 60)
+        print(f"RESULTADO FINAL")
+        print(f"Distancia final: {distancia_final:.4f}")
+        mejora_total = ((distancia_inicial - distancia_final) / distancia_inicial) * 100
+        print(f"Mejora total: {mejora_total:.2f}%")
+        print("=" * 60)
+    
+    return mejor_ruta, distancia_final
+
+
 # ============================================================================
 # EJEMPLO DE USO
 # ============================================================================